@@ -0,0 +1,127 @@
+# core/env/assignment.py
+"""
+Задача о назначениях «работники × линии» для диспетчера.
+
+• hungarian – венгерский алгоритм (кратчайшие увеличивающие пути с
+  потенциалами, O(n²·m)); внутренний цикл — векторные операции numpy
+  по строке матрицы. Принимает дедлайн (time.perf_counter): не успели —
+  возвращаем None, вызывающий переходит на жадный вариант;
+• greedy_assignment – строки по порядку, каждая берёт самый дешёвый
+  свободный столбец (O(n·m));
+• solve_assignment – общий вход: прямоугольная матрица любой формы,
+  бюджет времени, (rows, cols, method). Стоимость +inf — пара запрещена
+  (например, зона недостижима): в решатель идёт конечный штраф больше
+  любой разницы допустимых назначений, запрещённые пары из ответа
+  выбрасываются.
+"""
+from __future__ import annotations
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def hungarian(cost: np.ndarray, deadline: Optional[float] = None) -> Optional[np.ndarray]:
+    """
+    Минимальное назначение для n ≤ m: col[i] — столбец строки i.
+    None — вышли за ``deadline``. Стоимости — только конечные (inf/nan
+    ломают потенциалы); запреты — через solve_assignment.
+    """
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("hungarian: rows must not exceed columns")
+    if not np.isfinite(cost).all():
+        raise ValueError("hungarian: cost matrix must be finite")
+    inf = np.inf
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)          # p[j] — строка (1..n) в столбце j, 0 — свободен
+    way = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        if deadline is not None and time.perf_counter() > deadline:
+            return None
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:                                # разворачиваем увеличивающий путь
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    col = np.empty(n, dtype=np.intp)
+    rows = p[1:]
+    assigned = np.flatnonzero(rows)
+    col[rows[assigned] - 1] = assigned
+    return col
+
+
+def greedy_assignment(cost: np.ndarray) -> np.ndarray:
+    """Строки по порядку берут самый дешёвый свободный столбец (n ≤ m)."""
+    n, m = cost.shape
+    taken = np.zeros(m, dtype=bool)
+    col = np.empty(n, dtype=np.intp)
+    for i in range(n):
+        row = np.where(taken, np.inf, cost[i])
+        j = int(np.argmin(row))
+        col[i] = j
+        taken[j] = True
+    return col
+
+
+def solve_assignment(cost: np.ndarray, budget_s: Optional[float] = None
+                     ) -> Tuple[List[int], List[int], str]:
+    """
+    Пары (row, col) минимальной суммарной стоимости; назначается
+    min(n, m) пар, кроме запрещённых (+inf) — среди назначений с
+    наибольшим числом допустимых пар выбирается самое дешёвое.
+    method — "hungarian" или "greedy" (не уложились в бюджет).
+    """
+    n, m = cost.shape
+    if not n or not m:
+        return [], [], "hungarian"
+    cost = np.asarray(cost, dtype=float)
+    if np.isnan(cost).any() or np.isneginf(cost).any():
+        raise ValueError("solve_assignment: cost must not contain nan or -inf")
+    allowed = np.isfinite(cost)
+    if not allowed.any():
+        return [], [], "hungarian"
+    if not allowed.all():
+        ok = cost[allowed]
+        penalty = ok.max() + (ok.max() - ok.min() + 1.0) * min(n, m)
+        cost = np.where(allowed, cost, penalty)
+    transposed = n > m
+    c = cost.T if transposed else cost
+    deadline = None if budget_s is None else time.perf_counter() + budget_s
+    col = hungarian(c, deadline)
+    method = "hungarian"
+    if col is None:
+        col, method = greedy_assignment(c), "greedy"
+    rows = list(range(len(col)))
+    cols = col.tolist()
+    if transposed:
+        rows, cols = cols, rows
+        order = sorted(range(len(rows)), key=rows.__getitem__)
+        rows = [rows[k] for k in order]
+        cols = [cols[k] for k in order]
+    if not allowed.all():
+        keep = [k for k in range(len(rows)) if allowed[rows[k], cols[k]]]
+        rows = [rows[k] for k in keep]
+        cols = [cols[k] for k in keep]
+    return rows, cols, method
@@ -0,0 +1,179 @@
+# core/env/checkpoint.py
+"""
+Чекпоинты и форк движка для what‑if оценки.
+
+• checkpoint_bytes / restore_bytes – полный снимок SimulationEngine
+  (WorldState, RNG, очереди EventBus, счётчик ID событий) в компактный
+  бинарный блок: pickle (последний протокол) + zlib;
+• save_checkpoint / load_checkpoint – то же в файл;
+• fork_engine – независимый клон в памяти того же процесса;
+• evaluate_forks – N кандидатных патчей из одного состояния середины
+  смены параллельно через os.fork (страницы памяти копируются ОС
+  только при записи), обратно в родителя едут только KPI.
+
+Клон не пишет в журнал событий и архив оригинала: журнал выключен,
+архив не подключён (счётчики KPI в state.metrics сохраняются).
+"""
+from __future__ import annotations
+import os, pickle, zlib
+from typing import Any, Callable, Dict, List
+
+from .simulation_engine import SimulationEngine
+from .models import Worker
+from . import events
+
+_MAGIC = b"SWCKPT1\n"
+
+
+# ---------- снимок ----------
+def checkpoint_bytes(engine: SimulationEngine, level: int = 1) -> bytes:
+    payload = pickle.dumps(
+        {"engine": engine, "event_num": events.event_id_state()},
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    return _MAGIC + zlib.compress(payload, level)
+
+
+def restore_bytes(blob: bytes, restore_event_ids: bool = True) -> SimulationEngine:
+    if not blob.startswith(_MAGIC):
+        raise ValueError("not a simulation checkpoint")
+    data = pickle.loads(zlib.decompress(blob[len(_MAGIC):]))
+    if restore_event_ids:
+        events.set_event_id_state(data["event_num"])
+    return data["engine"]
+
+
+def save_checkpoint(engine: SimulationEngine, path: str, level: int = 1) -> int:
+    blob = checkpoint_bytes(engine, level)
+    with open(path, "wb") as f:
+        f.write(blob)
+    return len(blob)
+
+
+def load_checkpoint(path: str, log_cfg: dict | None = None) -> SimulationEngine:
+    """Восстанавливаем движок; ``log_cfg`` — включить журнал в продолжении."""
+    with open(path, "rb") as f:
+        engine = restore_bytes(f.read())
+    if log_cfg:
+        engine.event_bus.set_log(log_cfg)
+    return engine
+
+
+def fork_engine(engine: SimulationEngine) -> SimulationEngine:
+    """Глубокий клон в памяти; ID событий у клона продолжают общий счётчик."""
+    return pickle.loads(pickle.dumps(engine, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+# ---------- патч в середине смены ----------
+def apply_live_patch(engine: SimulationEngine, patch: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    apply_patch к engine.cfg + синхронизация того, что уже «запечено»
+    в WorldState: live_config и число сборщиков (новые — idle в DOCK_OUT,
+    лишние свободные сразу уходят в off, занятые — после текущей линии).
+    """
+    from core.optimizer.patch import apply_patch
+
+    applied = apply_patch(engine.cfg, patch)
+    s = engine.state
+    lc = s.live_config
+    if "dispatcher.max_assign_per_step" in applied:
+        lc.dispatcher_max_assign_per_step = applied["dispatcher.max_assign_per_step"]
+    if "waves.size" in applied:
+        lc.wave_size = applied["waves.size"]
+    if "waves.build_timeout_seconds" in applied:
+        lc.wave_build_timeout = applied["waves.build_timeout_seconds"]
+    if "workers.pickers" in applied:
+        _resize_pickers(s, applied["workers.pickers"])
+    return applied
+
+
+def _resize_pickers(state, target: int):
+    pickers = [w for w in state.workers.values() if w.role == "picker"]
+    active = [w for w in pickers if w.state != "off" and not w.retiring]
+    # сначала оставляем уходящих, затем возвращаем выключенных, затем нанимаем новых
+    for w in pickers:
+        if len(active) >= target:
+            break
+        if w.retiring:
+            w.retiring = False
+            active.append(w)
+    for w in pickers:
+        if len(active) >= target:
+            break
+        if w.state == "off":
+            w.state = "idle"
+            active.append(w)
+    n = len(state.workers)
+    while len(active) < target:
+        n += 1
+        w = Worker(id=f"W{n}", role="picker", state="idle", current_zone_id="DOCK_OUT")
+        state.workers[w.id] = w
+        active.append(w)
+    # лишние: сначала свободные (сразу off), потом занятые — уходят, доделав линию
+    surplus = len(active) - target
+    for w in sorted(reversed(active), key=lambda w: w.state != "idle"):
+        if surplus <= 0:
+            break
+        if w.state == "idle":
+            w.state = "off"
+        else:
+            w.retiring = True
+        surplus -= 1
+
+
+# ---------- параллельные what‑if ----------
+def evaluate_forks(engine: SimulationEngine, patches: List[Dict[str, Any]], until: int,
+                   evaluate: Callable[[SimulationEngine], Dict[str, Any]],
+                   workers: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Каждый патч: os.fork() от текущего состояния → apply_live_patch →
+    прогон до ``until`` → ``evaluate(engine)``. Результаты — в порядке
+    patches. Без os.fork (Windows) — последовательно через fork_engine.
+    """
+    if not hasattr(os, "fork"):
+        results = []
+        for patch in patches:
+            clone = fork_engine(engine)
+            results.append(_run_candidate(clone, patch, until, evaluate))
+        return results
+
+    workers = workers or os.cpu_count() or 1
+    results: List[Dict[str, Any] | None] = [None] * len(patches)
+    running: List[tuple[int, int, int]] = []     # (pid, index, read fd)
+    pending = list(enumerate(patches))
+
+    while pending or running:
+        while pending and len(running) < workers:
+            i, patch = pending.pop(0)
+            r, w = os.pipe()
+            pid = os.fork()
+            if pid == 0:                              # ребёнок
+                os.close(r)
+                code = 0
+                try:
+                    engine.archive = None              # файлы родителя не трогаем
+                    engine.event_bus.detach_log()
+                    out = _run_candidate(engine, patch, until, evaluate)
+                except BaseException as e:            # noqa: BLE001
+                    out, code = {"error": repr(e)}, 1
+                with os.fdopen(w, "wb") as f:
+                    pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os._exit(code)
+            os.close(w)
+            running.append((pid, i, r))
+
+        # сначала читаем трубу до EOF, потом waitpid — иначе большой
+        # результат заблокирует ребёнка на записи
+        pid, i, r = running.pop(0)
+        with os.fdopen(r, "rb") as f:
+            results[i] = pickle.load(f)
+        os.waitpid(pid, 0)
+    return results
+
+
+def _run_candidate(engine: SimulationEngine, patch: Dict[str, Any], until: int,
+                   evaluate: Callable[[SimulationEngine], Dict[str, Any]]) -> Dict[str, Any]:
+    applied = apply_live_patch(engine, patch)
+    while engine.state.sim_time < until:
+        engine.step(until=until)
+    return {"patch": applied, **evaluate(engine)}
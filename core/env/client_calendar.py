@@ -0,0 +1,104 @@
+# core/env/client_calendar.py
+"""
+Календарь клиентских inbound / outbound.
+
+Вместо обхода всех клиентов каждый тик — две min‑кучи (due_time,
+порядок клиента, client_id). За тик снимаются только клиенты, чьё
+время наступило; снятые обрабатываются в порядке state.clients, как
+и раньше, поэтому последовательность RNG не меняется.
+
+Недельный шаблон (pattern: weekly) — таблица «через сколько дней
+ближайший рабочий день» для каждого дня недели: следующий слот
+находится за O(1), без перебора 15 дней. Нет слота (weekly_next_time
+вернул None) — next_*_time клиента = None, в кучу он не возвращается.
+"""
+from __future__ import annotations
+import heapq
+from functools import lru_cache
+from random import Random
+from typing import Dict, List, Optional, Tuple
+
+from .models import Client, WorldState
+
+DAY_SEC = 86_400
+_MAX_DAYS_AHEAD = 14            # как прежний перебор range(0, 15)
+
+
+@lru_cache(maxsize=None)
+def _weekly_offsets(days: Tuple[int, ...]) -> Tuple[Optional[int], ...]:
+    """Для dow 0..6 — сколько дней до ближайшего дня из ``days`` (0 = сегодня)."""
+    table = []
+    for dow in range(7):
+        table.append(next((k for k in range(7) if (dow + k) % 7 in days), None))
+    return tuple(table)
+
+
+def weekly_next_time(now: int, days, minute_target: int, rng: Random,
+                     jitter_min: int = 0, jitter_max: int = 0,
+                     always_draw: bool = False) -> Optional[int]:
+    """
+    Ближайший слот weekly‑шаблона строго позже ``now`` (с джиттером в
+    минутах) или None. Джиттер тянется по одному разу на каждый
+    проверенный день — ровно как в прежнем цикле; ``always_draw`` —
+    тянуть randint и при нулевом диапазоне (так делал inbound).
+    """
+    offsets = _weekly_offsets(tuple(sorted(set(days))))
+    current_day = now // DAY_SEC
+    minute_of_day = (now % DAY_SEC) // 60
+
+    day = current_day
+    while True:
+        k = offsets[day % 7]
+        if k is None:
+            return None
+        day += k
+        if day - current_day > _MAX_DAYS_AHEAD:
+            return None
+        if day == current_day and minute_of_day > minute_target:
+            day += 1
+            continue
+        target = day * DAY_SEC + minute_target * 60
+        if always_draw or jitter_min or jitter_max:
+            target += rng.randint(jitter_min, jitter_max) * 60
+        if target > now:
+            return target
+        day += 1
+
+
+class ClientCalendar:
+    def __init__(self, clients: Dict[str, Client]):
+        self.order: Dict[str, int] = {cid: i for i, cid in enumerate(clients)}
+        self.inbound: List[tuple] = [
+            (c.next_inbound_time, self.order[c.id], c.id)
+            for c in clients.values() if c.inbound_cfg and c.next_inbound_time is not None
+        ]
+        self.outbound: List[tuple] = [
+            (c.next_outbound_time, self.order[c.id], c.id)
+            for c in clients.values() if c.outbound_cfg and c.next_outbound_time is not None
+        ]
+        heapq.heapify(self.inbound)
+        heapq.heapify(self.outbound)
+
+    @staticmethod
+    def pop_due(heap: List[tuple], now) -> List[str]:
+        """ID клиентов с due ≤ now в порядке state.clients."""
+        due = []
+        while heap and heap[0][0] <= now:
+            due.append(heapq.heappop(heap)[1:])
+        due.sort()
+        return [cid for _, cid in due]
+
+    def push(self, heap: List[tuple], due, client_id: str):
+        heapq.heappush(heap, (due, self.order[client_id], client_id))
+
+    @staticmethod
+    def next_time(heap: List[tuple]):
+        return heap[0][0] if heap else None
+
+
+def ensure_calendar(state: WorldState) -> ClientCalendar:
+    """Календарь из state; строим при первом обращении и при смене состава клиентов."""
+    cal = state.client_calendar
+    if cal is None or len(cal.order) != len(state.clients):
+        cal = state.client_calendar = ClientCalendar(state.clients)
+    return cal
@@ -0,0 +1,317 @@
+# core/env/demand_trace.py
+"""
+Заранее сгенерированный поток спроса на всю смену (``demand.source: trace``).
+
+Вместо выборки inbound/outbound внутри тика — одна векторная генерация
+(numpy.random.Generator) всех прибытий всех клиентов за shift_seconds:
+время, клиент, SKU, qty. Поток пишется в каталог колонок .npy
+(time/kind/client/sku/qty + meta.json со справочниками id) и читается
+через ``np.load(mmap_mode="r")`` — длинные трассы не лежат в памяти
+целиком. Движок идёт по потоку курсором (DemandCursor): за тик —
+бинарный поиск конца среза ``time ≤ sim_time``.
+
+Одну трассу можно проигрывать в разных конфигурациях (другое число
+сборщиков, волны, диспетчер) без повторной выборки спроса.
+
+Шаблоны те же, что в clients.yaml: interval (база + джиттер в минутах),
+weekly (дни недели + минута дня + джиттер), иначе — раз в сутки /
+раз в час. Число линий и qty — Пуассон, SKU — alias‑таблица по sku_mix.
+Строки отсортированы по (time, kind, client, порядок генерации).
+
+CLI:
+    python -m core.env.demand_trace --out traces/demand --seed 42 --shift-seconds 28800
+"""
+from __future__ import annotations
+import argparse, hashlib, json, math, pathlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Client, SKU
+from .sampling import alias_table, _mix_items
+
+TRACE_VERSION = 1
+DAY_SEC = 86_400
+
+# kind: порядок внутри одного момента — как в тике движка
+INITIAL, INBOUND, OUTBOUND = 0, 1, 2
+KIND_NAMES = ("initial", "inbound", "outbound")
+
+_COLUMNS = {"time": np.float64, "kind": np.int8, "client": np.int32,
+            "sku": np.int32, "qty": np.int32}
+
+INITIAL_QTY = (80, 150)          # как publish_initial_inbound
+
+
+class DemandTrace:
+    """Колонки потока (ndarray или memmap) + справочники client/sku."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], clients: List[str],
+                 skus: List[str], meta: Optional[dict] = None):
+        self.time = columns["time"]
+        self.kind = columns["kind"]
+        self.client = columns["client"]
+        self.sku = columns["sku"]
+        self.qty = columns["qty"]
+        self.clients = list(clients)
+        self.skus = list(skus)
+        self.meta = meta or {}
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in _COLUMNS}
+
+    def rows(self, start: int, stop: int) -> Iterator[Tuple[float, int, str, str, int]]:
+        """(time, kind, client_id, sku_id, qty) для строк [start, stop)."""
+        clients, skus = self.clients, self.skus
+        return zip(self.time[start:stop].tolist(),
+                   self.kind[start:stop].tolist(),
+                   [clients[i] for i in self.client[start:stop].tolist()],
+                   [skus[i] for i in self.sku[start:stop].tolist()],
+                   self.qty[start:stop].tolist())
+
+
+# ---------- генерация ----------
+def _interval_times(rng: np.random.Generator, shift_s: int, base_min: float,
+                    jitter: Optional[Tuple[int, int]]) -> np.ndarray:
+    """0, затем кумулятивная сумма (база + джиттер) — всё, что < shift_s."""
+    step_min = base_min * 60 + (jitter[0] * 60 if jitter else 0)
+    if step_min <= 0:
+        raise ValueError("interval pattern needs a positive base_interval_min")
+    n = int(math.ceil(shift_s / step_min)) + 1
+    steps = np.full(n, base_min * 60, dtype=np.float64)
+    if jitter:
+        steps += rng.integers(jitter[0], jitter[1] + 1, n) * 60
+    times = np.concatenate(([0.0], np.cumsum(steps)))
+    return times[times < shift_s]
+
+
+def _weekly_times(rng: np.random.Generator, shift_s: int, days, minute: int,
+                  jitter: Tuple[int, int]) -> np.ndarray:
+    """t=0 (как next_*_time=0 у клиента), затем слоты по дням недели."""
+    day_idx = np.arange(shift_s // DAY_SEC + 1)
+    day_idx = day_idx[np.isin(day_idx % 7, list(days))]
+    times = day_idx * DAY_SEC + minute * 60 + rng.integers(jitter[0], jitter[1] + 1, len(day_idx)) * 60
+    times = times[(times > 0) & (times < shift_s)].astype(np.float64)
+    return np.concatenate(([0.0], times))
+
+
+def _arrival_times(rng, shift_s: int, cfg: dict, fallback_s: int, inbound: bool) -> np.ndarray:
+    pattern = cfg.get("pattern")
+    if pattern == "interval":
+        # inbound тянет джиттер всегда, outbound — только если заданы обе границы
+        if inbound or ("jitter_min" in cfg and "jitter_max" in cfg):
+            jitter = (cfg.get("jitter_min", 0), cfg.get("jitter_max", 0))
+        else:
+            jitter = None
+        return _interval_times(rng, shift_s, cfg["base_interval_min"], jitter)
+    if pattern == "weekly":
+        return _weekly_times(rng, shift_s, cfg["days"], cfg["time_minute_of_day"],
+                             (cfg.get("jitter_min", 0), cfg.get("jitter_max", 0)))
+    return np.arange(0, shift_s, fallback_s, dtype=np.float64)
+
+
+def _expand(rng, times: np.ndarray, lines_mean: float, qty_mean: Optional[float],
+            sku_index: np.ndarray, mix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Прибытия → строки: Poisson(lines_mean) линий (≥1), SKU из mix, qty."""
+    counts = np.maximum(rng.poisson(max(lines_mean, 0.0), len(times)), 1)
+    n = int(counts.sum())
+    line_times = np.repeat(times, counts)
+    skus = sku_index[alias_table(mix).draw_index(rng, n)]
+    if qty_mean is None:
+        qty = np.ones(n, dtype=np.int32)            # outbound: qty = 1
+    else:
+        qty = np.maximum(rng.poisson(max(qty_mean, 0.0), n), 1)
+    return line_times, skus, qty
+
+
+def generate_trace(clients: Dict[str, Client], shift_seconds: int, seed: int = 42,
+                   initial_inbound: bool = True) -> DemandTrace:
+    """Весь спрос смены: стартовые поставки, inbound‑поставки и outbound‑заказы."""
+    rng = np.random.default_rng(seed)
+    client_ids = list(clients)
+    sku_ids: List[str] = []
+    sku_pos: Dict[str, int] = {}
+    parts: Dict[str, list] = {name: [] for name in _COLUMNS}
+
+    def add(times, kind, ci, skus, qty):
+        parts["time"].append(np.asarray(times, dtype=np.float64))
+        parts["kind"].append(np.full(len(times), kind, dtype=np.int8))
+        parts["client"].append(np.full(len(times), ci, dtype=np.int32))
+        parts["sku"].append(np.asarray(skus, dtype=np.int32))
+        parts["qty"].append(np.asarray(qty, dtype=np.int32))
+
+    for ci, cid in enumerate(client_ids):
+        client = clients[cid]
+        if not client.sku_mix:
+            continue
+        mix_skus, _ = _mix_items(client.sku_mix)
+        for s in mix_skus:
+            if s not in sku_pos:
+                sku_pos[s] = len(sku_ids)
+                sku_ids.append(s)
+        sku_index = np.array([sku_pos[s] for s in mix_skus], dtype=np.int32)
+
+        if initial_inbound:
+            lo, hi = INITIAL_QTY
+            add(np.zeros(len(sku_index)), INITIAL, ci, sku_index,
+                rng.integers(lo, hi + 1, len(sku_index)))
+
+        ib = client.inbound_cfg
+        if ib:
+            times = _arrival_times(rng, shift_seconds, ib, DAY_SEC, inbound=True)
+            line_times, skus, qty = _expand(rng, times, ib.get("batch_mean_lines", 50),
+                                            ib.get("sku_qty_mean", 30), sku_index, client.sku_mix)
+            add(line_times, INBOUND, ci, skus, qty)
+        ob = client.outbound_cfg
+        if ob:
+            times = _arrival_times(rng, shift_seconds, ob, 3600, inbound=False)
+            line_times, skus, qty = _expand(rng, times, ob["lines_mean"], None,
+                                            sku_index, client.sku_mix)
+            add(line_times, OUTBOUND, ci, skus, qty)
+
+    if parts["time"]:
+        cols = {name: np.concatenate(parts[name]) for name in _COLUMNS}
+    else:
+        cols = {name: np.zeros(0, dtype=dt) for name, dt in _COLUMNS.items()}
+    order = np.lexsort((np.arange(len(cols["time"])), cols["client"], cols["kind"], cols["time"]))
+    cols = {name: col[order] for name, col in cols.items()}
+    meta = {"version": TRACE_VERSION, "shift_seconds": shift_seconds, "seed": seed}
+    return DemandTrace(cols, client_ids, sku_ids, meta)
+
+
+# ---------- файл ----------
+def save_trace(trace: DemandTrace, path) -> pathlib.Path:
+    """Каталог: <колонка>.npy + meta.json."""
+    root = pathlib.Path(path)
+    root.mkdir(parents=True, exist_ok=True)
+    for name, col in trace.columns().items():
+        np.save(root / f"{name}.npy", np.ascontiguousarray(col, dtype=_COLUMNS[name]))
+    meta = {**trace.meta, "rows": len(trace), "clients": trace.clients, "skus": trace.skus}
+    (root / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+    return root
+
+
+def load_trace(path, mmap: bool = True) -> DemandTrace:
+    root = pathlib.Path(path)
+    meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("version") != TRACE_VERSION:
+        raise ValueError(f"demand trace {root}: version {meta.get('version')} != {TRACE_VERSION}")
+    mode = "r" if mmap else None
+    cols = {name: np.load(root / f"{name}.npy", mmap_mode=mode) for name in _COLUMNS}
+    return DemandTrace(cols, meta.pop("clients"), meta.pop("skus"), meta)
+
+
+# ---------- курсор ----------
+class DemandCursor:
+    """
+    Позиция движка в потоке. В чекпоинт (pickle) уходят только путь и
+    позиция — колонки заново отображаются из файла при восстановлении.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.trace = load_trace(self.path)
+        self.pos = 0
+
+    def take_due(self, now) -> Iterator[Tuple[float, int, str, str, int]]:
+        """Строки с time ≤ now, ещё не выданные."""
+        start = self.pos
+        stop = int(np.searchsorted(self.trace.time, now, side="right"))
+        if stop <= start:
+            return iter(())
+        self.pos = stop
+        return self.trace.rows(start, stop)
+
+    def next_time(self) -> Optional[float]:
+        if self.pos >= len(self.trace):
+            return None
+        return float(self.trace.time[self.pos])
+
+    def __getstate__(self):
+        return {"path": self.path, "pos": self.pos}
+
+    def __setstate__(self, data):
+        self.path = data["path"]
+        self.trace = load_trace(self.path)
+        self.pos = data["pos"]
+
+
+def check_trace_meta(root, meta: dict, shift_seconds: int, seed: int) -> None:
+    """
+    Трасса должна покрывать смену и быть сгенерирована тем же seed'ом;
+    иначе — ValueError (короткая трасса молча оставила бы хвост смены
+    без спроса). Трасса длиннее смены допустима.
+    """
+    problems = []
+    if meta.get("shift_seconds", 0) < shift_seconds:
+        problems.append(f"covers {meta.get('shift_seconds')} s < shift_seconds {shift_seconds}")
+    if meta.get("seed") != seed:
+        problems.append(f"seed {meta.get('seed')} != {seed}")
+    if problems:
+        raise ValueError(
+            f"demand trace {root}: {'; '.join(problems)}; regenerate with "
+            f"python -m core.env.demand_trace --out {root} --seed {seed} --shift-seconds {shift_seconds}"
+        )
+
+
+def ensure_trace(path, clients: Dict[str, Client], shift_seconds: int, seed: int) -> pathlib.Path:
+    """Каталог трассы; если его нет — генерируем и сохраняем, иначе сверяем meta.json."""
+    root = pathlib.Path(path)
+    meta_path = root / "meta.json"
+    if not meta_path.exists():
+        save_trace(generate_trace(clients, shift_seconds, seed), root)
+    else:
+        check_trace_meta(root, json.loads(meta_path.read_text(encoding="utf-8")), shift_seconds, seed)
+    return root
+
+
+def trace_digest(path) -> str:
+    """sha256 по meta.json и колонкам (ключ тёплого кэша)."""
+    root = pathlib.Path(path)
+    h = hashlib.sha256()
+    for name in ("meta.json", *(f"{c}.npy" for c in _COLUMNS)):
+        with open(root / name, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def open_trace(path, clients: Dict[str, Client], skus: Dict[str, SKU],
+               shift_seconds: int, seed: int) -> DemandCursor:
+    """Курсор по трассе (генерируется при первом обращении)."""
+    root = ensure_trace(path, clients, shift_seconds, seed)
+    cursor = DemandCursor(root)
+    for what, ids, known in (("clients", cursor.trace.clients, clients),
+                             ("skus", cursor.trace.skus, skus)):
+        unknown = sorted(set(ids) - set(known))
+        if unknown:
+            raise ValueError(f"demand trace {root}: unknown {what} {unknown}")
+    return cursor
+
+
+def main():
+    from .state_builder import load_yaml
+    from .data_loader import load_clients
+
+    parser = argparse.ArgumentParser(description="Сгенерировать поток спроса на смену")
+    parser.add_argument("--params", default="config/sim_params.yaml")
+    parser.add_argument("--out", default=None, help="каталог трассы (по умолчанию demand.trace_path)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--shift-seconds", type=int, default=None)
+    args = parser.parse_args()
+
+    sim_cfg = load_yaml(args.params)
+    shift_s = args.shift_seconds or sim_cfg["time"]["shift_seconds"]
+    out = args.out or sim_cfg.get("demand", {}).get("trace_path", "traces/demand")
+    clients = load_clients(sim_cfg["files"]["clients"])
+    trace = generate_trace(clients, shift_s, args.seed)
+    save_trace(trace, out)
+    kinds = np.bincount(trace.kind, minlength=len(KIND_NAMES)).tolist()
+    print(f"{len(trace)} rows → {out} ({dict(zip(KIND_NAMES, kinds))})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,217 @@
 # core/env/dispatcher_heuristic.py
 from __future__ import annotations
+from typing import Dict, List, Tuple
 
-from .models  import WorldState, OrderLine
+import numpy as np
+
+from .models  import WorldState, OrderLine, Worker, Wave
 from .travel  import compute_travel_seconds
+from .line_index import set_line_status
+from .wave_manager import dispatch_waves
+from .assignment import solve_assignment
+from .pick_tour import plan_route
+from .kpi import record_assigned
+
+# greedy – работники по порядку, каждый берёт самую дешёвую линию из
+# своего окна look‑ahead (при окне 1 — строго FIFO волны);
+# optimal – одно назначение «все свободные × окно» венгерским алгоритмом;
+# tour – маршрут из нескольких близких линий волны на работника
+DISPATCH_BACKENDS = ("greedy", "optimal", "tour")
+
+
+# ---------- окно кандидатов ----------
+def _take_window(waves: List[Wave], k: int, status_of) -> List[Tuple[str, Wave]]:
+    """Снимаем до ``k`` waiting‑линий с голов очередей волн (волны по порядку)."""
+    window: List[Tuple[str, Wave]] = []
+    while waves and len(window) < k:
+        queue = waves[0].waiting
+        lid = queue.popleft()
+        if status_of(lid) == "waiting":
+            window.append((lid, waves[0]))
+        if not queue:
+            waves.pop(0)
+    return window
+
+
+def _return_window(waves: List[Wave], rest: List[Tuple[str, Wave]]):
+    """Невыбранные линии — обратно в головы своих очередей, порядок сохраняется."""
+    for lid, wave in reversed(rest):
+        if wave not in waves:
+            waves.insert(0, wave)          # волна была выбрана до дна — она раньше оставшихся
+        wave.waiting.appendleft(lid)
+
+
+def _pick_seconds(state: WorldState, line: OrderLine) -> float:
+    if line.pick_seconds is not None:
+        return line.pick_seconds
+    if line.line_type == "inbound":
+        return state.skus[line.sku].base_pick_sec * line.qty
+    return line.work_seconds_needed or 0
+
+
+def _cost_matrix(state: WorldState, workers: List[Worker], lines: List[OrderLine],
+                 travel: Dict[Tuple[str, str], float]) -> np.ndarray:
+    """(travel + pick) / speed_factor, сек; travel по парам зон считается один раз."""
+    from_zones = sorted({w.current_zone_id for w in workers})
+    to_zones = sorted({l.zone_id for l in lines})
+    fz = {z: i for i, z in enumerate(from_zones)}
+    tz = {z: j for j, z in enumerate(to_zones)}
+    t = np.empty((len(from_zones), len(to_zones)))
+    for a in from_zones:
+        for b in to_zones:
+            if (a, b) not in travel:
+                travel[a, b] = compute_travel_seconds(state, a, b, per_cell=1.5)
+            t[fz[a], tz[b]] = travel[a, b]
+    rows = np.array([fz[w.current_zone_id] for w in workers], dtype=np.intp)
+    cols = np.array([tz[l.zone_id] for l in lines], dtype=np.intp)
+    pick = np.array([_pick_seconds(state, l) for l in lines], dtype=float)
+    speed = np.array([w.speed_factor for w in workers], dtype=float)
+    return (t[np.ix_(rows, cols)] + pick) / speed[:, None]
+
+
+# ---------- назначение ----------
+def reserve_line(state: WorldState, worker: Worker, line: OrderLine):
+    """Линия закреплена за работником (сразу или как следующая остановка маршрута)."""
+    set_line_status(state, line, "assigned")
+    line.assigned_worker_id  = worker.id
+    line.assign_time         = state.sim_time
+    record_assigned(state)
+
+
+def start_task(state: WorldState, worker: Worker, line: OrderLine, travel_sec: float):
+    """Работник выходит к зоне линии: тайминги линии и фаза travel."""
+    # ---------- расчёт таймингов ----------
+    if line.line_type == "inbound":
+        # едем только до дока
+        if line.pick_seconds is None:
+            sku_obj = state.skus[line.sku]
+            line.pick_seconds = sku_obj.base_pick_sec * line.qty
+    else:
+        if line.pick_seconds is None:
+            line.pick_seconds = line.work_seconds_needed
+
+    line.travel_seconds = int(travel_sec)
+    if line.work_seconds_needed is None:
+        line.work_seconds_needed = line.pick_seconds + line.travel_seconds
+
+    worker.travel_remaining  = travel_sec
+    worker.pick_remaining    = line.pick_seconds
+    worker.phase             = "travel"
+    worker.state             = "moving"
+    worker.assigned_line_id  = line.id
+    worker.progress_seconds  = 0.0
 
 
-def assign_lines(state: WorldState) -> None:
+def _assign(state: WorldState, worker: Worker, line: OrderLine, travel_sec: float):
+    # ---------- записываем назначение ----------
+    reserve_line(state, worker, line)
+    start_task(state, worker, line, travel_sec)
+
+
+def start_next_stop(state: WorldState, worker: Worker):
+    """Следующая линия маршрута (вызывается из finish_pick)."""
+    line = state.order_lines[worker.tour.popleft()]
+    travel_sec = compute_travel_seconds(state, worker.current_zone_id, line.zone_id, per_cell=1.5)
+    start_task(state, worker, line, travel_sec)
+
+
+def _tour_lines(state: WorldState, worker: Worker, window: List[Tuple[str, Wave]],
+                k: int, travel) -> List[int]:
     """
-    Назначаем свободных работников на ожидающие линии.
-    Для inbound‑линий считаем только путь до DOCK_IN, чтобы
+    Позиции окна для маршрута: первая линия (FIFO) + до k‑1 ближайших к
+    ней outbound‑линий; порядок — по маршруту plan_route.
+    """
+    lines = state.order_lines
+    seed = lines[window[0][0]]
+    if k <= 1 or seed.line_type == "inbound":
+        return [0]
+    near = []
+    for pos in range(1, len(window)):
+        line = lines[window[pos][0]]
+        if line.line_type == "inbound":
+            continue
+        key = (seed.zone_id, line.zone_id)
+        if key not in travel:
+            travel[key] = compute_travel_seconds(state, key[0], key[1], per_cell=1.5)
+        near.append((travel[key], pos))
+    chosen = [0] + [pos for _, pos in sorted(near)[:k - 1]]
+    order, _ = plan_route(state, worker.current_zone_id, [lines[window[p][0]].zone_id for p in chosen])
+    rank = {z: i for i, z in enumerate(order)}
+    return sorted(chosen, key=lambda p: (rank[lines[window[p][0]].zone_id], p))
+
+
+def assign_lines(state: WorldState) -> list[Worker]:
+    """
+    Назначаем свободных работников на ожидающие линии активных волн
+    (Wave.waiting: старшая волна первой, внутри — FIFO).
+    Кандидаты — окно из look_ahead_lines_per_worker линий на работника;
+    стоимость пары — путь от current_zone_id работника до зоны линии
+    плюс сборка. Для inbound‑линий считаем только путь до DOCK_IN, чтобы
     действительно «заехать» на док, а дальнейшее перемещение
     выполняется уже в progress_model после PICK‑фазы.
+    Возвращаем работников, получивших задачу в этом тике.
     """
-    active_waves = [w for w in state.waves.values() if w.status == "active"]
-    if not active_waves:
-        return
-
-    wave = active_waves[0]
-    candidates = [
-        state.order_lines[lid]
-        for lid in wave.line_ids
-        if state.order_lines[lid].status == "waiting"
-    ]
-    if not candidates:
-        return
+    cfg = state.live_config
+    if cfg.dispatcher_backend not in DISPATCH_BACKENDS:
+        raise ValueError(f"unknown dispatcher backend: {cfg.dispatcher_backend}")
+    lines = state.order_lines
+    status_of = lines.status_of
+    waves = [w for w in dispatch_waves(state) if w.waiting]
+    if not waves:
+        return []
 
     idle_workers = [w for w in state.workers.values() if w.state == "idle"]
-    max_assign   = state.live_config.dispatcher_max_assign_per_step
-    assigned     = 0
+    idle_workers = idle_workers[:cfg.dispatcher_max_assign_per_step]
+    look_ahead = max(1, cfg.look_ahead_lines_per_worker)
+    travel: Dict[Tuple[str, str], float] = {}
+    assigned: list[Worker] = []
 
-    for worker in idle_workers:
-        if assigned >= max_assign or not candidates:
-            break
+    if cfg.dispatcher_backend == "optimal" and idle_workers:
+        window = _take_window(waves, len(idle_workers) * look_ahead, status_of)
+        cand = [lines[lid] for lid, _ in window]
+        cost = _cost_matrix(state, idle_workers, cand, travel)
+        rows, cols, _ = solve_assignment(cost, cfg.dispatcher_time_budget_ms / 1000)
+        chosen = set(cols)
+        _return_window(waves, [window[j] for j in range(len(window)) if j not in chosen])
+        for i, j in zip(rows, cols):
+            worker, line = idle_workers[i], cand[j]
+            _assign(state, worker, line, travel[worker.current_zone_id, line.zone_id])
+            assigned.append(worker)
+        return assigned
 
-        line = candidates.pop(0)
+    if cfg.dispatcher_backend == "tour":
+        k = max(1, cfg.tour_max_lines)
+        for worker in idle_workers:
+            window = _take_window(waves, k * look_ahead, status_of)
+            if not window:
+                break
+            stops = _tour_lines(state, worker, window, k, travel)
+            taken = set(stops)
+            _return_window(waves, [window[p] for p in range(len(window)) if p not in taken])
+            first = lines[window[stops[0]][0]]
+            for p in stops:
+                reserve_line(state, worker, lines[window[p][0]])
+            worker.tour.extend(window[p][0] for p in stops[1:])
+            start_task(state, worker, first, compute_travel_seconds(
+                state, worker.current_zone_id, first.zone_id, per_cell=1.5))
+            assigned.append(worker)
+        return assigned
 
-        # ---------- расчёт таймингов ----------
-        if line.line_type == "inbound":
-            # едем только до дока
-            travel_sec = compute_travel_seconds(
-                state, worker.current_zone_id, line.zone_id, per_cell=1.5
-            )
-            if line.pick_seconds is None:
-                sku_obj = state.skus[line.sku]
-                line.pick_seconds = sku_obj.base_pick_sec * line.qty
+    for worker in idle_workers:
+        window = _take_window(waves, look_ahead, status_of)
+        if not window:
+            break
+        if len(window) == 1:
+            best = 0
         else:
-            travel_sec = compute_travel_seconds(
-                state, worker.current_zone_id, line.zone_id, per_cell=1.5
-            )
-            if line.pick_seconds is None:
-                line.pick_seconds = line.work_seconds_needed
-
-        line.travel_seconds = int(travel_sec)
-        if line.work_seconds_needed is None:
-            line.work_seconds_needed = line.pick_seconds + line.travel_seconds
-
-        # ---------- записываем назначение ----------
-        line.status              = "assigned"
-        line.assigned_worker_id  = worker.id
-        line.assign_time         = state.sim_time
-
-        worker.travel_remaining  = travel_sec
-        worker.pick_remaining    = line.pick_seconds
-        worker.phase             = "travel"
-        worker.state             = "moving"
-        worker.assigned_line_id  = line.id
-        worker.progress_seconds  = 0.0
-
-        assigned += 1
+            cand = [lines[lid] for lid, _ in window]
+            best = int(np.argmin(_cost_matrix(state, [worker], cand, travel)[0]))
+        _return_window(waves, window[:best] + window[best + 1:])
+        line = lines[window[best][0]]
+        key = (worker.current_zone_id, line.zone_id)
+        if key not in travel:
+            travel[key] = compute_travel_seconds(state, key[0], key[1], per_cell=1.5)
+        _assign(state, worker, line, travel[key])
+        assigned.append(worker)
+
+    return assigned
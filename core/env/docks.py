@@ -0,0 +1,170 @@
+# core/env/docks.py
+"""
+Док‑станции: ворота, очереди фур, занятость.
+
+Ворота строятся из зон layout.yaml типа dock_in / dock_out: capacity
+зоны = число ворот (DOCK_IN с capacity 2 → DOCK_IN_1, DOCK_IN_2).
+Фура приезжает в зону дока (inbound‑поставка клиента → DOCK_IN,
+закрытая волна → DOCK_OUT) и встаёт на свободные ворота этой зоны
+или в её очередь.
+
+Структуры:
+• free[zone]  – min‑куча номеров свободных ворот (берём с меньшим);
+• queue[zone] – deque фур (FIFO, popleft за O(1));
+• busy        – min‑куча (busy_until, seq, dock_id): освобождение и
+  старт следующей фуры — O(log n), без обхода всех ворот за тик;
+• счётчики busy_count / queued / сумма busy_until и интеграл занятости
+  (ворота·сек) — dock_queue, dock_busy_sec и dock_util за окно считаются
+  за O(1) / O(log n) при любом числе ворот. Отметки интеграла (marks)
+  пишутся только при смене busy_count; старше retention_s (как у
+  KpiBuckets — metrics.window_horizon_seconds) выбрасываются; окно,
+  начатое раньше старейшей отметки, усредняется с неё (окно от 0 —
+  точно за весь прогон).
+"""
+from __future__ import annotations
+import bisect, heapq
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .models import Dock, Zone
+
+_DOCK_KINDS = {"dock_in": "inbound", "dock_out": "outbound"}
+# те же значения, что docks.* в config/sim_params.yaml
+DEFAULT_SERVICE_S = {"inbound": 100, "outbound": 600}
+
+
+class DockYard:
+    def __init__(self, zones: Dict[str, Zone], cfg: Optional[dict] = None,
+                 retention_s: Optional[int] = None):
+        cfg = cfg or {}
+        self.retention_s = retention_s
+        self.docks: Dict[str, Dock] = {}
+        self.free: Dict[str, List[Tuple[int, str]]] = {}
+        self.queue: Dict[str, Deque[Tuple[str, int]]] = {}
+        self.busy: List[Tuple[int, int, str]] = []
+        self._door: Dict[str, int] = {}            # dock_id → номер ворот в зоне
+        self.service_s = {
+            kind: cfg.get(f"{kind}_service_seconds", default)
+            for kind, default in DEFAULT_SERVICE_S.items()
+        }
+        for z in zones.values():
+            kind = _DOCK_KINDS.get(z.type)
+            if kind is None:
+                continue
+            self.free[z.id] = []
+            self.queue[z.id] = deque()
+            for n in range(max(1, int(z.capacity))):
+                dock = Dock(id=f"{z.id}_{n + 1}", kind=kind, zone_id=z.id,
+                            service_seconds=self.service_s[kind])
+                self.docks[dock.id] = dock
+                self._door[dock.id] = n
+                self.free[z.id].append((n, dock.id))
+
+        self._seq = 0
+        self._trucks = 0
+        self.busy_count = 0
+        self.queued = 0
+        self.arrived = 0
+        self._busy_until_sum = 0
+        # интеграл занятости: (t, ворота·сек к моменту t, busy_count после t)
+        self._area = 0
+        self._area_t = 0
+        self.marks: List[Tuple[int, int, int]] = [(0, 0, 0)]
+
+    # ---------- интеграл занятости ----------
+    def _touch(self, now: int):
+        self._area += self.busy_count * (now - self._area_t)
+        self._area_t = now
+
+    def _mark(self, now: int):
+        marks = self.marks
+        if marks[-1][2] == self.busy_count:
+            return                                   # интеграл идёт той же прямой
+        if marks[-1][0] == now:
+            marks[-1] = (now, self._area, self.busy_count)
+        else:
+            marks.append((now, self._area, self.busy_count))
+        if self.retention_s is not None:
+            self._trim(now - self.retention_s)
+
+    def _trim(self, horizon: int):
+        # последняя отметка не позже горизонта остаётся базой интеграла
+        i = bisect.bisect_right(self.marks, (horizon, float("inf"), 0)) - 1
+        if i > 1024 or (i > 0 and i * 2 > len(self.marks)):
+            del self.marks[:i]
+
+    def busy_area(self, t: int) -> int:
+        """Ворота·секунды занятости на отрезке [0, t] (t не раньше горизонта хранения)."""
+        if t <= 0:
+            return 0
+        i = bisect.bisect_right(self.marks, (t, float("inf"), 0)) - 1
+        mt, area, busy = self.marks[max(i, 0)]
+        return area + busy * (max(t, mt) - mt)
+
+    # ---------- фуры ----------
+    def arrive(self, zone_id: str, now: int, ref: str | None = None) -> Optional[str]:
+        """Фура в зону дока; сразу на ворота, если есть свободные. None — зона не док."""
+        if zone_id not in self.queue:
+            return None
+        self._trucks += 1
+        self.arrived += 1
+        truck_id = f"T{self._trucks}" + (f":{ref}" if ref else "")
+        if self.free[zone_id]:
+            self._touch(now)
+            self._start(zone_id, truck_id, now)
+            self._mark(now)
+        else:
+            self.queue[zone_id].append((truck_id, now))
+            self.queued += 1
+        return truck_id
+
+    def _start(self, zone_id: str, truck_id: str, now: int):
+        _, dock_id = heapq.heappop(self.free[zone_id])
+        dock = self.docks[dock_id]
+        dock.status = "busy"
+        dock.truck_id = truck_id
+        dock.busy_until = now + dock.service_seconds
+        self._seq += 1
+        heapq.heappush(self.busy, (dock.busy_until, self._seq, dock_id))
+        self.busy_count += 1
+        self._busy_until_sum += dock.busy_until
+
+    def process(self, now: int):
+        """Освобождаем ворота с busy_until ≤ now и ставим на них фуры из очереди."""
+        busy = self.busy
+        if not busy or busy[0][0] > now:
+            return
+        self._touch(now)
+        while busy and busy[0][0] <= now:
+            until, _, dock_id = heapq.heappop(busy)
+            dock = self.docks[dock_id]
+            dock.status = "free"
+            dock.truck_id = None
+            self.busy_count -= 1
+            self._busy_until_sum -= until
+            zone_q = self.queue[dock.zone_id]
+            heapq.heappush(self.free[dock.zone_id], (self._door[dock_id], dock_id))
+            if zone_q:
+                truck_id, _ = zone_q.popleft()
+                self.queued -= 1
+                self._start(dock.zone_id, truck_id, now)
+        self._mark(now)
+
+    def next_release(self) -> Optional[int]:
+        return self.busy[0][0] if self.busy else None
+
+    # ---------- метрики ----------
+    def busy_seconds_left(self, now: int) -> int:
+        """Сколько ещё заняты все ворота суммарно, сек."""
+        return max(0, self._busy_until_sum - self.busy_count * now)
+
+    def utilization(self, start: int, end: int) -> float:
+        """Средняя доля занятых ворот на [start, end] (в точке — текущая)."""
+        doors = len(self.docks)
+        if not doors:
+            return 0.0
+        if 0 < start < self.marks[0][0]:
+            start = min(self.marks[0][0], end)       # глубже горизонта интеграла нет
+        if end <= start:
+            return self.busy_count / doors
+        return (self.busy_area(end) - self.busy_area(start)) / (doors * (end - start))
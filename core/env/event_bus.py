@@ -1,228 +1,149 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
-from typing import List, Dict, Any
-import itertools, csv, os
-from enum import Enum, auto
-from .models import OrderLine
-from .travel import compute_travel_seconds
-from .putaway import choose_zone
-
-_event_id_counter = itertools.count(1)
-
-
-class EventType(Enum):
-    OUTBOUND_REQUEST = auto()
-    INBOUND_ARRIVAL_ACTUAL = auto()
-    EMERGENCY_ACTION = auto()
-    OUTBOUND_REJECTED = auto()
-    CONFIG_PATCH = auto()
-
-
-@dataclass
-class Event:
-    ts: int
-    source: str
-    type: EventType
-    payload: dict
-
-def next_event_id() -> str:
-    return f"E{next(_event_id_counter)}"
-
-@dataclass
-class ProposedEvent:
-    id: str
-    time: int
-    source: str          # "client_gen" | "emergency" | "disruptor" | ...
-    type: str            # "OutboundRequest" | "EmergencyAction" | ...
-    payload: Dict[str, Any]
-
-@dataclass
-class ValidatedEvent:
-    id: str
-    proposed_id: str
-    time: int
-    type: str
-    source: str
-    classification: str      # "ok" | "flag" | "reject"
-    norm: Dict[str, Any]
-    reason: str | None = None
-
-@dataclass
-class AppliedEvent:
-    id: str
-    validated_id: str
-    time: int
-    type: str
-    effects: List[Dict[str, Any]]
+from typing import List, Dict, Any, Deque, Tuple
+from collections import Counter, deque
+from .events import (
+    EventType, Event, ProposedEvent, ValidatedEvent, AppliedEvent,
+    next_event_id, resolve_event_type,
+)
+from .event_handlers import HANDLERS, DEFAULT_HANDLER, EventHandler
+from .event_log import make_event_log, NullEventLog
+from .kpi import record_rejected
+
+
+def _runs_by_type(events) -> List[Tuple[str, list]]:
+    """
+    Пачки — подряд идущие события одного типа. Порядок публикации
+    сохраняется: InboundArrival между двумя OutboundRequest применится
+    между ними (от этого зависят резервы и отказы по остатку).
+    """
+    runs: List[Tuple[str, list]] = []
+    for ev in events:
+        if runs and runs[-1][0] == ev.type:
+            runs[-1][1].append(ev)
+        else:
+            runs.append((ev.type, [ev]))
+    return runs
 
 class EventBus:
     """
     Минимальная реализация событийного конвейера.
+    Журнал пишется через буферизованный приёмник (см. core.env.event_log);
+    close() или ``with EventBus(...)`` сбрасывает буфер на диск.
+
+    validated / applied — кольцевые буферы: храним последние
+    ``max_events`` событий и/или события не старше ``max_age_s`` сим‑секунд.
+    Более старые уже лежат в журнале и просто отбрасываются; счётчики
+    по типу/классификации ведутся за всю историю.
     """
-    def __init__(self, log_path: str = "events.csv"):
+    def __init__(self, log_path: str = "events.csv", log_cfg: dict | None = None,
+                 history_cfg: dict | None = None):
+        history_cfg = history_cfg or {}
+        self.max_events: int | None = history_cfg.get("max_events")
+        self.max_age_s: int | None = history_cfg.get("max_age_s")
+
         self.proposed: List[ProposedEvent] = []
-        self.validated: List[ValidatedEvent] = []
+        self.validated: Deque[ValidatedEvent] = deque(maxlen=self.max_events)
         self.to_apply: List[ValidatedEvent] = []
-        self.applied: List[AppliedEvent] = []
-        self._log_path = log_path
-        self._init_log()
-
-    def _init_log(self):
-        if not os.path.exists(self._log_path):
-            with open(self._log_path, "w", newline="", encoding="utf-8") as f:
-                w = csv.writer(f)
-                w.writerow(["phase","sim_time","event_id","type","source","classification","reason","payload_summary"])
+        self.applied: Deque[AppliedEvent] = deque(maxlen=self.max_events)
+        self.validated_counts: Counter = Counter()   # (type, classification) -> n
+        self.applied_counts: Counter = Counter()     # type -> n
+        self._log = make_event_log(log_cfg, default_path=log_path)
+        self.handlers: Dict[EventType, EventHandler] = dict(HANDLERS)
+
+    def register_handler(self, handler: EventHandler):
+        """Подключить/заменить обработчик только для этой шины."""
+        self.handlers[handler.event_type] = handler
+
+    def _handler(self, type_name: str) -> EventHandler:
+        et = resolve_event_type(type_name)
+        return self.handlers.get(et, DEFAULT_HANDLER) if et else DEFAULT_HANDLER
+
+    def _trim_history(self, now: int):
+        if self.max_age_s is None:
+            return
+        horizon = now - self.max_age_s
+        for hist in (self.validated, self.applied):
+            while hist and hist[0].time < horizon:
+                hist.popleft()
+
+    def history_stats(self) -> Dict[str, Dict[str, int]]:
+        """Счётчики за весь прогон (не зависят от глубины буферов)."""
+        return {
+            "validated": {f"{t}:{c}": n for (t, c), n in self.validated_counts.items()},
+            "applied": dict(self.applied_counts),
+        }
 
     def _append_log(self, phase: str, ev_time: int, ev_id: str, type_: str,
                     source: str, classification: str, reason: str | None, payload: Dict[str, Any]):
-        summary = ";".join(f"{k}={v}" for k,v in list(payload.items())[:6])
-        with open(self._log_path, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow([phase, ev_time, ev_id, type_, source, classification, reason or "", summary])
+        self._log.write(phase, ev_time, ev_id, type_, source, classification, reason, payload)
+
+    # ---------- pickle (чекпоинты) ----------
+    def __getstate__(self):
+        # файловый приёмник не сериализуем: в клоне журнал выключен
+        state = self.__dict__.copy()
+        state["_log"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.detach_log()
+
+    def detach_log(self):
+        """Отключить журнал без сброса буфера (форк не должен писать в файл родителя)."""
+        self._log = NullEventLog()
+
+    def set_log(self, log_cfg: dict | None, default_path: str = "events.csv"):
+        self._log.close()
+        self._log = make_event_log(log_cfg, default_path=default_path)
+
+    def flush_log(self):
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     # ---------- Publish ----------
-    def publish(self, source: str, type_: str, payload: Dict[str, Any], sim_time: int) -> ProposedEvent:
+    def publish(self, source: str, type_: EventType | str, payload: Dict[str, Any], sim_time: int) -> ProposedEvent:
+        if isinstance(type_, EventType):
+            type_ = type_.value
         pe = ProposedEvent(id=next_event_id(), time=sim_time, source=source, type=type_, payload=payload)
         self.proposed.append(pe)
         self._append_log("proposed", sim_time, pe.id, pe.type, pe.source, "", "", payload)
         return pe
 
     # ---------- Validate ----------
-    def validate_cycle(self):
+    def validate_cycle(self, state=None):
+        """Валидация предложенных событий; отказы учитываются в state.metrics (если передан)."""
         if not self.proposed:
             return
-        for pe in self.proposed:
-            ve = self._validate_one(pe)
-            self.validated.append(ve)
-            if ve.classification != "reject":
-                self.to_apply.append(ve)
-            self._append_log("validated", ve.time, ve.id, ve.type, ve.source, ve.classification, ve.reason, ve.norm)
+        for type_name, batch in _runs_by_type(self.proposed):
+            for ve in self._handler(type_name).validate_batch(batch):
+                self.validated.append(ve)
+                self.validated_counts[(ve.type, ve.classification)] += 1
+                if ve.classification != "reject":
+                    self.to_apply.append(ve)
+                elif state is not None:
+                    record_rejected(state.metrics, ve.time)
+                self._append_log("validated", ve.time, ve.id, ve.type, ve.source, ve.classification, ve.reason, ve.norm)
+        self._trim_history(self.proposed[-1].time)
         self.proposed.clear()
 
-    def _validate_one(self, pe: ProposedEvent) -> ValidatedEvent:
-        p = dict(pe.payload)  # копия
-        t = pe.type
-        # Примитивные проверки
-        if t == "OutboundRequest":
-            # обязательные поля
-            for field in ("client_id","sku_id","qty"):
-                if field not in p:
-                    return ValidatedEvent(
-                        id=pe.id, proposed_id=pe.id, time=pe.time, type=t, source=pe.source,
-                        classification="reject", norm={}, reason=f"missing {field}"
-                    )
-            qty = p["qty"]
-            if qty <= 0:
-                return ValidatedEvent(pe.id, pe.id, pe.time, t, pe.source, "reject", {}, "qty<=0")
-            classification = "ok"
-            return ValidatedEvent(pe.id, pe.id, pe.time, t, pe.source, classification, p, None)
-
-        if t == "EmergencyAction":
-            # просто пропускаем
-            return ValidatedEvent(pe.id, pe.id, pe.time, t, pe.source, "ok", p, None)
-
-        # default pass-through
-        return ValidatedEvent(pe.id, pe.id, pe.time, t, pe.source, "ok", p, None)
-
     # ---------- Apply ----------
     def apply_cycle(self, state):
         if not self.to_apply:
             return
-        for ve in self.to_apply:
-            effects = self._apply_one(ve, state)
-            ae = AppliedEvent(id=ve.id, validated_id=ve.id, time=state.sim_time, type=ve.type, effects=effects)
-            self.applied.append(ae)
-            self._append_log("applied", state.sim_time, ve.id, ve.type, ve.source, "", "", {"effects": len(effects)})
+        for type_name, batch in _runs_by_type(self.to_apply):
+            results = self._handler(type_name).apply_batch(self, state, batch)
+            for ve, effects in zip(batch, results):
+                ae = AppliedEvent(id=ve.id, validated_id=ve.id, time=state.sim_time, type=ve.type, effects=effects)
+                self.applied.append(ae)
+                self.applied_counts[ae.type] += 1
+                self._append_log("applied", state.sim_time, ve.id, ve.type, ve.source, "", "", {"effects": len(effects)})
         self.to_apply.clear()
-
-    def _apply_one(self, ve: ValidatedEvent, state):
-            """
-            Применяем события к состоянию.
-            • OutboundRequest  – отдаём товар в пределах остатка, лишнее отклоняем.
-            • InboundArrivalActual – пополняем запас.
-            • EmergencyAction – только логируем (уже обработано самим агентом).
-            """
-            t = ve.type
-            p = ve.norm
-            effects: List[Dict[str, Any]] = []
-
-            # ---------- 1. OUTBOUND ----------
-            if t == "OutboundRequest":
-                client_id = p["client_id"]
-                sku_id    = p["sku_id"]
-                req_qty   = p["qty"]
-
-                # ------------- остаток клиента -------------
-                stock = state.stock[client_id].get(sku_id, 0)
-
-                served_qty   = min(req_qty, stock)
-                rejected_qty = req_qty - served_qty
-
-                if served_qty > 0:
-                    state.stock[client_id][sku_id] = stock - served_qty
-
-                    # ------ выбираем зону через put‑away ------
-                    sku_obj   = state.skus[sku_id]
-                    zone_id   = choose_zone(sku_obj, served_qty, state).id
-                    pick_base = sku_obj.base_pick_sec
-                    pick_sec   = pick_base * served_qty
-                    travel_sec = compute_travel_seconds(state, "DOCK_OUT", zone_id, per_cell=1.5)
-                    work_total = pick_sec + travel_sec
-
-                    line_id = f"L{len(state.order_lines)+1}"
-                    line = OrderLine(
-                        id=line_id,
-                        client_id=client_id,
-                        sku=sku_id,
-                        qty=served_qty,
-                        zone_id=zone_id,
-                        created_time=state.sim_time,
-                        deadline_time=state.sim_time + 7200,
-                        line_type="outbound",
-                        work_seconds_needed=work_total,
-                        pick_seconds=pick_sec,
-                        travel_seconds=travel_sec
-                    )
-                    state.order_lines[line_id] = line
-                    effects.append({"created_line": line_id, "served_qty": served_qty})
-
-                if rejected_qty > 0:
-                    self.publish(
-                        source="system",
-                        type_="OutboundRejected",
-                        payload={
-                            "client_id": client_id,
-                            "sku_id":    sku_id,
-                            "qty":       rejected_qty,
-                            "reason":    "insufficient_stock"
-                        },
-                        sim_time=state.sim_time
-                    )
-                    # для метрик «stock‑outs»
-                    state.metrics.stockouts = getattr(state.metrics, "stockouts", 0) + rejected_qty
-                    effects.append({"rejected_qty": rejected_qty})
-                return effects
-
-            # ---------- 2. INBOUND ----------
-            if t == "InboundArrivalActual":
-                client_id  = p["client_id"]
-                sku_id     = p["sku_id"]
-                delivered  = p["delivered_qty"]
-
-                prev = state.stock[client_id].get(sku_id, 0)
-                state.stock[client_id][sku_id] = prev + delivered
-                effects.append({
-                    "inbound_added": delivered,
-                    "client": client_id,
-                    "sku": sku_id,
-                    "new_stock": state.stock[client_id][sku_id]
-                })
-                return effects
-
-            # ---------- 3. EmergencyAction (сплит и т.д.) ----------
-            if t == "EmergencyAction":
-                effects.append({"ack": ve.id})
-                return effects
-
-            # ---------- default ----------
-            return effects
\ No newline at end of file
+        self._trim_history(state.sim_time)
@@ -0,0 +1,290 @@
+# core/env/event_handlers.py
+"""
+Реестр обработчиков EventBus по EventType.
+
+Обработчик получает за цикл сразу все события своего типа:
+``validate_batch`` превращает payload в типизированную структуру
+(без копий dict), ``apply_batch`` применяет пачку к состоянию.
+Новый тип (emergency‑агент, патчи конфига, …) подключается через
+``@register_handler`` или ``EventBus.register_handler`` — шину
+править не нужно.
+"""
+from __future__ import annotations
+import math
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Tuple, Union, get_args, get_origin, get_type_hints
+
+from .events import EventType, ProposedEvent, ValidatedEvent
+from .models import OrderLine, LiveConfig
+from .travel import compute_travel_seconds
+from .putaway import choose_zone
+from .line_index import register_line, next_line_id
+from .kpi import record_rejected
+from .dispatcher_heuristic import DISPATCH_BACKENDS
+
+Effects = List[Dict[str, Any]]
+
+
+# ---------- payload‑структуры ----------
+@dataclass(slots=True)
+class OutboundRequestPayload:
+    client_id: str
+    sku_id: str
+    qty: int
+
+
+@dataclass(slots=True)
+class InboundArrivalPayload:
+    client_id: str
+    sku_id: str
+    delivered_qty: int
+    zone_id: str | None = None
+
+
+@dataclass(slots=True)
+class ConfigPatchPayload:
+    key: str
+    value: Any                  # приведён к типу поля LiveConfig
+
+
+def _ok(pe: ProposedEvent, norm: Any) -> ValidatedEvent:
+    return ValidatedEvent(pe.id, pe.id, pe.time, pe.type, pe.source, "ok", norm, None)
+
+
+def _reject(pe: ProposedEvent, reason: str) -> ValidatedEvent:
+    return ValidatedEvent(pe.id, pe.id, pe.time, pe.type, pe.source, "reject", {}, reason)
+
+
+def _missing(payload: Dict[str, Any], required: tuple[str, ...]) -> str | None:
+    for name in required:
+        if name not in payload:
+            return name
+    return None
+
+
+# ---------- база и реестр ----------
+class EventHandler:
+    """По умолчанию: пропускаем payload как есть, к состоянию ничего не применяем."""
+    event_type: EventType | None = None
+
+    def validate_batch(self, events: List[ProposedEvent]) -> List[ValidatedEvent]:
+        return [_ok(pe, pe.payload) for pe in events]
+
+    def apply_batch(self, bus, state, events: List[ValidatedEvent]) -> List[Effects]:
+        return [[] for _ in events]
+
+
+HANDLERS: Dict[EventType, EventHandler] = {}
+DEFAULT_HANDLER = EventHandler()
+
+
+def register_handler(cls):
+    """Декоратор класса: регистрирует экземпляр под cls.event_type."""
+    HANDLERS[cls.event_type] = cls()
+    return cls
+
+
+# ---------- OutboundRequest ----------
+@register_handler
+class OutboundRequestHandler(EventHandler):
+    """Отдаём товар в пределах остатка клиента (inventory.reserve_batch), лишнее — OutboundRejected."""
+    event_type = EventType.OUTBOUND_REQUEST
+
+    def validate_batch(self, events):
+        out = []
+        for pe in events:
+            p = pe.payload
+            missing = _missing(p, ("client_id", "sku_id", "qty"))
+            if missing:
+                out.append(_reject(pe, f"missing {missing}"))
+            elif p["qty"] <= 0:
+                out.append(_reject(pe, "qty<=0"))
+            else:
+                out.append(_ok(pe, OutboundRequestPayload(p["client_id"], p["sku_id"], p["qty"])))
+        return out
+
+    def apply_batch(self, bus, state, events):
+        # ------------- списываем остатки всей пачкой -------------
+        inv = state.inventory
+        payloads: List[OutboundRequestPayload] = [ve.norm for ve in events]
+        served = inv.reserve_batch(
+            [inv.client(p.client_id) for p in payloads],
+            [inv.sku(p.sku_id) for p in payloads],
+            [p.qty for p in payloads],
+        ).tolist()
+
+        results: List[Effects] = []
+        for p, served_qty in zip(payloads, served):
+            effects: Effects = []
+            rejected_qty = p.qty - served_qty
+
+            if served_qty > 0:
+                # ------ выбираем зону через put‑away ------
+                sku_obj = state.skus[p.sku_id]
+                zone_id = choose_zone(sku_obj, served_qty, state).id
+                pick_sec = sku_obj.base_pick_sec * served_qty
+                travel_sec = compute_travel_seconds(state, "DOCK_OUT", zone_id, per_cell=1.5)
+
+                line_id = next_line_id(state)
+                register_line(state, OrderLine(
+                    id=line_id,
+                    client_id=p.client_id,
+                    sku=p.sku_id,
+                    qty=served_qty,
+                    zone_id=zone_id,
+                    created_time=state.sim_time,
+                    deadline_time=state.sim_time + 7200,
+                    line_type="outbound",
+                    work_seconds_needed=pick_sec + travel_sec,
+                    pick_seconds=pick_sec,
+                    travel_seconds=travel_sec,
+                ))
+                effects.append({"created_line": line_id, "served_qty": served_qty})
+
+            if rejected_qty > 0:
+                bus.publish(
+                    source="system",
+                    type_=EventType.OUTBOUND_REJECTED,
+                    payload={
+                        "client_id": p.client_id,
+                        "sku_id":    p.sku_id,
+                        "qty":       rejected_qty,
+                        "reason":    "insufficient_stock",
+                    },
+                    sim_time=state.sim_time,
+                )
+                # для метрик «stock‑outs»
+                state.metrics.stockouts = getattr(state.metrics, "stockouts", 0) + rejected_qty
+                record_rejected(state.metrics, state.sim_time)
+                effects.append({"rejected_qty": rejected_qty})
+            results.append(effects)
+        return results
+
+
+# ---------- InboundArrivalActual ----------
+@register_handler
+class InboundArrivalHandler(EventHandler):
+    """Пополняем запас клиента."""
+    event_type = EventType.INBOUND_ARRIVAL_ACTUAL
+
+    def validate_batch(self, events):
+        out = []
+        for pe in events:
+            p = pe.payload
+            missing = _missing(p, ("client_id", "sku_id", "delivered_qty"))
+            if missing:
+                out.append(_reject(pe, f"missing {missing}"))
+            else:
+                out.append(_ok(pe, InboundArrivalPayload(
+                    p["client_id"], p["sku_id"], p["delivered_qty"], p.get("zone_id"))))
+        return out
+
+    def apply_batch(self, bus, state, events):
+        results: List[Effects] = []
+        inv = state.inventory
+        payloads: List[InboundArrivalPayload] = [ve.norm for ve in events]
+        new_stock = inv.release_batch(
+            [inv.client(p.client_id) for p in payloads],
+            [inv.sku(p.sku_id) for p in payloads],
+            # без зоны назначения товар числится во входном доке
+            [inv.zone(p.zone_id or "DOCK_IN") for p in payloads],
+            [p.delivered_qty for p in payloads],
+        ).tolist()
+        for p, stock in zip(payloads, new_stock):
+            results.append([{
+                "inbound_added": p.delivered_qty,
+                "client": p.client_id,
+                "sku": p.sku_id,
+                "new_stock": stock,
+            }])
+        return results
+
+
+# ---------- EmergencyAction ----------
+@register_handler
+class EmergencyActionHandler(EventHandler):
+    """Только подтверждаем (действие уже выполнено самим агентом)."""
+    event_type = EventType.EMERGENCY_ACTION
+
+    def apply_batch(self, bus, state, events):
+        return [[{"ack": ve.id}] for ve in events]
+
+
+# ---------- ConfigPatch ----------
+def _live_types() -> Dict[str, Tuple[type, bool]]:
+    """Поле LiveConfig → (базовый тип, допускает ли None)."""
+    hints = get_type_hints(LiveConfig)
+    out = {}
+    for f in fields(LiveConfig):
+        tp = hints[f.name]
+        args = get_args(tp)
+        optional = get_origin(tp) is Union and type(None) in args
+        if optional:
+            tp = next(a for a in args if a is not type(None))
+        out[f.name] = (tp, optional)
+    return out
+
+
+_LIVE_TYPES = _live_types()
+_LIVE_KEYS = set(_LIVE_TYPES)
+# допустимые значения строковых полей
+_LIVE_CHOICES = {"dispatcher_backend": DISPATCH_BACKENDS}
+
+
+def coerce_live_value(key: str, value: Any) -> Any:
+    """Значение патча → тип поля LiveConfig; ValueError / TypeError — не подходит."""
+    tp, optional = _LIVE_TYPES[key]
+    if value is None:
+        if not optional:
+            raise TypeError(f"{key} must not be None")
+        return None
+    if isinstance(value, bool):
+        raise TypeError(f"{key}: bool is not a {tp.__name__}")
+    if tp is int:
+        f = float(value)
+        if not f.is_integer():
+            raise ValueError(f"{key} must be an integer, got {value!r}")
+        return int(f)
+    if tp is float:
+        f = float(value)
+        if not math.isfinite(f):
+            raise ValueError(f"{key} must be finite")
+        return f
+    if tp is str:
+        if not isinstance(value, str):
+            raise TypeError(f"{key} must be a string")
+        choices = _LIVE_CHOICES.get(key)
+        if choices is not None and value not in choices:
+            raise ValueError(f"{key} must be one of {choices}")
+        return value
+    raise TypeError(f"{key}: unsupported field type {tp!r}")
+
+
+@register_handler
+class ConfigPatchHandler(EventHandler):
+    """Патч одного поля state.live_config: payload {"key": ..., "value": ...}."""
+    event_type = EventType.CONFIG_PATCH
+
+    def validate_batch(self, events):
+        out = []
+        for pe in events:
+            p = pe.payload
+            missing = _missing(p, ("key", "value"))
+            if missing:
+                out.append(_reject(pe, f"missing {missing}"))
+            elif p["key"] not in _LIVE_KEYS:
+                out.append(_reject(pe, f"unknown key {p['key']}"))
+            else:
+                try:
+                    out.append(_ok(pe, ConfigPatchPayload(p["key"], coerce_live_value(p["key"], p["value"]))))
+                except (TypeError, ValueError):
+                    out.append(_reject(pe, f"bad value for {p['key']}"))
+        return out
+
+    def apply_batch(self, bus, state, events):
+        results: List[Effects] = []
+        for ve in events:
+            p: ConfigPatchPayload = ve.norm
+            setattr(state.live_config, p.key, p.value)
+            results.append([{"live_config": p.key, "value": p.value}])
+        return results
@@ -0,0 +1,242 @@
+# core/env/event_log.py
+"""
+Приёмники журнала событий EventBus.
+
+• CsvEventLog    – events.csv как раньше, но через буфер и с ротацией;
+• BinaryEventLog – компактный бинарный формат (строки интернируются);
+• NullEventLog   – журнал выключен (бенчмарки).
+
+Буфер сбрасывается по числу строк, по wall‑clock интервалу, при
+ротации и в close(). Ротация: по размеру файла и/или по сим‑времени,
+старые файлы переименовываются в <path>.1 … <path>.N.
+"""
+from __future__ import annotations
+import csv, io, os, struct, time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List
+
+LOG_HEADER = ["phase", "sim_time", "event_id", "type", "source",
+              "classification", "reason", "payload_summary"]
+
+_BIN_MAGIC = b"SWEVT2\n"
+_TAG_STR = 0
+_TAG_REC = 1
+_STR = struct.Struct("<BII")            # tag, string id, byte length
+_REC = struct.Struct("<BqQIIIIII")      # tag, sim_time, event num, 5 string ids, len(summary)
+# v1: id строк uint16 — переполнялся на 65 536‑й строке; только чтение
+_V1_MAGIC = b"SWEVT1\n"
+_V1_STR = struct.Struct("<BHH")
+_V1_REC = struct.Struct("<BqQHHHHHI")
+
+
+def payload_summary(payload: Any) -> str:
+    if not isinstance(payload, dict):      # payload‑структура обработчика
+        payload = {f: getattr(payload, f) for f in payload.__dataclass_fields__}
+    return ";".join(f"{k}={v}" for k, v in list(payload.items())[:6])
+
+
+class NullEventLog:
+    enabled = False
+
+    def write(self, phase: str, ev_time: int, ev_id: str, type_: str, source: str,
+              classification: str, reason: str | None, payload: Dict[str, Any]) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _BufferedEventLog(NullEventLog, ABC):
+    """Общая часть: буфер, интервал сброса и ротация."""
+    enabled = True
+    binary = False
+
+    def __init__(self, path: str, buffer_rows: int = 5000, flush_interval_s: float = 5.0,
+                 max_bytes: int | None = None, rotate_sim_seconds: int | None = None,
+                 backup_count: int = 5):
+        self.path = path
+        self.buffer_rows = max(1, buffer_rows)
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.rotate_sim_seconds = rotate_sim_seconds
+        self.backup_count = backup_count
+        self._rows: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._segment_start: int | None = None
+        self._f = None
+        self._open()
+
+    # ---------- файл ----------
+    def _open(self):
+        fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._f = open(self.path, "ab" if self.binary else "a",
+                       **({} if self.binary else {"newline": "", "encoding": "utf-8"}))
+        self._start_file(fresh)
+
+    @abstractmethod
+    def _start_file(self, fresh: bool):
+        """Файл только что открыт; ``fresh`` — пустой (нужен заголовок)."""
+
+    @abstractmethod
+    def _encode(self, rows: List[tuple]):
+        """Записать буфер строк в self._f."""
+
+    def _rotate(self):
+        self._f.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    # ---------- запись ----------
+    def write(self, phase, ev_time, ev_id, type_, source, classification, reason, payload):
+        if self.rotate_sim_seconds:
+            if self._segment_start is None:
+                self._segment_start = ev_time
+            elif ev_time - self._segment_start >= self.rotate_sim_seconds:
+                self.flush()
+                self._rotate()
+                self._segment_start = ev_time
+        self._rows.append((phase, ev_time, ev_id, type_, source,
+                           classification or "", reason or "", payload_summary(payload)))
+        if (len(self._rows) >= self.buffer_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s):
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows or self._f is None:
+            return
+        self._encode(self._rows)
+        self._rows.clear()
+        self._f.flush()
+        if self.max_bytes and self._f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        if self._f is None:
+            return
+        self.flush()
+        self._f.close()
+        self._f = None
+
+
+class CsvEventLog(_BufferedEventLog):
+    def _start_file(self, fresh):
+        self._w = csv.writer(self._f)
+        if fresh:
+            self._w.writerow(LOG_HEADER)
+
+    def _encode(self, rows):
+        self._w.writerows(rows)
+
+
+class BinaryEventLog(_BufferedEventLog):
+    """
+    Формат: магия + поток записей. Повторяющиеся строки (фаза, тип,
+    источник, классификация, причина) передаются один раз
+    записью‑определением, дальше — 4‑байтовым id; payload_summary
+    пишется как есть. Читать через ``read_binary_log``.
+    """
+    binary = True
+
+    def _start_file(self, fresh):
+        # при открытии (в т.ч. дозаписи) таблица строк объявляется заново
+        self._strings: Dict[str, int] = {}
+        if fresh:
+            self._f.write(_BIN_MAGIC)
+            return
+        with open(self.path, "rb") as f:
+            magic = f.read(len(_BIN_MAGIC))
+        if magic != _BIN_MAGIC:
+            self._f.close()
+            raise ValueError(f"{self.path}: not a {_BIN_MAGIC.strip().decode()} log, "
+                             f"cannot append (move the old file away)")
+
+    def _sid(self, out: io.BytesIO, s: str) -> int:
+        sid = self._strings.get(s)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings[s] = sid
+            raw = s.encode("utf-8")
+            out.write(_STR.pack(_TAG_STR, sid, len(raw)))
+            out.write(raw)
+        return sid
+
+    def _encode(self, rows):
+        out = io.BytesIO()
+        for phase, ev_time, ev_id, type_, source, cls, reason, summary in rows:
+            num = int(ev_id[1:]) if ev_id[1:].isdigit() else 0
+            ids = [self._sid(out, s) for s in (phase, type_, source, cls, reason)]
+            raw = summary.encode("utf-8")
+            out.write(_REC.pack(_TAG_REC, ev_time, num, *ids, len(raw)))
+            out.write(raw)
+        self._f.write(out.getvalue())
+
+
+def read_binary_log(path: str) -> Iterator[Dict[str, Any]]:
+    """Декодируем файл BinaryEventLog в словари с колонками LOG_HEADER."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(_BIN_MAGIC):
+        str_s, rec_s = _STR, _REC
+    elif data.startswith(_V1_MAGIC):
+        str_s, rec_s = _V1_STR, _V1_REC
+    else:
+        raise ValueError(f"{path}: not a binary event log")
+    strings: Dict[int, str] = {}
+    pos = len(_BIN_MAGIC)
+    while pos < len(data):
+        tag = data[pos]
+        if tag == _TAG_STR:
+            _, sid, n = str_s.unpack_from(data, pos)
+            pos += str_s.size
+            strings[sid] = data[pos:pos + n].decode("utf-8")
+            pos += n
+        elif tag == _TAG_REC:
+            _, ev_time, num, *ids, n = rec_s.unpack_from(data, pos)
+            pos += rec_s.size
+            phase, type_, source, cls, reason = (strings[i] for i in ids)
+            summary = data[pos:pos + n].decode("utf-8")
+            pos += n
+            yield {
+                "phase": phase, "sim_time": ev_time, "event_id": f"E{num}",
+                "type": type_, "source": source, "classification": cls,
+                "reason": reason, "payload_summary": summary,
+            }
+        else:
+            raise ValueError(f"{path}: corrupt record at byte {pos}")
+
+
+def make_event_log(cfg: dict | None, default_path: str = "events.csv"):
+    """Фабрика по секции ``event_log`` из sim_params.yaml."""
+    cfg = cfg or {}
+    fmt = cfg.get("format", "csv")
+    if fmt == "none":
+        return NullEventLog()
+    kwargs = dict(
+        buffer_rows=cfg.get("buffer_rows", 5000),
+        flush_interval_s=cfg.get("flush_interval_s", 5.0),
+        max_bytes=cfg.get("max_bytes"),
+        rotate_sim_seconds=cfg.get("rotate_sim_seconds"),
+        backup_count=cfg.get("backup_count", 5),
+    )
+    if fmt == "bin":
+        return BinaryEventLog(cfg.get("path", "events.bin"), **kwargs)
+    if fmt == "csv":
+        return CsvEventLog(cfg.get("path", default_path), **kwargs)
+    raise ValueError(f"unknown event_log format: {fmt}")
@@ -0,0 +1,72 @@
+# core/env/events.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Dict, Any
+from enum import Enum
+
+_next_event_num = 1
+
+
+class EventType(Enum):
+    """Значение = имя типа в журнале и в ProposedEvent.type."""
+    OUTBOUND_REQUEST = "OutboundRequest"
+    INBOUND_ARRIVAL_ACTUAL = "InboundArrivalActual"
+    EMERGENCY_ACTION = "EmergencyAction"
+    OUTBOUND_REJECTED = "OutboundRejected"
+    CONFIG_PATCH = "ConfigPatch"
+
+
+def resolve_event_type(name: str) -> EventType | None:
+    try:
+        return EventType(name)
+    except ValueError:
+        return None
+
+
+@dataclass
+class Event:
+    ts: int
+    source: str
+    type: EventType
+    payload: dict
+
+def next_event_id() -> str:
+    global _next_event_num
+    num = _next_event_num
+    _next_event_num += 1
+    return f"E{num}"
+
+def event_id_state() -> int:
+    """Номер следующего события (для чекпоинтов)."""
+    return _next_event_num
+
+def set_event_id_state(num: int) -> None:
+    global _next_event_num
+    _next_event_num = num
+
+@dataclass
+class ProposedEvent:
+    id: str
+    time: int
+    source: str          # "client_gen" | "emergency" | "disruptor" | ...
+    type: str            # "OutboundRequest" | "EmergencyAction" | ...
+    payload: Dict[str, Any]
+
+@dataclass
+class ValidatedEvent:
+    id: str
+    proposed_id: str
+    time: int
+    type: str
+    source: str
+    classification: str      # "ok" | "flag" | "reject"
+    norm: Any                # payload‑структура обработчика (или dict)
+    reason: str | None = None
+
+@dataclass
+class AppliedEvent:
+    id: str
+    validated_id: str
+    time: int
+    type: str
+    effects: List[Dict[str, Any]]
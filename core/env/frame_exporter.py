@@ -1,15 +1,34 @@
 import json, gzip
-from .models import WorldState
+from typing import Optional
+from .models import WorldState, Worker
+
+def _task_progress(state: WorldState, w: Worker) -> Optional[float]:
+    """Доля выполненной линии (travel + pick) по остаткам работника; None — задачи нет."""
+    line = state.order_lines.get(w.assigned_line_id) if w.assigned_line_id else None
+    if line is None:
+        return None
+    total = (line.travel_seconds or 0) + (line.pick_seconds or 0)
+    if total <= 0:
+        return 1.0
+    left = w.travel_remaining + w.pick_remaining
+    return min(1.0, max(0.0, 1 - left / total))
+
+def _worker_frame(state: WorldState, w: Worker) -> dict:
+    frame = {"id": w.id, "zone_id": w.current_zone_id, "state": w.state}
+    progress = _task_progress(state, w)
+    if progress is not None:                  # у свободных работников ключа нет
+        frame["progress"] = progress
+    return frame
 
 def snapshot(state: WorldState) -> dict:
+    """Кадр визуализатора; остатки vector/heap модели — после engine.sync_workers()."""
     return {
         "t": state.sim_time,
         "zones": {z.id: z.current_qty for z in state.zones.values()},
-        "workers": [
-            {"id": w.id, "zone_id": w.current_zone_id, "state": w.state}
-            for w in state.workers.values()
-        ],
-        "metrics": state.metrics.snapshots[-1] if state.metrics.snapshots else {}
+        "stock": state.inventory.by_client(),
+        "workers": [_worker_frame(state, w) for w in state.workers.values()],
+        # p50/p95/p99 lead time — в metrics (снимок collect_periodic); по группам — rollup
+        "metrics": state.metrics.snapshots[-1] if state.metrics.snapshots else {},
     }
 
 def dump_run(layout_cfg: dict, frames: list[dict],
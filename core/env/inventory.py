@@ -0,0 +1,166 @@
+# core/env/inventory.py
+"""
+Запас клиентов на складе: матрица client × sku × zone.
+
+ID клиентов, SKU и зон интернируются в целые индексы, количества лежат
+в плотном numpy‑массиве ``qty[c, s, z]``. Рядом поддерживается
+``totals[c, s]`` (сумма по зонам) — проверка остатка за O(1).
+
+• reserve_batch – списание сразу всех OutboundRequest цикла: результат
+  тот же, что у последовательного ``min(qty, stock)`` по событиям, но
+  одной векторной операцией; внутри пары (client, sku) товар берётся
+  из зон по порядку индексов;
+• release_batch – поступление (InboundArrivalActual) в указанные зоны;
+• by_client / by_sku / by_zone / total – снимки для метрик и кадров.
+
+Неизвестный ID (новый клиент из события, SKU вне skus.yaml) добавляется
+на лету — массив расширяется нулями.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+QTY_DTYPE = np.int64
+
+
+def _group_offsets(flat: np.ndarray, q: np.ndarray):
+    """
+    Стабильно группируем события по ключу ``flat``. Возвращает
+    (order, starts, before): перестановку, маску начала групп и сколько
+    уже запрошено предыдущими событиями той же группы (в порядке order).
+    """
+    order = np.argsort(flat, kind="stable")
+    f_sorted = flat[order]
+    q_sorted = q[order]
+    starts = np.empty(len(f_sorted), dtype=bool)
+    starts[0] = True
+    np.not_equal(f_sorted[1:], f_sorted[:-1], out=starts[1:])
+    cum_before = np.cumsum(q_sorted) - q_sorted
+    group = np.cumsum(starts) - 1
+    before = cum_before - cum_before[starts][group]
+    return order, starts, before
+
+
+class InventoryMatrix:
+    def __init__(self, client_ids: Iterable[str], sku_ids: Iterable[str], zone_ids: Iterable[str]):
+        self.client_ids: List[str] = list(client_ids)
+        self.sku_ids: List[str] = list(sku_ids)
+        self.zone_ids: List[str] = list(zone_ids)
+        self.client_index: Dict[str, int] = {cid: i for i, cid in enumerate(self.client_ids)}
+        self.sku_index: Dict[str, int] = {sid: i for i, sid in enumerate(self.sku_ids)}
+        self.zone_index: Dict[str, int] = {zid: i for i, zid in enumerate(self.zone_ids)}
+        self.qty = np.zeros((len(self.client_ids), len(self.sku_ids), len(self.zone_ids)), QTY_DTYPE)
+        self.totals = np.zeros(self.qty.shape[:2], QTY_DTYPE)
+
+    # ---------- интернирование ----------
+    def client(self, client_id: str) -> int:
+        i = self.client_index.get(client_id)
+        return self._grow(0, client_id) if i is None else i
+
+    def sku(self, sku_id: str) -> int:
+        i = self.sku_index.get(sku_id)
+        return self._grow(1, sku_id) if i is None else i
+
+    def zone(self, zone_id: str) -> int:
+        i = self.zone_index.get(zone_id)
+        return self._grow(2, zone_id) if i is None else i
+
+    def _grow(self, axis: int, new_id: str) -> int:
+        ids, index = ((self.client_ids, self.client_index),
+                      (self.sku_ids, self.sku_index),
+                      (self.zone_ids, self.zone_index))[axis]
+        i = len(ids)
+        ids.append(new_id)
+        index[new_id] = i
+        pad = [(0, 0)] * 3
+        pad[axis] = (0, 1)
+        self.qty = np.pad(self.qty, pad)
+        if axis < 2:
+            self.totals = np.pad(self.totals, pad[:2])
+        return i
+
+    # ---------- точечные операции ----------
+    def available(self, client_id: str, sku_id: str) -> int:
+        c = self.client_index.get(client_id)
+        s = self.sku_index.get(sku_id)
+        if c is None or s is None:
+            return 0
+        return int(self.totals[c, s])
+
+    def reserve(self, client_id: str, sku_id: str, qty: int) -> int:
+        """Списываем до ``qty``; возвращаем сколько реально отдали."""
+        return int(self.reserve_batch([self.client(client_id)], [self.sku(sku_id)], [qty])[0])
+
+    def release(self, client_id: str, sku_id: str, zone_id: str, qty: int) -> int:
+        """Кладём ``qty`` в зону; возвращаем новый остаток пары (client, sku)."""
+        return int(self.release_batch(
+            [self.client(client_id)], [self.sku(sku_id)], [self.zone(zone_id)], [qty])[0])
+
+    # ---------- пакетные операции (индексы, см. client/sku/zone) ----------
+    def reserve_batch(self, clients: Sequence[int], skus: Sequence[int],
+                      qtys: Sequence[int]) -> np.ndarray:
+        """
+        Пачка запросов в порядке событий → массив отданных количеств.
+        Событие i получает ``min(q_i, остаток − запрошенное ранее по той же паре)``.
+        """
+        q = np.asarray(qtys, QTY_DTYPE)
+        if not len(q):
+            return q.copy()
+        n_sku, n_zone = self.qty.shape[1], self.qty.shape[2]
+        flat = np.asarray(clients, np.intp) * n_sku + np.asarray(skus, np.intp)
+        order, starts, before = _group_offsets(flat, q)
+
+        totals = self.totals.reshape(-1)
+        pairs = flat[order][starts]
+        avail = totals[pairs][np.cumsum(starts) - 1]
+        served_sorted = np.clip(avail - before, 0, q[order])
+        served = np.empty_like(q)
+        served[order] = served_sorted
+
+        taken = np.add.reduceat(served_sorted, np.flatnonzero(starts))
+        totals[pairs] -= taken
+        # по зонам: жадно в порядке индексов зон
+        rows = self.qty.reshape(-1, n_zone)
+        block = rows[pairs]
+        zone_before = np.cumsum(block, axis=1) - block
+        rows[pairs] = block - np.clip(taken[:, None] - zone_before, 0, block)
+        return served
+
+    def release_batch(self, clients: Sequence[int], skus: Sequence[int], zones: Sequence[int],
+                      qtys: Sequence[int]) -> np.ndarray:
+        """Пачка поступлений → остаток пары (client, sku) после каждого события."""
+        q = np.asarray(qtys, QTY_DTYPE)
+        if not len(q):
+            return q.copy()
+        c = np.asarray(clients, np.intp)
+        s = np.asarray(skus, np.intp)
+        flat = c * self.qty.shape[1] + s
+        order, _, before = _group_offsets(flat, q)
+
+        totals = self.totals.reshape(-1)
+        after = np.empty_like(q)
+        after[order] = totals[flat[order]] + before + q[order]
+        np.add.at(self.qty, (c, s, np.asarray(zones, np.intp)), q)
+        np.add.at(totals, flat, q)
+        return after
+
+    # ---------- снимки ----------
+    def total(self) -> int:
+        return int(self.totals.sum())
+
+    def by_client(self) -> Dict[str, int]:
+        return dict(zip(self.client_ids, self.totals.sum(axis=1).tolist()))
+
+    def by_sku(self) -> Dict[str, int]:
+        return dict(zip(self.sku_ids, self.totals.sum(axis=0).tolist()))
+
+    def by_zone(self) -> Dict[str, int]:
+        return dict(zip(self.zone_ids, self.qty.sum(axis=(0, 1)).tolist()))
+
+    def client_stock(self, client_id: str) -> Dict[str, int]:
+        """Остатки одного клиента по SKU (прежний вид state.stock[client_id])."""
+        c = self.client_index.get(client_id)
+        if c is None:
+            return {}
+        return dict(zip(self.sku_ids, self.totals[c].tolist()))
@@ -0,0 +1,194 @@
+# core/env/kpi.py
+"""
+Счётчики KPI в момент события.
+
+• record_done     – линия перешла в done (line_index.set_line_status,
+  вызов из progress_model.finish_pick); lead time идёт и в квантильные
+  скетчи (core.env.quantiles): за прогон и по бакетам времени для окон;
+• record_assigned – линия закреплена за работником (диспетчер);
+• record_rejected – событие отклонено: валидацией EventBus или при
+  применении (OutboundRejected — не хватило остатка клиента).
+
+Итоги за прогон лежат в MetricsAccumulator (lines_completed,
+total_line_latency, sla_breach_count, assigned_count, rejected_count).
+Для окон — KpiBuckets: кольцо бакетов по bucket_s сим‑секунд (по
+умолчанию 1) на горизонт metrics.window_horizon_seconds. KPI окна —
+сумма бакетов окна, т.е. rollup / window_metrics не зависят ни от длины
+прогона, ни от числа линий в окне.
+"""
+from __future__ import annotations
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .models import WorldState, OrderLine, MetricsAccumulator
+from .quantiles import LeadTimeSketches, LeadTimeWindows
+
+# порядок полей в накопленных суммах
+DONE, LATENCY, BREACH, ASSIGNED, REJECTED = range(5)
+_ZERO = (0, 0.0, 0, 0, 0)
+DEFAULT_HORIZON_S = 8 * 3600        # глубина окон KPI по умолчанию (смена)
+
+
+class KpiBuckets:
+    """
+    Кольцо из n = horizon_s / bucket_s + 1 бакетов (numpy, n × 5): бакет
+    k покрывает сим‑время ((k−1)·bucket_s, k·bucket_s] и лежит в слоте
+    k % n. На слот две суммы: все события бакета (sums) и только события
+    ровно на его правой границе (edge) — так окно с границей, кратной
+    bucket_s, считается точно и «не раньше start», и «строго позже start»;
+    при bucket_s = 1 — точно всегда. Граница не кратная bucket_s
+    округляется вниз до начала своего бакета.
+
+    Память и запрос окна — O(n) независимо от длины прогона: при переходе
+    к новому бакету вытесняются бакеты старше горизонта; окно глубже
+    горизонта обрезается по нему. Окно от начала прогона (start ≤ 0)
+    считается по итогам и точно всегда. Опоздавшее событие внутри
+    горизонта — O(1) в свой слот, старше — только в итоги.
+    horizon_s = None — кольцо растёт вместе с прогоном (вся история, opt‑in).
+    """
+
+    def __init__(self, bucket_s: int = 1, horizon_s: Optional[int] = DEFAULT_HORIZON_S):
+        self.bucket_s = max(1, int(bucket_s))
+        self.horizon_s = horizon_s
+        n = 1024 if horizon_s is None else self._key(max(0, int(horizon_s))) + 1
+        self.sums = np.zeros((n, 5))
+        self.edge = np.zeros((n, 5))
+        self._first: Optional[int] = None          # старший бакет, который ещё в кольце
+        self._last: Optional[int] = None           # младший (самый свежий) бакет
+        self._cum = list(_ZERO)                    # итоги за прогон
+        self._t0 = list(_ZERO)                     # события с t ≤ 0 (окно «строго позже 0»)
+
+    def _key(self, t: int) -> int:
+        return -(-t // self.bucket_s)
+
+    def __len__(self) -> int:
+        """Сколько бакетов покрывает кольцо (не больше числа слотов)."""
+        return 0 if self._last is None else self._last - self._first + 1
+
+    def add(self, t: int, delta: tuple):
+        """Событие(я) в момент t; delta — приращения в порядке DONE..REJECTED."""
+        cum = self._cum
+        for i, v in enumerate(delta):
+            cum[i] += v
+        if t <= 0:
+            for i, v in enumerate(delta):
+                self._t0[i] += v
+        key = self._key(t)
+        if self._last is None:
+            self._last = key
+            # кольцо с горизонтом покрывает n бакетов до последнего, без — только виденные
+            self._first = key if self.horizon_s is None else key - len(self.sums) + 1
+        elif key > self._last:
+            self._advance(key)
+        elif key < self._first:
+            if self.horizon_s is not None:
+                return                              # старше горизонта — только в итогах
+            if self._last - key + 1 > len(self.sums):
+                self._grow(self._last - key + 1)
+            self._first = key
+        n = len(self.sums)
+        self.sums[key % n] += delta
+        if t == key * self.bucket_s:
+            self.edge[key % n] += delta
+
+    def _advance(self, key: int):
+        n = len(self.sums)
+        if self.horizon_s is None:
+            if key - self._first + 1 > n:
+                self._grow(key - self._first + 1)
+        else:
+            lo = max(self._last + 1, key - n + 1)   # слоты новых бакетов: обнуляем
+            if key - lo + 1 >= n:
+                self.sums[:] = 0
+                self.edge[:] = 0
+            else:
+                idx = np.arange(lo, key + 1) % n
+                self.sums[idx] = 0
+                self.edge[idx] = 0
+            self._first = key - n + 1
+        self._last = key
+
+    def _grow(self, need: int):
+        n = len(self.sums)
+        m = max(need, 2 * n)
+        keys = np.arange(self._first, self._last + 1)
+        for name in ("sums", "edge"):
+            old = getattr(self, name)
+            new = np.zeros((m, 5))
+            new[keys % m] = old[keys % n]
+            setattr(self, name, new)
+
+    def _window(self, lo: int, hi: int) -> np.ndarray:
+        """Сумма sums по бакетам lo..hi (в пределах кольца)."""
+        lo = max(lo, self._first)
+        if lo > hi:
+            return np.zeros(5)
+        n = len(self.sums)
+        a, b = lo % n, hi % n
+        if a <= b and hi - lo < n:
+            return self.sums[a:b + 1].sum(axis=0)
+        return self.sums[a:].sum(axis=0) + self.sums[:b + 1].sum(axis=0)
+
+    def since(self, start: int, inclusive: bool = True) -> Tuple:
+        """Суммы по событиям не раньше (или строго позже) ``start``."""
+        if start <= 0:
+            return tuple(self._cum) if inclusive else tuple(c - z for c, z in zip(self._cum, self._t0))
+        if self._last is None:
+            return _ZERO
+        k = self._key(start)
+        if start == k * self.bucket_s:
+            out = self._window(k + 1, self._last)
+            if inclusive and self._first <= k <= self._last:
+                out = out + self.edge[k % len(self.edge)]
+        else:
+            out = self._window(k, self._last)
+        return (int(out[DONE]), float(out[LATENCY]), int(out[BREACH]),
+                int(out[ASSIGNED]), int(out[REJECTED]))
+
+
+def ensure_kpi_buckets(metrics: MetricsAccumulator) -> KpiBuckets:
+    if metrics.window is None:
+        metrics.window = KpiBuckets()
+    return metrics.window
+
+
+def ensure_lead_sketches(metrics: MetricsAccumulator) -> LeadTimeSketches:
+    if metrics.lead_sketches is None:
+        metrics.lead_sketches = LeadTimeSketches()
+    return metrics.lead_sketches
+
+
+def ensure_lead_windows(metrics: MetricsAccumulator) -> LeadTimeWindows:
+    if metrics.lead_windows is None:
+        metrics.lead_windows = LeadTimeWindows()
+    return metrics.lead_windows
+
+
+def record_done(state: WorldState, line: OrderLine):
+    m = state.metrics
+    latency = line.done_time - line.created_time
+    breach = 1 if line.done_time > line.deadline_time else 0
+    m.lines_completed += 1
+    m.total_line_latency += latency
+    m.sla_breach_count += breach
+    ensure_kpi_buckets(m).add(line.done_time, (1, latency, breach, 0, 0))
+    ensure_lead_sketches(m).add(line.client_id, line.zone_id, line.line_type, latency)
+    ensure_lead_windows(m).add(line.done_time, line.client_id, line.zone_id, line.line_type, latency)
+
+
+def record_assigned(state: WorldState):
+    m = state.metrics
+    m.assigned_count += 1
+    ensure_kpi_buckets(m).add(state.sim_time, (0, 0, 0, 1, 0))
+
+
+def record_rejected(metrics: MetricsAccumulator, t: int):
+    metrics.rejected_count += 1
+    ensure_kpi_buckets(metrics).add(t, (0, 0, 0, 0, 1))
+
+
+def done_stats_since(state: WorldState, start: int, inclusive: bool = True) -> Tuple[int, float, int]:
+    """(count, latency_sum, on_time) для линий, завершённых не раньше (или строго позже) ``start``."""
+    s = ensure_kpi_buckets(state.metrics).since(start, inclusive)
+    return s[DONE], s[LATENCY], s[DONE] - s[BREACH]
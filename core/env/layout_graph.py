@@ -0,0 +1,118 @@
+# core/env/layout_graph.py
+"""
+Компиляция layout.yaml в расстояния между зонами (в клетках сетки).
+
+Зоны растеризуются на сетку (x, y, w, h — в клетках), вокруг добавляется
+рамка в одну клетку. Стеллажи (type == "storage") — препятствия: в них
+можно войти, только если это зона‑источник или зона‑цель. Проходы,
+буферы, доки и пустые клетки проходимы. Для каждой зоны BFS от всех её
+клеток даёт число шагов до первой клетки любой другой зоны.
+
+Строка расстояний от зоны считается лениво, одним BFS при первом
+запросе от неё, и кэшируется (LayoutGraph.rows): зоны, из которых никто
+не ходит, BFS не стоят, плотной n² матрицы нет. BFS останавливается,
+как только найдены все зоны. Граф строится на раскладку один раз
+(state_builder); геометрия зон по ходу прогона не меняется.
+"""
+from __future__ import annotations
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .models import Zone
+
+OBSTACLE_TYPES = ("storage",)
+UNREACHABLE = -1
+
+
+@dataclass
+class LayoutGraph:
+    zone_ids: List[str]
+    index: Dict[str, int]          # zone_id -> int
+    width: int
+    height: int
+    owner: array                   # клетка -> индекс зоны, -1 — пусто
+    blocked: bytearray             # клетка стеллажа (препятствие)
+    zone_cells: List[List[int]]
+    # строки расстояний: индекс зоны‑источника -> array по зонам, UNREACHABLE если пути нет
+    rows: Dict[int, array] = field(default_factory=dict, repr=False, compare=False)
+    # маршруты сборщика (core.env.pick_tour): (старт, зоны) -> (порядок, сек)
+    routes: Dict[tuple, tuple] = field(default_factory=dict, repr=False, compare=False)
+
+    def cells(self, from_id: str, to_id: str) -> int:
+        src = self.index[from_id]
+        row = self.rows.get(src)
+        if row is None:
+            row = self.rows[src] = self._bfs(src)
+        return row[self.index[to_id]]
+
+    def _bfs(self, src: int) -> array:
+        n = len(self.zone_ids)
+        width, height = self.width, self.height
+        owner, blocked = self.owner, self.blocked
+        row = array("i", [UNREACHABLE]) * n
+        row[src] = 0
+        left = n - 1                                 # сколько зон ещё не нашли
+        seen = bytearray(width * height)
+        queue = deque()
+        for c in self.zone_cells[src]:
+            if not seen[c]:
+                seen[c] = 1
+                queue.append((c, 0))
+        while queue and left:
+            c, d = queue.popleft()
+            o = owner[c]
+            if o != -1 and row[o] == UNREACHABLE:
+                row[o] = d
+                left -= 1
+            # в чужой стеллаж зашли — дальше через него не идём
+            if blocked[c] and o != src:
+                continue
+            x, y = c % width, c // width
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if 0 <= nx < width and 0 <= ny < height:
+                    nc = ny * width + nx
+                    if not seen[nc]:
+                        seen[nc] = 1
+                        queue.append((nc, d + 1))
+        return row
+
+
+def compile_layout(zones: Dict[str, Zone]) -> LayoutGraph:
+    """Растеризация зон; расстояния — по запросу (LayoutGraph.cells)."""
+    zone_ids = list(zones)
+    index = {zid: i for i, zid in enumerate(zone_ids)}
+    n = len(zone_ids)
+    if not n:
+        return LayoutGraph(zone_ids, index, 0, 0, array("i"), bytearray(), [])
+
+    # ---------- растеризация ----------
+    min_x = min(z.x for z in zones.values()) - 1
+    min_y = min(z.y for z in zones.values()) - 1
+    max_x = max(z.x + max(z.w, 1) for z in zones.values()) + 1
+    max_y = max(z.y + max(z.h, 1) for z in zones.values()) + 1
+    width, height = max_x - min_x, max_y - min_y
+
+    owner = array("i", [-1]) * (width * height)
+    zone_cells: List[List[int]] = [[] for _ in range(n)]
+    for zid, z in zones.items():
+        zi = index[zid]
+        for dy in range(max(z.h, 1)):
+            for dx in range(max(z.w, 1)):
+                c = (z.y + dy - min_y) * width + (z.x + dx - min_x)
+                if owner[c] == -1:
+                    owner[c] = zi
+                zone_cells[zi].append(c)
+    blocked = bytearray(owner[c] != -1 and zones[zone_ids[owner[c]]].type in OBSTACLE_TYPES
+                        for c in range(width * height))
+    return LayoutGraph(zone_ids, index, width, height, owner, blocked, zone_cells)
+
+
+def ensure_layout_graph(state) -> LayoutGraph:
+    """Граф из state; компилируем, если его нет (старый чекпоинт, новая раскладка)."""
+    g = state.layout_graph
+    if g is None:
+        g = state.layout_graph = compile_layout(state.zones)
+    return g
+
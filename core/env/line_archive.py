@@ -0,0 +1,105 @@
+# core/env/line_archive.py
+"""
+Архив завершённых OrderLine в SQLite.
+
+Линии выгружаются, когда их волна закрыта (все линии done): в памяти
+остаются только «живые» линии, а KPI считаются по потоковым агрегатам
+из state.line_index. Запись — пачками по ``batch_size``.
+
+После прогона архив можно читать через ``load_lines`` / ``lead_times``.
+"""
+from __future__ import annotations
+import json, sqlite3
+from typing import Any, Dict, Iterator, List, Optional
+
+from .models import WorldState, Wave, OrderLine
+from .line_index import release_line
+
+_COLUMNS = (
+    "id", "order_id", "wave_id", "client_id", "sku", "qty", "zone_id",
+    "line_type", "priority", "assigned_worker_id",
+    "created_time", "assign_time", "start_time", "done_time", "deadline_time",
+    "work_seconds_needed", "pick_seconds", "travel_seconds", "metadata",
+)
+
+
+class LineArchive:
+    def __init__(self, path: str = "lines_archive.sqlite", batch_size: int = 1000,
+                 reset: bool = True):
+        self.path = path
+        self.batch_size = batch_size
+        self.archived = 0
+        self._buf: List[tuple] = []
+        self._conn = sqlite3.connect(path)
+        if reset:
+            self._conn.execute("DROP TABLE IF EXISTS lines")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS lines ({', '.join(_COLUMNS)})")
+        self._conn.commit()
+
+    # ---------- запись ----------
+    def add(self, line: OrderLine, wave_id: str | None = None) -> None:
+        self._buf.append((
+            line.id, line.order_id, wave_id, line.client_id, line.sku, line.qty,
+            line.zone_id, line.line_type, line.priority, line.assigned_worker_id,
+            line.created_time, line.assign_time, line.start_time, line.done_time,
+            line.deadline_time, line.work_seconds_needed, line.pick_seconds,
+            line.travel_seconds, json.dumps(line.metadata, ensure_ascii=False),
+        ))
+        self.archived += 1
+        if len(self._buf) >= self.batch_size:
+            self.flush()
+
+    def archive_wave(self, state: WorldState, wave: Wave) -> None:
+        """Выгружаем все линии закрытой волны из state.order_lines."""
+        for lid in wave.line_ids:
+            if lid in state.order_lines:
+                self.add(release_line(state, lid), wave.id)
+
+    def flush(self) -> None:
+        if not self._buf:
+            return
+        marks = ", ".join("?" for _ in _COLUMNS)
+        self._conn.executemany(f"INSERT INTO lines VALUES ({marks})", self._buf)
+        self._conn.commit()
+        self._buf.clear()
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- чтение после прогона ----------
+def load_lines(path: str, where: str = "", params: tuple = ()) -> Iterator[Dict[str, Any]]:
+    """Итерируем архивные линии как dict; ``where`` — SQL‑условие без WHERE."""
+    conn = sqlite3.connect(path)
+    try:
+        sql = "SELECT * FROM lines" + (f" WHERE {where}" if where else "")
+        for row in conn.execute(sql, params):
+            rec = dict(zip(_COLUMNS, row))
+            rec["metadata"] = json.loads(rec["metadata"] or "{}")
+            yield rec
+    finally:
+        conn.close()
+
+
+def lead_times(path: str, client_id: Optional[str] = None) -> List[int]:
+    """Lead time (done_time - created_time) архивных линий, опционально по клиенту."""
+    conn = sqlite3.connect(path)
+    try:
+        sql = "SELECT done_time - created_time FROM lines"
+        params: tuple = ()
+        if client_id is not None:
+            sql += " WHERE client_id = ?"
+            params = (client_id,)
+        return [r[0] for r in conn.execute(sql, params)]
+    finally:
+        conn.close()
@@ -0,0 +1,86 @@
+# core/env/line_index.py
+"""
+Жизненный цикл OrderLine: waiting → assigned → done → (архив).
+Переход в done ведёт и счётчики волны линии (Wave.done_count).
+
+Все переходы статуса идут через эти функции, чтобы индексы в
+``state.line_index`` оставались согласованными и потребителям
+(волны, метрики) не нужно было сканировать всю историю order_lines.
+Завершённые линии учитываются в счётчиках KPI (core.env.kpi), поэтому
+сами объекты можно выгрузить в архив (см. core.env.line_archive).
+"""
+from __future__ import annotations
+from typing import Iterable
+
+from .models import WorldState, OrderLine
+from .kpi import record_done
+
+
+def next_line_id(state: WorldState) -> str:
+    """ID новой линии; не зависит от len(order_lines), т.к. done‑линии архивируются."""
+    return f"L{state.line_index.created_total + 1}"
+
+
+def register_line(state: WorldState, line: OrderLine) -> None:
+    """Добавляем новую линию в state.order_lines и в индексы."""
+    idx = state.line_index
+    state.order_lines[line.id] = line
+    idx.created_total += 1
+    idx.by_status.setdefault(line.status, {})[line.id] = None
+    if line.status == "waiting":
+        idx.unwaved[line.id] = None
+
+
+def set_line_status(state: WorldState, line: OrderLine, status: str) -> None:
+    """Переводим линию в новый статус (done_time для done уже выставлен)."""
+    idx = state.line_index
+    if line.status == status:
+        return
+    idx.by_status.get(line.status, {}).pop(line.id, None)
+    idx.unwaved.pop(line.id, None)
+    line.status = status
+    idx.by_status.setdefault(status, {})[line.id] = None
+
+    if status == "done":
+        record_done(state, line)
+        wave_id = idx.line_wave.get(line.id)
+        if wave_id is not None:
+            _wave_line_done(state, idx, wave_id)
+
+
+def _wave_line_done(state: WorldState, idx, wave_id: str) -> None:
+    """Счётчик done волны; дособранная активная волна ждёт закрытия в update_waves."""
+    wave = state.waves[wave_id]
+    wave.done_count += 1
+    if wave.done_count == len(wave.line_ids) and wave.status == "active":
+        idx.drained_waves[wave_id] = None
+
+
+def count_with_status(state: WorldState, status: str) -> int:
+    return len(state.line_index.by_status.get(status, ()))
+
+
+def lines_with_status(state: WorldState, status: str) -> Iterable[OrderLine]:
+    lines = state.order_lines
+    return (lines[lid] for lid in state.line_index.by_status.get(status, ()))
+
+
+def take_unwaved(state: WorldState, wave_id: str, limit: int) -> list[str]:
+    """Забираем до ``limit`` ожидающих линий (FIFO), ещё не попавших в волну."""
+    idx = state.line_index
+    taken: list[str] = []
+    while idx.unwaved and len(taken) < limit:
+        lid = next(iter(idx.unwaved))
+        del idx.unwaved[lid]
+        idx.line_wave[lid] = wave_id
+        taken.append(lid)
+    return taken
+
+
+def release_line(state: WorldState, line_id: str) -> OrderLine:
+    """Убираем завершённую линию из памяти (агрегаты уже учтены)."""
+    idx = state.line_index
+    line = state.order_lines.pop(line_id)
+    idx.by_status.get(line.status, {}).pop(line_id, None)
+    idx.line_wave.pop(line_id, None)
+    return line
@@ -0,0 +1,344 @@
+# core/env/line_store.py
+"""
+Колоночное хранилище OrderLine (struct‑of‑arrays).
+
+Вместо dataclass‑объекта на каждую линию — по одному типизированному
+array на поле: статус и тип линии — int8‑коды, времена — int64,
+трудозатраты — float64, client / sku / zone / worker — интернированные
+индексы. ``metadata`` хранится разреженно (только у линий, где она есть).
+
+state.order_lines — это LineStore: тот же интерфейс dict[id → линия],
+``store[lid]`` возвращает лёгкий LineView с прежними атрибутами
+(чтение/запись идут прямо в колонки), поэтому остальные модули не
+меняются. Новая линия добавляется присваиванием ``store[id] = OrderLine(...)``,
+``pop`` возвращает обычный OrderLine (для архива). Строки удалённых
+линий переиспользуются; у строки есть поколение (gen, +1 на pop), и
+LineView, взятый до удаления, при любом обращении бросает StaleLineView,
+а не читает / пишет чужую линию.
+
+Для метрик — векторные запросы: ``column`` отдаёт numpy‑копию колонки
+по живым строкам, ``code`` — код значения, ``status_counts`` — bincount.
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .models import OrderLine
+
+NONE_INT = -(1 << 63)       # None в целочисленных колонках; во float — NaN
+
+
+class StaleLineView(KeyError):
+    """LineView пережил удаление своей линии (строка освобождена / занята другой)."""
+
+# (поле, typecode, вид): label — интернированная строка (код 0 = None)
+_FIELDS = (
+    ("client_id",                     "i", "label"),
+    ("sku",                           "i", "label"),
+    ("qty",                           "q", "int"),
+    ("zone_id",                       "i", "label"),
+    ("created_time",                  "q", "int"),
+    ("deadline_time",                 "q", "int"),
+    ("order_id",                      "i", "label"),
+    ("line_type",                     "b", "label"),
+    ("status",                        "b", "label"),
+    ("priority",                      "q", "int"),
+    ("assigned_worker_id",            "i", "label"),
+    ("assign_time",                   "q", "int"),
+    ("start_time",                    "q", "int"),
+    ("done_time",                     "q", "int"),
+    ("work_seconds_needed",           "d", "float"),
+    ("pick_seconds",                  "d", "float"),
+    ("travel_seconds",                "d", "float"),
+    ("backorder_flag",                "b", "bool"),
+    ("activated_from_backorder_time", "q", "int"),
+)
+_NP_DTYPE = {"b": np.int8, "i": np.int32, "q": np.int64, "d": np.float64}
+
+
+class _Labels:
+    """Интернирование строк колонки: код 0 зарезервирован под None."""
+    __slots__ = ("names", "codes")
+
+    def __init__(self):
+        self.names: List[Optional[str]] = [None]
+        self.codes: Dict[Optional[str], int] = {None: 0}
+
+    def code(self, name: Optional[str]) -> int:
+        c = self.codes.get(name)
+        if c is None:
+            c = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return c
+
+    def __getstate__(self):
+        return self.names
+
+    def __setstate__(self, names):
+        self.names = names
+        self.codes = {n: i for i, n in enumerate(names)}
+
+
+def _encode(kind: str, labels: Optional[_Labels], value):
+    if kind == "label":
+        return labels.code(value)
+    if kind == "int":
+        return NONE_INT if value is None else value
+    if kind == "float":
+        return float("nan") if value is None else value
+    return 1 if value else 0
+
+
+class LineStore:
+    def __init__(self):
+        self.cols: Dict[str, array] = {name: array(tc) for name, tc, _ in _FIELDS}
+        self.labels: Dict[str, _Labels] = {
+            name: _Labels() for name, _, kind in _FIELDS if kind == "label"
+        }
+        self.ids: List[Optional[str]] = []           # row -> line_id (None — свободна)
+        self.rows: Dict[str, int] = {}               # line_id -> row
+        self.metadata: Dict[int, dict] = {}          # row -> metadata (разреженно)
+        self.alive = array("b")
+        self.gen = array("q")                        # row -> поколение (+1 при pop)
+        self._free: List[int] = []
+        # прямые ссылки для status_of (объекты стабильны: array/list растут на месте)
+        self._status = self.cols["status"]
+        self._status_names = self.labels["status"].names
+
+    # ---------- интерфейс dict ----------
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, line_id) -> bool:
+        return line_id in self.rows
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.rows)
+
+    def __getitem__(self, line_id: str) -> "LineView":
+        row = self.rows[line_id]
+        return LineView(self, row, self.gen[row])
+
+    def get(self, line_id: str, default=None):
+        row = self.rows.get(line_id)
+        return default if row is None else LineView(self, row, self.gen[row])
+
+    def keys(self):
+        return self.rows.keys()
+
+    def values(self) -> Iterator["LineView"]:
+        gen = self.gen
+        return (LineView(self, row, gen[row]) for row in self.rows.values())
+
+    def items(self) -> Iterator[tuple[str, "LineView"]]:
+        gen = self.gen
+        return ((lid, LineView(self, row, gen[row])) for lid, row in self.rows.items())
+
+    def __setitem__(self, line_id: str, line: OrderLine) -> None:
+        if line.id != line_id:
+            raise KeyError(f"line id mismatch: {line_id} != {line.id}")
+        self.add(line)
+
+    def pop(self, line_id: str) -> OrderLine:
+        """Удаляем линию; возвращаем её копию в виде OrderLine."""
+        row = self.rows.pop(line_id)
+        line = self.record(row)
+        self.ids[row] = None
+        self.alive[row] = 0
+        self.gen[row] += 1                           # старые LineView этой строки недействительны
+        self.metadata.pop(row, None)
+        self._free.append(row)
+        return line
+
+    def status_of(self, line_id: str) -> str:
+        """Статус без создания LineView (горячие циклы волн и диспетчера)."""
+        return self._status_names[self._status[self.rows[line_id]]]
+
+    # ---------- запись / чтение строк ----------
+    def add(self, line: OrderLine) -> "LineView":
+        row = self.rows.get(line.id)
+        if row is None:
+            row = self._free.pop() if self._free else None
+        values = [(name, _encode(kind, self.labels.get(name), getattr(line, name)))
+                  for name, _, kind in _FIELDS]
+        if row is None:
+            row = len(self.ids)
+            for name, v in values:
+                self.cols[name].append(v)
+            self.ids.append(line.id)
+            self.alive.append(1)
+            self.gen.append(0)
+        else:
+            for name, v in values:
+                self.cols[name][row] = v
+            self.ids[row] = line.id
+            self.alive[row] = 1
+        self.rows[line.id] = row
+        if line.metadata:
+            self.metadata[row] = line.metadata
+        else:
+            self.metadata.pop(row, None)
+        return LineView(self, row, self.gen[row])
+
+    def record(self, row: int) -> OrderLine:
+        view = LineView(self, row, self.gen[row])
+        return OrderLine(
+            id=self.ids[row],
+            metadata=dict(self.metadata.get(row, {})),
+            **{name: getattr(view, name) for name, _, _ in _FIELDS},
+        )
+
+    # ---------- векторные запросы ----------
+    def _live(self) -> np.ndarray:
+        if not self.ids:
+            return np.zeros(0, dtype=bool)
+        return np.frombuffer(self.alive, dtype=np.int8).astype(bool)
+
+    def column(self, name: str) -> np.ndarray:
+        """Колонка по живым строкам (копия); label‑поля — коды, см. ``code``."""
+        col = self.cols[name]
+        if not self.ids:
+            return np.zeros(0, dtype=_NP_DTYPE[col.typecode])
+        return np.frombuffer(col, dtype=_NP_DTYPE[col.typecode])[self._live()]
+
+    def line_ids(self) -> List[str]:
+        """ID живых строк в порядке колонок (для масок из ``column``)."""
+        return [lid for lid in self.ids if lid is not None]
+
+    def code(self, name: str, value: Optional[str]) -> int:
+        """Код строкового значения; -1, если такого ещё не было."""
+        return self.labels[name].codes.get(value, -1)
+
+    def status_counts(self) -> Dict[str, int]:
+        labels = self.labels["status"].names
+        counts = np.bincount(self.column("status"), minlength=len(labels))
+        return {labels[c]: int(n) for c, n in enumerate(counts) if n and labels[c] is not None}
+
+
+# ---------- view с атрибутами OrderLine ----------
+def _stale(view: "LineView"):
+    raise StaleLineView(f"line at row {view._row} was removed from the store")
+
+
+def _label_property(name: str):
+    def get(self):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        return s.labels[name].names[s.cols[name][self._row]]
+
+    def set(self, value):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        s.cols[name][self._row] = s.labels[name].code(value)
+    return property(get, set)
+
+
+def _int_property(name: str):
+    def get(self):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        v = s.cols[name][self._row]
+        return None if v == NONE_INT else v
+
+    def set(self, value):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        s.cols[name][self._row] = NONE_INT if value is None else value
+    return property(get, set)
+
+
+def _float_property(name: str):
+    def get(self):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        v = s.cols[name][self._row]
+        return None if v != v else v
+
+    def set(self, value):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        s.cols[name][self._row] = float("nan") if value is None else value
+    return property(get, set)
+
+
+def _bool_property(name: str):
+    def get(self):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        return bool(s.cols[name][self._row])
+
+    def set(self, value):
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        s.cols[name][self._row] = 1 if value else 0
+    return property(get, set)
+
+
+class LineView:
+    """
+    Линия как строка LineStore; валидна, пока линия не удалена из
+    хранилища — после pop любое обращение бросает StaleLineView.
+    """
+    __slots__ = ("_store", "_row", "_gen")
+
+    def __init__(self, store: LineStore, row: int, gen: int):
+        self._store = store
+        self._row = row
+        self._gen = gen
+
+    def _check(self) -> LineStore:
+        s = self._store
+        if s.gen[self._row] != self._gen:
+            _stale(self)
+        return s
+
+    @property
+    def alive(self) -> bool:
+        return self._store.gen[self._row] == self._gen
+
+    @property
+    def id(self) -> str:
+        return self._check().ids[self._row]
+
+    @property
+    def metadata(self) -> dict:
+        s = self._check()
+        md = s.metadata.get(self._row)
+        if md is None:
+            md = s.metadata[self._row] = {}
+        return md
+
+    @metadata.setter
+    def metadata(self, value: dict):
+        self._check().metadata[self._row] = value
+
+    def record(self) -> OrderLine:
+        return self._check().record(self._row)
+
+    def __eq__(self, other):
+        return (isinstance(other, LineView) and other._store is self._store
+                and other._row == self._row and other._gen == self._gen)
+
+    def __hash__(self):
+        return hash((id(self._store), self._row, self._gen))
+
+    def __repr__(self):
+        if not self.alive:
+            return f"LineView(<removed>, row={self._row})"
+        return f"LineView({self.id!r}, status={self.status!r})"
+
+
+_PROPERTY = {"label": _label_property, "int": _int_property,
+             "float": _float_property, "bool": _bool_property}
+for _name, _, _kind in _FIELDS:
+    setattr(LineView, _name, _PROPERTY[_kind](_name))
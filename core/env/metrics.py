@@ -1,39 +1,50 @@
 from __future__ import annotations
 from .models import WorldState
-import csv, os, copy
+from .line_index import count_with_status
+from .kpi import done_stats_since, ensure_lead_sketches, ensure_lead_windows
+from .wave_manager import building_wave
+import csv, os
+
+def _worker_counts(state: WorldState) -> tuple[int, int]:
+    """(свободные, на смене): выключенные (off) в загрузку не входят."""
+    idle = on_shift = 0
+    for w in state.workers.values():
+        if w.state == "off":
+            continue
+        on_shift += 1
+        idle += w.state == "idle"
+    return idle, on_shift or 1
 
 def collect_periodic(state: WorldState, cfg: dict):
     interval = cfg["metrics"].get("sample_interval_seconds", 60)
     if state.sim_time % interval != 0:
         return
 
-    lines = state.order_lines.values()
-    done_lines = [l for l in lines if l.status == "done"]
+    # счётчики ведутся в момент событий (core.env.kpi) — здесь только чтение
+    idx = state.line_index
+    m = state.metrics
+    done_count = m.lines_completed
     throughput = 0.0
     if state.sim_time > 0:
-        throughput = len(done_lines) / (state.sim_time / 3600)
+        throughput = done_count / (state.sim_time / 3600)
 
     avg_latency = 0.0
-    if done_lines:
-        total = sum((l.done_time - l.created_time) for l in done_lines if l.done_time)
-        avg_latency = total / len(done_lines)
+    if done_count:
+        avg_latency = m.total_line_latency / done_count
 
-    idle = sum(1 for w in state.workers.values() if w.state == "idle")
-    total_w = len(state.workers) or 1
+    idle, total_w = _worker_counts(state)
     util = round((total_w - idle) / total_w, 3)
 
-    on_time = [l for l in done_lines if l.done_time <= l.deadline_time]
-    otif_pct = 1.0 if not done_lines else round(len(on_time) / len(done_lines), 3)
+    otif_pct = 1.0 if not done_count else round((done_count - m.sla_breach_count) / done_count, 3)
 
     capacity_total = sum(z.capacity for z in state.zones.values()) or 1   # защитили 0
     load_pct = sum(z.current_qty for z in state.zones.values()) / capacity_total
     
-    waiting_total = sum(1 for l in lines if l.status == "waiting")   # <= ДОБАВИЛИ
+    waiting_total = count_with_status(state, "waiting")
 
-    dock_queue = sum(len(d.queue) for d in state.docks.values())
-    dock_busy_sec = sum(
-        max(0, d.busy_until - state.sim_time)          # сколько ещё заняты
-        for d in state.docks.values() if d.status == "busy")
+    yard = state.dock_yard
+    dock_queue = yard.queued
+    dock_busy_sec = yard.busy_seconds_left(state.sim_time)   # сколько ещё заняты
     # ──▲───────────────────────────────────────────────────────────────────
 
     snap = {
@@ -42,25 +53,40 @@ def collect_periodic(state: WorldState, cfg: dict):
         "otif_pct": otif_pct,
         "util_workers": util,
         "stockouts": getattr(state.metrics, "stockouts", 0),
+        "stock_units": state.inventory.total(),   # запас клиентов на складе, шт
         "dock_queue": dock_queue,          # сколько фур ждут у доков
-        "dock_busy_sec": dock_busy_sec     # суммарно доки заняты, сек
+        "dock_busy_sec": dock_busy_sec,    # суммарно доки заняты, сек
+        "dock_util": round(yard.utilization(state.sim_time, state.sim_time), 3),
         # ──▲──────────────────────────────────────────────────────────────
+        **_lead_quantiles(state),          # lead time линий за прогон, сек
     }
 
-    state.metrics.snapshots.append(copy.deepcopy(snap))
+    m.snapshots.append(snap)      # snap — свежий плоский dict, копия не нужна
 
+    building = building_wave(state)
     row = {
         "sim_time": state.sim_time,
         "throughput_lph": round(throughput, 2),
-        "done_lines": len(done_lines),
+        "done_lines": done_count,
         "avg_line_latency_sec": round(avg_latency, 1),
         "workers_idle": idle,
         "workers_total": total_w,
         "waiting_lines": waiting_total,
-        "waves_active": sum(1 for w in state.waves.values() if w.status == "active"),
-        "building_wave_size": next((len(w.line_ids) for w in state.waves.values() if w.status=="building"), 0)
+        "waves_active": len(idx.active_waves),
+        "building_wave_size": len(building.line_ids) if building is not None else 0
     } # можно потом использовать чтобы в csv row записи делать
 
+def _lead_quantiles(state: WorldState) -> dict:
+    """lead_p50_s / lead_p95_s / lead_p99_s по всем линиям (скетч, за прогон)."""
+    return _quantile_cols(ensure_lead_sketches(state.metrics).summary(["all"]).get("all", {}))
+
+def _quantile_cols(row: dict) -> dict:
+    return {f"lead_{q}_s": row.get(q, 0.0) for q in ("p50", "p95", "p99")}
+
+def lead_time_summary(state: WorldState) -> dict:
+    """{группа: {n, p50, p95, p99}} — all, client:*, zone:*, line_type:*."""
+    return ensure_lead_sketches(state.metrics).summary()
+
 def flush_metrics(state: WorldState, out_path: str = "metrics_run.csv"):
     if not state.metrics.snapshots:
         return
@@ -76,22 +102,21 @@ def rollup(state: WorldState, window_s: int) -> dict:
     """Возвращает агрегированные KPI за последние ``window_s`` сим‑секунд."""
     start = max(0, state.sim_time - window_s)
 
-    done_lines = [l for l in state.order_lines.values()
-                  if l.status == "done" and (l.done_time or 0) >= start]
+    done_count, latency_sum, on_time = done_stats_since(state, start)
 
     mean_cycle = 0.0
-    if done_lines:
-        mean_cycle = sum((l.done_time - l.created_time) for l in done_lines) / len(done_lines)
-
     otif = 0.0
-    if done_lines:
-        on_time = [l for l in done_lines if l.done_time <= l.deadline_time]
-        otif = len(on_time) / len(done_lines)
+    if done_count:
+        mean_cycle = latency_sum / done_count
+        otif = on_time / done_count
+
+    # окно от начала прогона — по скетчам за прогон (бакеты окон могли уйти за горизонт)
+    sketches = ensure_lead_sketches(state.metrics) if start <= 0 else ensure_lead_windows(state.metrics).since(start)
+    lead = sketches.summary()
 
-    dock_queue = sum(len(d.queue) for d in state.docks.values())
+    dock_queue = state.dock_yard.queued
 
-    idle = sum(1 for w in state.workers.values() if w.state == "idle")
-    total_w = len(state.workers) or 1
+    idle, total_w = _worker_counts(state)
     util = (total_w - idle) / total_w
 
     zone_fill_avg = 0.0
@@ -108,5 +133,26 @@ def rollup(state: WorldState, window_s: int) -> dict:
         "dock_queue": dock_queue,
         "otif": round(otif, 3),
         "worker_util": round(util, 3),
-        "zone_fill_avg": round(zone_fill_avg, 3)
-    }
\ No newline at end of file
+        "zone_fill_avg": round(zone_fill_avg, 3),
+        # квантили — по скетчам бакетов окна (metrics.quantiles.bucket_seconds)
+        **_quantile_cols(lead.get("all", {})),
+        "lead_time": lead,
+    }
+
+def window_metrics(state: WorldState, window_s: int) -> dict:
+    """KPI окна для оптимизатора / отчётов (lead time, dock/worker util)."""
+    start = max(0, state.sim_time - window_s)
+    done_count, latency_sum, _ = done_stats_since(state, start, inclusive=False)
+    lead = 0.0
+    if done_count:
+        lead = latency_sum / done_count
+    # средняя доля занятых ворот за окно (интеграл занятости DockYard)
+    dock_util = state.dock_yard.utilization(start, state.sim_time)
+    idle, total_w = _worker_counts(state)
+    util = (total_w - idle) / total_w
+    return {
+        "order_lines_done": done_count,
+        "dock_util": round(dock_util, 2),
+        "avg_lead_time_min": round(lead / 60, 1),
+        "worker_util": round(util, 2),
+    }
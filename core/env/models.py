@@ -1,6 +1,17 @@
 from __future__ import annotations
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Literal
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional, Literal
+
+if TYPE_CHECKING:                      # только для аннотаций: модули ниже сами импортируют models
+    from .client_calendar import ClientCalendar
+    from .docks import DockYard
+    from .inventory import InventoryMatrix
+    from .kpi import KpiBuckets
+    from .layout_graph import LayoutGraph
+    from .line_store import LineStore
+    from .putaway import PutawayIndex
+    from .quantiles import LeadTimeSketches, LeadTimeWindows
 
 ZoneType = Literal["storage", "pack", "dock_in", "dock_out", "staging"]
 LineStatus = Literal["waiting", "assigned", "done", "canceled"]
@@ -36,6 +47,13 @@ class Worker:
     pick_remaining: float = 0.0
     phase: Literal["travel", "pick"] | None = None
     current_zone_id: str = "DOCK_OUT"  # добавили для travel
+    # --- закрытая форма (progress.engine: heap): сим‑время старта, прибытия, финиша ---
+    task_start: Optional[float] = None
+    task_arrive: Optional[float] = None
+    task_finish: Optional[float] = None
+    # --- маршрут из нескольких линий (dispatcher.backend: tour): следующие остановки ---
+    tour: Deque[str] = field(default_factory=deque)
+    retiring: bool = False             # сокращён патчем: уйдёт в off, доделав текущую линию / маршрут
 
 @dataclass
 class Client:
@@ -45,8 +63,8 @@ class Client:
     inbound_cfg: dict | None = None
     outbound_cfg: dict | None = None
     sku_mix: list[tuple[str, float]] | None = None
-    next_inbound_time: int = 0
-    next_outbound_time: int = 0
+    next_inbound_time: Optional[int] = 0       # None — слотов больше нет (см. client_calendar)
+    next_outbound_time: Optional[int] = 0
 
 @dataclass
 class OrderLine:
@@ -91,6 +109,9 @@ class Wave:
     activated_time: Optional[int] = None
     complete_time: Optional[int] = None
     target_size: int = 0
+    # runtime (ведётся через line_index / wave_manager)
+    done_count: int = 0                                        # сколько линий волны done
+    waiting: Deque[str] = field(default_factory=deque)         # waiting‑линии в порядке FIFO
 
 @dataclass
 class SKU:
@@ -106,16 +127,11 @@ class SKU:
 class Dock:
     id: str
     kind: Literal["inbound", "outbound"]
+    zone_id: str = ""                      # зона DOCK_IN / DOCK_OUT в layout
     service_seconds: int = 30*60
     status: Literal["free", "busy"] = "free"
     busy_until: int = 0
-    queue: list[str] = field(default_factory=list)
-
-@dataclass
-class InventoryRecord:
-    sku_id: str
-    zone_id: str
-    qty: int
+    truck_id: Optional[str] = None         # очередь фур — у DockYard (core.env.docks)
 
 @dataclass
 class LiveConfig:
@@ -123,6 +139,10 @@ class LiveConfig:
     wave_size: int
     wave_build_timeout: int
     look_ahead_lines_per_worker: int = 1
+    dispatch_waves: Optional[int] = 1          # из скольких активных волн брать линии (None = из всех)
+    dispatcher_backend: str = "greedy"         # greedy | optimal | tour (core.env.dispatcher_heuristic)
+    dispatcher_time_budget_ms: float = 20.0    # бюджет венгерского алгоритма, потом — жадно
+    tour_max_lines: int = 4                    # backend tour: линий в одном маршруте
 
 @dataclass
 class MetricsAccumulator:
@@ -130,7 +150,27 @@ class MetricsAccumulator:
     total_line_latency: float = 0.0
     assigned_count: int = 0
     sla_breach_count: int = 0
+    rejected_count: int = 0                    # отклонённых событий (валидация EventBus, OutboundRejected)
     snapshots: List[dict] = field(default_factory=list)
+    window: Optional[KpiBuckets] = None        # core.env.kpi: суммы по бакетам времени для окон
+    lead_sketches: Optional[LeadTimeSketches] = None  # core.env.quantiles: p50/p95/p99 lead time
+    lead_windows: Optional[LeadTimeWindows] = None    # … те же скетчи по бакетам времени (квантили окна rollup)
+
+@dataclass
+class LineIndex:
+    """
+    Инкрементальные индексы линий и волн (ведутся через core.env.line_index
+    и core.env.wave_manager).
+    Порядок ключей в dict = порядок поступления (FIFO).
+    """
+    by_status: Dict[str, Dict[str, None]] = field(default_factory=dict)
+    unwaved: Dict[str, None] = field(default_factory=dict)     # waiting, ещё ни в одной волне
+    line_wave: Dict[str, str] = field(default_factory=dict)    # line_id -> wave_id
+    created_total: int = 0                                     # счётчик для next_line_id
+    # волны: активные в порядке активации, дособранные (все линии done), текущая building
+    active_waves: Dict[str, None] = field(default_factory=dict)
+    drained_waves: Dict[str, None] = field(default_factory=dict)
+    building_wave_id: Optional[str] = None
 
 @dataclass
 class WorldState:
@@ -138,11 +178,11 @@ class WorldState:
     zones: Dict[str, Zone]
     workers: Dict[str, Worker]
     clients: Dict[str, Client]
-    order_lines: Dict[str, OrderLine]
+    order_lines: LineStore                         # core.env.line_store: колонки + LineView
     waves: Dict[str, Wave]
-    docks: Dict[str, Dock]
+    docks: Dict[str, Dock]                         # ворота из DockYard.docks
     skus: Dict[str, SKU]
-    inventory: Dict[str, InventoryRecord]          # можешь оставить (пока не активно)
+    inventory: InventoryMatrix                     # core.env.inventory: запас клиентов client × sku × zone
     live_config: LiveConfig
     metrics: MetricsAccumulator
     rng_seed: int = 0
@@ -152,5 +192,9 @@ class WorldState:
     # backorders: dict[str, list[str]] = field(default_factory=dict)   # sku_id -> list[line_id] в ожидании
     pending_optimizations: list[dict] = field(default_factory=list)  # для будущего Optimizer
     flags: dict[str, bool] = field(default_factory=dict)             # произвольные флаги (например ‘priority_mode’)
-    stock: dict[str, dict[str, int]] = field(default_factory=dict)  # {client_id: {sku_id: qty}}
+    line_index: LineIndex = field(default_factory=LineIndex)
+    layout_graph: Optional[LayoutGraph] = None        # core.env.layout_graph, строится в state_builder
+    client_calendar: Optional[ClientCalendar] = None  # core.env.client_calendar, строится лениво
+    dock_yard: Optional[DockYard] = None           # core.env.docks: очереди фур и занятость ворот
+    putaway_index: Optional[PutawayIndex] = None   # core.env.putaway: зоны хранения по заполненности
     
\ No newline at end of file
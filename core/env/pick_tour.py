@@ -0,0 +1,77 @@
+# core/env/pick_tour.py
+"""
+Маршрут сборщика по нескольким линиям (dispatcher.backend: tour).
+
+Порядок обхода зон (открытый путь от текущей зоны работника, без
+возврата): до EXACT_MAX_STOPS различных зон — перебор всех порядков,
+больше — ближайший сосед, затем 2‑opt. Линии в одной зоне — подряд, без
+перехода. Результат кэшируется в LayoutGraph.routes по ключу
+(стартовая зона, мультимножество зон): на тех же стеллажах маршрут не
+пересчитывается.
+"""
+from __future__ import annotations
+import itertools
+from typing import Dict, List, Sequence, Tuple
+
+from .layout_graph import ensure_layout_graph
+from .travel import compute_travel_seconds
+
+EXACT_MAX_STOPS = 6                 # 6! = 720 порядков; маршрут мемоизирован
+
+
+def _path_cost(dist: Dict[Tuple[str, str], float], start: str, order: Sequence[str]) -> float:
+    cost, prev = 0.0, start
+    for z in order:
+        cost += dist[prev, z]
+        prev = z
+    return cost
+
+
+def _nearest_neighbour(dist, start: str, stops: List[str]) -> List[str]:
+    order, left, cur = [], list(stops), start
+    while left:
+        nxt = min(left, key=lambda z: dist[cur, z])   # при равенстве — первая в списке
+        left.remove(nxt)
+        order.append(nxt)
+        cur = nxt
+    return order
+
+
+def _two_opt(dist, start: str, order: List[str]) -> List[str]:
+    """Разворачиваем отрезки, пока это укорачивает открытый путь."""
+    best = _path_cost(dist, start, order)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                cand = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                cost = _path_cost(dist, start, cand)
+                if cost + 1e-9 < best:
+                    order, best, improved = cand, cost, True
+    return order
+
+
+def plan_route(state, start_zone: str, zone_ids: Sequence[str]) -> Tuple[Tuple[str, ...], float]:
+    """
+    (порядок различных зон, секунд пути) для обхода ``zone_ids`` из
+    ``start_zone``. Мемоизация по (start_zone, отсортированные зоны).
+    """
+    routes = ensure_layout_graph(state).routes
+    key = (start_zone, tuple(sorted(zone_ids)))
+    hit = routes.get(key)
+    if hit is not None:
+        return hit
+    stops = list(dict.fromkeys(sorted(zone_ids)))
+    nodes = [start_zone] + stops
+    dist = {(a, b): compute_travel_seconds(state, a, b, per_cell=1.5)
+            for a in nodes for b in stops if a != b}
+    for z in stops:
+        dist[z, z] = 0.0
+    if len(stops) <= EXACT_MAX_STOPS:
+        order = list(min(itertools.permutations(stops),
+                         key=lambda p: _path_cost(dist, start_zone, p)))
+    else:
+        order = _two_opt(dist, start_zone, _nearest_neighbour(dist, start_zone, stops))
+    hit = routes[key] = (tuple(order), _path_cost(dist, start_zone, order))
+    return hit
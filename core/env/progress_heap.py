@@ -0,0 +1,111 @@
+# core/env/progress_heap.py
+"""
+Прогресс работников в закрытой форме (``progress.engine: heap``).
+
+После назначения задача полностью определена: старт = текущий тик,
+прибытие = старт + travel / speed_factor, финиш = прибытие +
+pick / speed_factor. Оба момента сразу кладутся в min‑кучу
+(time, seq, worker_id, kind); за тик снимаем только то, что наступило
+до конца тика — стоимость тика пропорциональна числу завершений,
+а не размеру флота.
+
+Отличие от scalar/vector: сборка начинается в момент прибытия, без
+пустого тика на границе travel → pick. Линия считается сделанной в
+конце тика, внутри которого наступил финиш (done_time на сетке тиков).
+
+Промежуточное состояние не хранится: остатки travel/pick считаются
+по task_start / task_arrive / task_finish работника (``sync_workers``).
+"""
+from __future__ import annotations
+import heapq, math
+from typing import Iterable, List, Optional
+
+from .models import WorldState, Worker
+from .progress_model import finish_travel, finish_pick
+
+ARRIVE, FINISH = 0, 1
+
+
+class HeapProgress:
+    def __init__(self):
+        self.heap: List[tuple] = []
+        self._seq = 0
+        self._loaded = False
+
+    def _push(self, t: float, w: Worker, kind: int):
+        self._seq += 1
+        heapq.heappush(self.heap, (t, self._seq, w.id, kind))
+
+    def _schedule(self, w: Worker, now: float):
+        """Ставим в кучу задачу работника с текущими остатками travel/pick."""
+        speed = w.speed_factor
+        if speed <= 0:
+            return                       # не двигается — никогда не закончит
+        w.task_start = now
+        if w.phase == "travel":
+            w.task_arrive = now + w.travel_remaining / speed
+            w.task_finish = w.task_arrive + w.pick_remaining / speed
+            self._push(w.task_arrive, w, ARRIVE)
+        else:
+            w.task_arrive = now
+            w.task_finish = now + w.pick_remaining / speed
+            self._push(w.task_finish, w, FINISH)
+
+    def _load(self, state: WorldState):
+        """Первый тик (или переход с другой модели): берём уже начатые задачи."""
+        self._loaded = True
+        for w in state.workers.values():
+            if w.state in ("idle", "off", "charging") or not w.assigned_line_id:
+                continue
+            if w.phase in ("travel", "pick"):
+                self._schedule(w, state.sim_time)
+
+    # ---------- тик ----------
+    def advance(self, state: WorldState, tick: int, assigned: Iterable[Worker] = ()):
+        if not self._loaded:
+            self._load(state)            # assigned уже среди активных
+        else:
+            for w in assigned:
+                self._schedule(w, state.sim_time)
+
+        horizon = state.sim_time + tick
+        heap = self.heap
+        lines = state.order_lines
+        while heap and heap[0][0] <= horizon:
+            t, _, wid, kind = heapq.heappop(heap)
+            w = state.workers[wid]
+            line = lines[w.assigned_line_id]
+            if kind == ARRIVE:
+                finish_travel(w, line)
+                self._push(w.task_finish, w, FINISH)
+            else:
+                finish_pick(state, w, line, tick)
+                w.task_start = w.task_arrive = w.task_finish = None
+                if w.assigned_line_id:           # следующая остановка маршрута
+                    # с конца тика, как у работника, назначенного диспетчером заново
+                    # (и как в покадровой модели) — иначе маршрут получает
+                    # бесплатный остаток тика на каждой остановке
+                    self._schedule(w, horizon)
+
+    # ---------- discrete‑event режим ----------
+    def next_time(self, now: int, tick: int) -> Optional[int]:
+        """Тик, в котором снимется вершина кучи (финиш ≤ конец тика)."""
+        if not self.heap:
+            return None
+        t = self.heap[0][0]
+        return max(now, (math.ceil(t / tick) - 1) * tick)
+
+    # ---------- ленивое промежуточное состояние ----------
+    def sync_workers(self, state: WorldState):
+        """Остатки travel/pick на текущий момент → в объекты Worker (кадры, отчёты)."""
+        now = state.sim_time
+        for w in state.workers.values():
+            if w.task_finish is None:
+                continue
+            speed = w.speed_factor
+            if now < w.task_arrive:
+                w.travel_remaining = (w.task_arrive - now) * speed
+                w.pick_remaining = (w.task_finish - w.task_arrive) * speed
+            else:
+                w.travel_remaining = 0.0
+                w.pick_remaining = max(0.0, (w.task_finish - now) * speed)
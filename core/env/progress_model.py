@@ -1,6 +1,9 @@
 from __future__ import annotations
 from .models import WorldState
 from .models import OrderLine
+from .line_index import set_line_status
+from .putaway import zone_changed
+from .dispatcher_heuristic import start_next_stop
 
 def advance_progress(state: WorldState, tick: int):
     for w in state.workers.values():
@@ -13,11 +16,7 @@ def advance_progress(state: WorldState, tick: int):
         # ---------- TRAVEL ----------
         if w.phase == "travel":
             if delta >= w.travel_remaining:
-                delta -= w.travel_remaining
-                w.travel_remaining = 0
-                w.current_zone_id = line.zone_id      # теперь точно DOCK_IN
-                w.phase = "pick"
-                w.state = "picking"
+                finish_travel(w, line)
                 continue             # <‑‑‑ добавь: PICK начнётся в следующий tick
             else:
                 w.travel_remaining -= delta
@@ -26,30 +25,51 @@ def advance_progress(state: WorldState, tick: int):
         # ---------- PICK ----------
         if w.phase == "pick":
             if delta >= w.pick_remaining:
-                # работа завершена
-                zone = state.zones[line.zone_id]
-                zone.current_qty = max(zone.current_qty - line.qty, 0)
-
-                line.status = "done"
-                line.done_time = state.sim_time + tick
-
-                if line.line_type == "inbound":
-                    # переносим запас из DOCK_IN → целевая зона
-                    dest_id  = line.metadata["putaway_target_zone_id"]
-                    dest_z   = state.zones[dest_id]
-                    src_z    = state.zones[line.zone_id]
-
-                    moved_qty = min(line.qty, src_z.current_qty)
-                    src_z.current_qty  -= moved_qty
-                    dest_z.current_qty = min(dest_z.capacity, dest_z.current_qty + moved_qty)
-
-                    # перемещаем работника в конечную зону
-                    worker_obj = state.workers[line.assigned_worker_id]
-                    worker_obj.current_zone_id = dest_id
-
-                w.assigned_line_id = None
-                w.state = "idle"
-                w.phase = None
-                w.pick_remaining = w.travel_remaining = 0
+                finish_pick(state, w, line, tick)
             else:
                 w.pick_remaining -= delta
+
+
+# ---------- переходы (общие со скалярной и векторной моделью) ----------
+def finish_travel(w, line: OrderLine):
+    w.travel_remaining = 0
+    w.current_zone_id = line.zone_id      # теперь точно DOCK_IN
+    w.phase = "pick"
+    w.state = "picking"
+
+
+def finish_pick(state: WorldState, w, line: OrderLine, tick: int):
+    # работа завершена
+    zone = state.zones[line.zone_id]
+    zone.current_qty = max(zone.current_qty - line.qty, 0)
+    zone_changed(state, zone)
+
+    line.done_time = state.sim_time + tick
+    set_line_status(state, line, "done")
+
+    if line.line_type == "inbound":
+        # переносим запас из DOCK_IN → целевая зона
+        dest_id  = line.metadata["putaway_target_zone_id"]
+        dest_z   = state.zones[dest_id]
+        src_z    = state.zones[line.zone_id]
+
+        moved_qty = min(line.qty, src_z.current_qty)
+        src_z.current_qty  -= moved_qty
+        dest_z.current_qty = min(dest_z.capacity, dest_z.current_qty + moved_qty)
+        zone_changed(state, src_z, dest_z)
+
+        # перемещаем работника в конечную зону
+        worker_obj = state.workers[line.assigned_worker_id]
+        worker_obj.current_zone_id = dest_id
+
+    w.assigned_line_id = None
+    w.state = "idle"
+    w.phase = None
+    w.pick_remaining = w.travel_remaining = 0
+
+    # маршрут из нескольких линий: сразу выходим к следующей остановке
+    if w.tour:
+        start_next_stop(state, w)
+    elif w.retiring:                     # сокращённый сборщик уходит со смены
+        w.retiring = False
+        w.state = "off"
@@ -0,0 +1,139 @@
+# core/env/progress_vector.py
+"""
+Векторная модель прогресса для больших флотов (десятки сборщиков,
+сотни AMR). Включается ``progress.engine: vector`` в sim_params.yaml.
+
+Фаза, travel_remaining, pick_remaining и speed_factor работников лежат
+в numpy‑массивах; за тик все активные продвигаются одной операцией,
+в Python применяются только завершения (finish_travel / finish_pick
+из progress_model — те же переходы, что у скалярной модели). Вычитания
+идут в том же float64 и в том же порядке, завершения — в порядке
+state.workers, поэтому результат совпадает со скалярной моделью бит‑в‑бит.
+
+Пока работник в пути/на сборке, источник правды — массивы: поля
+travel_remaining / pick_remaining у объекта Worker обновляются только
+в ``sync_workers`` (engine.close, смена модели). phase, state и
+current_zone_id меняются на объектах сразу.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .models import WorldState, Worker
+from .progress_model import finish_travel, finish_pick
+
+IDLE, TRAVEL, PICK = 0, 1, 2
+_PHASE_CODE = {"travel": TRAVEL, "pick": PICK}
+
+
+class VectorProgress:
+    def __init__(self):
+        self.workers: List[Worker] = []
+        self.slot: Dict[str, int] = {}
+        self.phase = np.zeros(0, np.int8)
+        self.travel = np.zeros(0)
+        self.pick = np.zeros(0)
+        self.speed = np.zeros(0)
+
+    # ---------- синхронизация с объектами Worker ----------
+    def _rebuild(self, state: WorldState):
+        """Состав флота поменялся (apply_live_patch нанял сборщиков)."""
+        self.sync_workers()
+        self.workers = list(state.workers.values())
+        self.slot = {w.id: i for i, w in enumerate(self.workers)}
+        n = len(self.workers)
+        self.phase = np.zeros(n, np.int8)
+        self.travel = np.zeros(n)
+        self.pick = np.zeros(n)
+        self.speed = np.array([w.speed_factor for w in self.workers], dtype=float)
+        for i, w in enumerate(self.workers):
+            self._load(i, w)
+
+    def _load(self, i: int, w: Worker):
+        if w.state in ("idle", "off", "charging") or not w.assigned_line_id:
+            return
+        code = _PHASE_CODE.get(w.phase, IDLE)
+        self.phase[i] = code
+        self.travel[i] = w.travel_remaining
+        self.pick[i] = w.pick_remaining
+
+    def _pick_up_assignments(self, state: WorldState, assigned: Iterable[Worker]):
+        """Новые задачи этого тика (их возвращает диспетчер)."""
+        if len(self.workers) != len(state.workers):
+            self._rebuild(state)
+            return
+        for w in assigned:
+            self._load(self.slot[w.id], w)
+
+    def sync_workers(self, state: WorldState | None = None):
+        """Переписываем остатки активных работников из массивов в объекты (state не нужен)."""
+        workers = self.workers
+        for i in np.flatnonzero(self.phase != IDLE).tolist():
+            w = workers[i]
+            w.travel_remaining = float(self.travel[i])
+            w.pick_remaining = float(self.pick[i])
+
+    # ---------- тик ----------
+    def advance(self, state: WorldState, tick: int, assigned: Iterable[Worker] = ()):
+        self._pick_up_assignments(state, assigned)
+        phase = self.phase
+        delta = tick * self.speed
+        in_travel = phase == TRAVEL
+        in_pick = phase == PICK
+
+        travel_done = in_travel & (delta >= self.travel)
+        pick_done = in_pick & (delta >= self.pick)
+        np.subtract(self.travel, delta, out=self.travel, where=in_travel & ~travel_done)
+        np.subtract(self.pick, delta, out=self.pick, where=in_pick & ~pick_done)
+
+        done = np.flatnonzero(travel_done | pick_done)
+        if not len(done):
+            return
+        lines = state.order_lines
+        workers = self.workers
+        for i in done.tolist():
+            w = workers[i]
+            line = lines[w.assigned_line_id]
+            if phase[i] == TRAVEL:
+                finish_travel(w, line)
+                phase[i] = PICK
+                self.travel[i] = 0.0
+            else:
+                finish_pick(state, w, line, tick)
+                phase[i] = IDLE
+                self.travel[i] = self.pick[i] = 0.0
+                if w.assigned_line_id:           # следующая остановка маршрута
+                    self._load(i, w)
+
+    # ---------- discrete‑event режим ----------
+    def ticks_until_next(self, tick: int) -> Optional[int]:
+        """
+        Минимум «пустых» тиков до ближайшего завершения travel/pick —
+        векторный аналог _ticks_until_done: те же вычитания, пока хоть
+        один работник не дойдёт до ``delta >= remaining``.
+        """
+        active = self.phase != IDLE
+        if not active.any():
+            return None
+        delta = (tick * self.speed)[active]
+        if not (delta > 0).any():
+            return None
+        remaining = np.where(self.phase == TRAVEL, self.travel, self.pick)[active]
+        delta = np.where(delta > 0, delta, 0.0)
+        n = 0
+        while not (delta >= remaining)[delta > 0].any():
+            remaining -= delta
+            n += 1
+        return n
+
+    def skip(self, ticks: int, tick: int):
+        """Пропуск ``ticks`` пустых тиков: повторяем вычитание поштучно (как тиковая модель)."""
+        if ticks <= 0:
+            return
+        delta = tick * self.speed
+        in_travel = self.phase == TRAVEL
+        in_pick = self.phase == PICK
+        for _ in range(ticks):
+            np.subtract(self.travel, delta, out=self.travel, where=in_travel)
+            np.subtract(self.pick, delta, out=self.pick, where=in_pick)
@@ -1,38 +1,179 @@
-from typing import Callable
+from __future__ import annotations
+import bisect, heapq
+from typing import Callable, Dict, List, Optional, Tuple
 from .models import WorldState, Zone, SKU
 
 _AGENT_CB: Callable | None = None
 
+PUTAWAY_STRATEGIES = ("least_fill", "best_fit")
+
+
 def register_agent(cb: Callable):           # остаётся
     global _AGENT_CB
     _AGENT_CB = cb
 
+
+def _fill_ratio(z: Zone) -> float:
+    # зона с нулевой ёмкостью — «полная» (раньше здесь было деление на 0)
+    return z.current_qty / z.capacity if z.capacity > 0 else float("inf")
+
+
+# ---------- индекс put‑away ----------
+class _Group:
+    """Кандидаты одного набора SKU: куча по заполненности + список по свободному месту."""
+    __slots__ = ("zone_ids", "pos", "heap", "by_free", "free_key")
+
+    def __init__(self, zone_ids: Tuple[str, ...]):
+        self.zone_ids = zone_ids
+        self.pos = {zid: i for i, zid in enumerate(zone_ids)}
+        self.heap: List[tuple] = []                   # (ratio, pos, zone_id, version)
+        self.by_free: List[tuple] = []                # отсортирован: (free, pos, zone_id)
+        self.free_key: Dict[str, tuple] = {}
+
+
+class PutawayIndex:
+    """
+    Индекс зон хранения для choose_zone.
+
+    Кандидаты SKU (candidate_zones ∩ storage, иначе все storage)
+    считаются один раз при построении; SKU с одинаковым набором делят
+    одну группу. В группе:
+    • min‑куча (fill_ratio, порядок в кандидатах) с ленивым удалением
+      по версии зоны — least_fill, если вершина вмещает qty;
+    • отсортированный список (свободно, порядок) — best_fit бинарным
+      поиском, и проверка «куда влезает» для least_fill: при полной
+      вершине перебираются только зоны с местом ≥ qty.
+    Изменения current_qty сообщаются через ``zone_changed``.
+    """
+
+    def __init__(self, zones: Dict[str, Zone], skus: Dict[str, SKU],
+                 strategy: str = "least_fill"):
+        if strategy not in PUTAWAY_STRATEGIES:
+            raise ValueError(f"unknown putaway strategy: {strategy}")
+        self.strategy = strategy
+        self.n_zones = len(zones)
+        self.version: Dict[str, int] = {}
+        self.groups: Dict[Tuple[str, ...], _Group] = {}
+        self.zone_groups: Dict[str, List[_Group]] = {}
+        storage = tuple(zid for zid, z in zones.items() if z.type == "storage")
+        self.sku_group: Dict[str, _Group] = {
+            sku.id: self._group(self._candidates(sku, zones) or storage)
+            for sku in skus.values()
+        }
+        self._all = self._group(storage)
+        for zid in self.zone_groups:
+            self.update(zones[zid])
+
+    @staticmethod
+    def _candidates(sku: SKU, zones: Dict[str, Zone]) -> Tuple[str, ...]:
+        return tuple(
+            zid for zid in (sku.candidate_zones or [])
+            if zid in zones and zones[zid].type == "storage"
+        )
+
+    def _group(self, zone_ids: Tuple[str, ...]) -> _Group:
+        g = self.groups.get(zone_ids)
+        if g is None:
+            g = self.groups[zone_ids] = _Group(zone_ids)
+            for zid in zone_ids:
+                self.zone_groups.setdefault(zid, []).append(g)
+        return g
+
+    # ---------- обновление ----------
+    def update(self, z: Zone):
+        groups = self.zone_groups.get(z.id)
+        if not groups:
+            return                                   # не storage — в индексе нет
+        ver = self.version[z.id] = self.version.get(z.id, 0) + 1
+        ratio = _fill_ratio(z)
+        free = z.capacity - z.current_qty
+        for g in groups:
+            pos = g.pos[z.id]
+            heapq.heappush(g.heap, (ratio, pos, z.id, ver))
+            if len(g.heap) > 4 * len(g.zone_ids) + 16:
+                self._compact(g)
+            old = g.free_key.get(z.id)
+            if old is not None:
+                del g.by_free[bisect.bisect_left(g.by_free, old)]
+            key = g.free_key[z.id] = (free, pos, z.id)
+            bisect.insort(g.by_free, key)
+
+    def _compact(self, g: _Group):
+        """Выкидываем устаревшие записи кучи (иначе она растёт с каждым update)."""
+        version = self.version
+        g.heap = [e for e in g.heap if e[3] == version[e[2]]]
+        heapq.heapify(g.heap)
+
+    # ---------- запросы ----------
+    def least_fill(self, g: _Group, qty: int, zones: Dict[str, Zone]) -> Optional[Zone]:
+        """Минимально заполненная зона, куда влезает qty; иначе просто минимально заполненная."""
+        heap, version = g.heap, self.version
+        while heap and heap[0][3] != version[heap[0][2]]:
+            heapq.heappop(heap)                     # устаревшая запись
+        if not heap:
+            return None
+        z = zones[heap[0][2]]
+        if z.current_qty + qty <= z.capacity:
+            return z
+        # вершина не влезает: подходящие зоны — хвост by_free, кучу не трогаем
+        i = bisect.bisect_left(g.by_free, (qty,))
+        if i == len(g.by_free):
+            return z
+        best = min(g.by_free[i:], key=lambda e: (_fill_ratio(zones[e[2]]), e[1]))
+        return zones[best[2]]
+
+    def best_fit(self, g: _Group, qty: int, zones: Dict[str, Zone]) -> Optional[Zone]:
+        """Зона с наименьшим свободным местом ≥ qty; иначе — least_fill."""
+        i = bisect.bisect_left(g.by_free, (qty,))
+        if i < len(g.by_free):
+            return zones[g.by_free[i][2]]
+        return self.least_fill(g, qty, zones)
+
+    def choose(self, sku: SKU, qty: int, zones: Dict[str, Zone]) -> Optional[Zone]:
+        g = self.sku_group.get(sku.id)
+        if g is None:
+            # SKU появился после построения индекса
+            g = self.sku_group[sku.id] = self._group(self._candidates(sku, zones) or self._all.zone_ids)
+            if not g.free_key:                       # новая группа — заполняем
+                for zid in g.zone_ids:
+                    self.update(zones[zid])
+        if self.strategy == "best_fit":
+            return self.best_fit(g, qty, zones)
+        return self.least_fill(g, qty, zones)
+
+
+def ensure_putaway_index(state: WorldState) -> PutawayIndex:
+    """Индекс из state; строим при первом обращении и при смене состава зон."""
+    idx = state.putaway_index
+    if idx is None or idx.n_zones != len(state.zones):
+        strategy = idx.strategy if idx is not None else "least_fill"
+        idx = state.putaway_index = PutawayIndex(state.zones, state.skus, strategy)
+    return idx
+
+
+def zone_changed(state: WorldState, *zones: Zone):
+    """Сообщаем индексу, что у зон поменялся current_qty."""
+    idx = state.putaway_index
+    if idx is None:
+        return
+    for z in zones:
+        idx.update(z)
+
+
 def _default_zone(sku: SKU, qty: int, state: WorldState) -> Zone:
     """
     Very simple put‑away:
-    1) пробуем candidate_zones, но оставляем только те, что реально
-       существуют и являются storage;
-    2) если список пуст – берём все storage зоны;
-    3) возвращаем зону с минимальной заполненностью,
-       но у которой ещё осталось место для qty.
+    1) candidate_zones SKU, но только существующие storage
+       (посчитано заранее в PutawayIndex);
+    2) если список пуст – все storage зоны;
+    3) минимально заполненная зона, у которой ещё осталось место для
+       qty (least_fill), либо с наименьшим подходящим остатком места
+       (best_fit, putaway.strategy в sim_params.yaml).
     """
-    # ← 1. фильтруем только валидные storage‑ID
-    cand = [
-        zid for zid in (sku.candidate_zones or [])
-        if zid in state.zones and state.zones[zid].type == "storage"
-    ]
-
-    # ← 2. если после фильтрации ничего не осталось — берём все storage
-    if not cand:
-        cand = [zid for zid, z in state.zones.items() if z.type == "storage"]
-
-    # ← 3. ищем свободные, потом минимально заполнённую
-    free = [
-        state.zones[zid] for zid in cand
-        if state.zones[zid].current_qty + qty <= state.zones[zid].capacity
-    ]
-    pool = free or [state.zones[zid] for zid in cand]
-    return min(pool, key=lambda z: z.current_qty / z.capacity)
+    zone = ensure_putaway_index(state).choose(sku, qty, state.zones)
+    if zone is None:
+        raise ValueError("no storage zones for put-away")
+    return zone
 
 def choose_zone(sku: SKU, qty: int, state: WorldState) -> Zone:
     # 0) попробуем «явную» зону, если она существует
@@ -0,0 +1,246 @@
+# core/env/quantiles.py
+"""
+Потоковые квантили lead time линий (p50 / p95 / p99).
+
+DDSketch: значение x > 0 попадает в бакет k = ⌈log_γ x⌉, γ = (1+α)/(1−α);
+оценка квантиля отличается от истинного значения не более чем на α
+(относительная ошибка). Память — число бакетов (≤ max_bins: при
+переполнении сливаем самые младшие, точность страдает только на нижних
+квантилях). Два скетча с одинаковым α складываются бакет к бакету —
+сливаем репликации и шарды без исходных значений.
+
+LeadTimeSketches держит скетч на группу: "all", "client:<id>",
+"zone:<id>", "line_type:<type>"; пополняется в kpi.record_done.
+LeadTimeWindows — те же скетчи по бакетам сим‑времени: квантили окна
+rollup = слияние бакетов окна.
+"""
+from __future__ import annotations
+import bisect, json, math
+from typing import Dict, Iterable, List, Optional, Sequence
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.alpha = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0                                # значения ≤ 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._cache = None                           # (count, отсортированные ключи, накопленные счётчики)
+
+    def key(self, x: float) -> Optional[int]:
+        return math.ceil(math.log(x) / self._log_gamma) if x > 0 else None
+
+    def add(self, x: float, key: Optional[int] = None):
+        """``key`` можно передать готовым (одно значение в несколько скетчей)."""
+        if key is None:
+            key = self.key(x)
+        if key is None:
+            self.zero += 1
+        else:
+            bins = self.bins
+            bins[key] = bins.get(key, 0) + 1
+            if len(bins) > self.max_bins:
+                self._collapse()
+        self.count += 1
+        self.total += x
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def _collapse(self):
+        keys = sorted(self.bins)
+        extra = len(keys) - self.max_bins
+        if extra <= 0:
+            return
+        moved = sum(self.bins.pop(k) for k in keys[:extra])
+        self.bins[keys[extra]] += moved
+
+    def merge(self, other: "DDSketch"):
+        if not math.isclose(self.gamma, other.gamma):
+            raise ValueError("cannot merge sketches with different relative_accuracy")
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self._collapse()
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _sorted(self):
+        if self._cache is None or self._cache[0] != self.count:
+            keys = sorted(self.bins)
+            cum, run = [], self.zero
+            for k in keys:
+                run += self.bins[k]
+                cum.append(run)
+            self._cache = (self.count, keys, cum)
+        return self._cache[1], self._cache[2]
+
+    def quantile(self, q: float) -> float:
+        """Оценка q‑квантиля (0 ≤ q ≤ 1); пустой скетч — 0.0."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        if rank < self.zero:
+            return max(self.min, 0.0)
+        keys, cum = self._sorted()
+        lo, hi = 0, len(cum) - 1                     # первый бакет с cum > rank
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cum[mid] > rank:
+                hi = mid
+            else:
+                lo = mid + 1
+        value = 2 * self.gamma ** keys[lo] / (self.gamma + 1)
+        return min(max(value, self.min), self.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    # ---------- сериализация ----------
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha, "max_bins": self.max_bins,
+            "count": self.count, "zero": self.zero, "sum": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "bins": {str(k): n for k, n in self.bins.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "DDSketch":
+        s = cls(d["alpha"], d["max_bins"])
+        s.bins = {int(k): n for k, n in d["bins"].items()}
+        s.count, s.zero, s.total = d["count"], d["zero"], d["sum"]
+        if s.count:
+            s.min, s.max = d["min"], d["max"]
+        return s
+
+
+class LeadTimeSketches:
+    """Скетчи lead time по группам: весь поток, клиент, зона, тип линии."""
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.alpha = relative_accuracy
+        self.max_bins = max_bins
+        self.sketches: Dict[str, DDSketch] = {}
+        self._probe = DDSketch(relative_accuracy, max_bins)   # только для key()
+
+    def _sketch(self, group: str) -> DDSketch:
+        s = self.sketches.get(group)
+        if s is None:
+            s = self.sketches[group] = DDSketch(self.alpha, self.max_bins)
+        return s
+
+    def add(self, client_id: str, zone_id: str, line_type: str, x: float):
+        key = self._probe.key(x)
+        for group in ("all", f"client:{client_id}", f"zone:{zone_id}", f"line_type:{line_type}"):
+            self._sketch(group).add(x, key)
+
+    def merge(self, other: "LeadTimeSketches"):
+        for group, s in other.sketches.items():
+            self._sketch(group).merge(s)
+
+    def summary(self, groups: Optional[Iterable[str]] = None,
+                qs: Sequence[float] = QUANTILES) -> Dict[str, Dict[str, float]]:
+        """{группа: {n, p50, p95, p99}} (секунды)."""
+        out = {}
+        for group in sorted(groups if groups is not None else self.sketches):
+            s = self.sketches.get(group)
+            if s is None:
+                continue
+            row = {"n": s.count}
+            row.update({f"p{round(q * 100)}": round(s.quantile(q), 1) for q in qs})
+            out[group] = row
+        return out
+
+    def to_dict(self) -> dict:
+        return {"alpha": self.alpha, "max_bins": self.max_bins,
+                "sketches": {g: s.to_dict() for g, s in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LeadTimeSketches":
+        obj = cls(d["alpha"], d["max_bins"])
+        obj.sketches = {g: DDSketch.from_dict(s) for g, s in d["sketches"].items()}
+        return obj
+
+
+class LeadTimeWindows:
+    """
+    LeadTimeSketches по бакетам сим‑времени: бакет k — [k·bucket_s,
+    (k+1)·bucket_s). since(start) сливает бакеты с начала бакета start,
+    т.е. граница окна не кратная bucket_s округляется вниз. Бакеты старше
+    retention_s (metrics.window_horizon_seconds) выбрасываются. Память ~ число бакетов × групп, поэтому
+    бакет шире, чем у KpiBuckets (metrics.quantiles.bucket_seconds).
+    """
+
+    def __init__(self, bucket_s: int = 300, relative_accuracy: float = 0.01,
+                 max_bins: int = 2048, retention_s: Optional[int] = None):
+        self.bucket_s = max(1, int(bucket_s))
+        self.alpha = relative_accuracy
+        self.max_bins = max_bins
+        self.retention_s = retention_s
+        self.keys: List[int] = []
+        self.buckets: List[LeadTimeSketches] = []
+
+    def add(self, t: int, client_id: str, zone_id: str, line_type: str, x: float):
+        key = t // self.bucket_s
+        keys = self.keys
+        if keys and keys[-1] == key:
+            sk = self.buckets[-1]
+        else:
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:       # опоздавшее событие
+                sk = self.buckets[i]
+            else:
+                sk = LeadTimeSketches(self.alpha, self.max_bins)
+                keys.insert(i, key)
+                self.buckets.insert(i, sk)
+                if self.retention_s is not None:
+                    self._trim(keys[-1] - self.retention_s // self.bucket_s)
+        sk.add(client_id, zone_id, line_type, x)
+
+    def _trim(self, horizon: int):
+        n = bisect.bisect_left(self.keys, horizon)
+        if n:
+            del self.keys[:n], self.buckets[:n]
+
+    def since(self, start: int) -> LeadTimeSketches:
+        """Сводный скетч линий, завершённых не раньше начала бакета ``start``."""
+        out = LeadTimeSketches(self.alpha, self.max_bins)
+        i = bisect.bisect_left(self.keys, start // self.bucket_s)
+        for sk in self.buckets[i:]:
+            out.merge(sk)
+        return out
+
+
+def save_sketches(sk: LeadTimeSketches, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sk.to_dict(), f)
+
+
+def load_sketches(path: str) -> LeadTimeSketches:
+    with open(path, encoding="utf-8") as f:
+        return LeadTimeSketches.from_dict(json.load(f))
+
+
+def merge_sketches(parts: Iterable[LeadTimeSketches]) -> Optional[LeadTimeSketches]:
+    """Сводный скетч репликаций / шардов; None — нечего сливать."""
+    merged = None
+    for sk in parts:
+        if merged is None:
+            merged = LeadTimeSketches(sk.alpha, sk.max_bins)
+        merged.merge(sk)
+    return merged
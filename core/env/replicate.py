@@ -0,0 +1,153 @@
+# core/env/replicate.py
+"""
+Monte‑Carlo репликации: один конфиг × много seed'ов на пуле процессов.
+
+Запуск:
+    python -m core.env.replicate --seeds 32 --workers 8 --shift-seconds 28800
+
+Каждая задача = один seed: build_initial_state + SimulationEngine до
+конца смены. У каждого прогона свой каталог (events, metrics, архив),
+поэтому процессы не пишут в общие файлы. Итог — KPI по seed'ам и
+сводка mean / stddev / перцентили по каждому KPI, плюс p50/p95/p99
+lead time по слитым скетчам всех seed'ов (lead_time.csv).
+"""
+from __future__ import annotations
+import argparse, copy, csv, datetime, math, os, pathlib, statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from .state_builder import load_yaml, build_initial_state
+from .simulation_engine import SimulationEngine
+from .metrics import flush_metrics, rollup, window_metrics
+from .kpi import ensure_lead_sketches
+from .quantiles import save_sketches, load_sketches, merge_sketches
+
+PERCENTILES = (5, 50, 95)
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    """Линейная интерполяция между соседними рангами (как numpy по умолчанию)."""
+    if not sorted_vals:
+        return 0.0
+    pos = (len(sorted_vals) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def run_replication(sim_cfg: dict, seed: int, out_dir: str) -> Dict[str, Any]:
+    """Один прогон; все файлы прогона пишутся в ``out_dir``."""
+    cfg = copy.deepcopy(sim_cfg)
+    run_dir = pathlib.Path(out_dir)
+    run_dir.mkdir(parents=True, exist_ok=True)
+
+    log_cfg = cfg.setdefault("event_log", {})
+    if log_cfg.get("format", "csv") != "none":
+        ext = "bin" if log_cfg.get("format") == "bin" else "csv"
+        log_cfg["path"] = str(run_dir / f"events.{ext}")
+    arch_cfg = cfg.setdefault("archive", {})
+    arch_cfg["path"] = str(run_dir / "lines_archive.sqlite")
+
+    state = build_initial_state({}, cfg, seed=seed)
+    shift_end = cfg["time"]["shift_seconds"]
+    with SimulationEngine(state, cfg) as engine:
+        while state.sim_time < shift_end:
+            engine.step(until=shift_end)
+    flush_metrics(state, str(run_dir / "metrics_run.csv"))
+    save_sketches(ensure_lead_sketches(state.metrics), str(run_dir / "lead_sketches.json"))
+
+    kpi: Dict[str, Any] = {"seed": seed}
+    kpi.update(window_metrics(state, shift_end))
+    roll = rollup(state, shift_end)
+    for key in ("mean_cycle_s", "otif", "zone_fill_avg", "lead_p50_s", "lead_p95_s", "lead_p99_s"):
+        kpi[key] = roll[key]
+    kpi["stockouts"] = getattr(state.metrics, "stockouts", 0)
+    kpi["throughput_lph"] = round(kpi["order_lines_done"] / (shift_end / 3600), 2) if shift_end else 0.0
+    return kpi
+
+
+def aggregate(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """KPI → {n, mean, stddev, p5, p50, p95, min, max}."""
+    keys = [k for k in runs[0] if k != "seed"] if runs else []
+    summary: Dict[str, Dict[str, float]] = {}
+    for key in keys:
+        vals = sorted(float(r[key]) for r in runs)
+        row = {
+            "n": len(vals),
+            "mean": statistics.fmean(vals),
+            "stddev": statistics.stdev(vals) if len(vals) > 1 else 0.0,
+            "min": vals[0],
+            "max": vals[-1],
+        }
+        for q in PERCENTILES:
+            row[f"p{q}"] = _percentile(vals, q)
+        summary[key] = row
+    return summary
+
+
+def merge_lead_sketches(out_root: str, seeds: List[int]) -> List[Dict[str, Any]]:
+    """Сливаем скетчи lead time по seed'ам: строки {group, n, p50, p95, p99}."""
+    paths = [os.path.join(out_root, f"seed_{s}", "lead_sketches.json") for s in seeds]
+    merged = merge_sketches(load_sketches(p) for p in paths if os.path.exists(p))
+    if merged is None:
+        return []
+    return [{"group": g, **row} for g, row in merged.summary().items()]
+
+
+def run_replications(sim_cfg: dict, seeds: List[int], out_root: str,
+                     workers: int | None = None) -> List[Dict[str, Any]]:
+    """Раскидываем seed'ы по пулу процессов; результат в порядке seeds."""
+    out_dirs = [os.path.join(out_root, f"seed_{s}") for s in seeds]
+    if workers == 1:
+        return [run_replication(sim_cfg, s, d) for s, d in zip(seeds, out_dirs)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_replication, [sim_cfg] * len(seeds), seeds, out_dirs))
+
+
+def _write_csv(path: pathlib.Path, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        w.writeheader()
+        w.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", default="config/sim_params.yaml")
+    parser.add_argument("--shift-seconds", type=int, default=None)
+    parser.add_argument("--seeds", type=int, default=16, help="сколько seed'ов")
+    parser.add_argument("--first-seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="процессов (по умолчанию = ядер)")
+    parser.add_argument("--engine-mode", choices=["tick", "event"], default="event")
+    parser.add_argument("--event-log", choices=["csv", "bin", "none"], default="none")
+    parser.add_argument("--out", default=None, help="каталог результатов")
+    args = parser.parse_args()
+
+    sim_cfg = load_yaml(args.params)
+    sim_cfg.setdefault("time", {})
+    if args.shift_seconds:
+        sim_cfg["time"]["shift_seconds"] = args.shift_seconds
+    sim_cfg["time"]["mode"] = args.engine_mode
+    sim_cfg.setdefault("event_log", {})["format"] = args.event_log
+
+    stamp = datetime.datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    out_root = pathlib.Path(args.out or f"results/replications/{stamp}")
+    out_root.mkdir(parents=True, exist_ok=True)
+
+    seeds = list(range(args.first_seed, args.first_seed + args.seeds))
+    runs = run_replications(sim_cfg, seeds, str(out_root), args.workers)
+    summary = aggregate(runs)
+
+    _write_csv(out_root / "runs.csv", runs)
+    _write_csv(out_root / "summary.csv", [{"kpi": k, **v} for k, v in summary.items()])
+    _write_csv(out_root / "lead_time.csv", merge_lead_sketches(str(out_root), seeds))
+
+    print(f"{len(runs)} replications → {out_root}")
+    for k, v in summary.items():
+        print(f"{k:>20}: mean={v['mean']:.3f} sd={v['stddev']:.3f} "
+              f"p5={v['p5']:.3f} p50={v['p50']:.3f} p95={v['p95']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
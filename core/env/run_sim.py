@@ -2,69 +2,34 @@ from __future__ import annotations
 import argparse
 from .state_builder import load_yaml, build_initial_state
 from .simulation_engine import SimulationEngine
-from .metrics import flush_metrics
+from .metrics import flush_metrics, window_metrics as _window_metrics
 from .frame_exporter import snapshot, dump_run
+from .warm_cache import WarmCache, warm_start
 from core.optimizer.client import propose_patch
 import random, csv, json, datetime, pathlib, shutil
 from dotenv import load_dotenv, find_dotenv
-from core.optimizer.schema import ALLOWED_PATCH
+from core.optimizer.patch import apply_patch as _apply_patch
 
 load_dotenv(find_dotenv())
 frames: list[dict] = []
 
 
-def _apply_patch(cfg: dict, patch: dict) -> dict:
-    """
-    Apply only keys declared in core.optimizer.schema.ALLOWED_PATCH.
-    Supports вложенные пути через точку.
-    """
-    applied = {}
-    for path, val in (patch or {}).items():
-        if path not in ALLOWED_PATCH:
-            print(f"Skip unknown key: {path}")
-            continue
-        spec = ALLOWED_PATCH[path]
-        try:
-            v = spec["type"](val)
-        except Exception:
-            print(f"Type mismatch for {path}")
-            continue
-        # clamp
-        v = max(spec["min"], min(v, spec["max"]))
-        # пройти по словарю
-        target = cfg
-        parts = path.split(".")
-        for p in parts[:-1]:
-            target = target[p]
-        target[parts[-1]] = v
-        applied[path] = v
-    return applied
-
-
-def _window_metrics(state, window_s: int) -> dict:
-    start = max(0, state.sim_time - window_s)
-    done = [l for l in state.order_lines.values()
-            if l.status == "done" and (l.done_time or 0) > start]
-    lead = 0.0
-    if done:
-        lead = sum((l.done_time - l.created_time) for l in done) / len(done)
-    docks_total = len(state.docks) or 1
-    busy = sum(1 for d in state.docks.values() if d.status == "busy")
-    idle = sum(1 for w in state.workers.values() if w.state == "idle")
-    util = (len(state.workers) - idle) / max(1, len(state.workers))
-    return {
-        "order_lines_done": len(done),
-        "dock_util": round(busy / docks_total, 2),
-        "avg_lead_time_min": round(lead / 60, 1),
-        "worker_util": round(util, 2),
-    }
-
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--layout", default="config/layout.yaml")  # не нужен для build_initial_state напрямую, но оставим
     parser.add_argument("--params", default="config/sim_params.yaml")
     parser.add_argument("--shift-seconds", type=int, default=None)
     parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--engine-mode", choices=["tick", "event"], default=None,
+                        help="tick – шаг base_tick_seconds; event – прыжки между событиями")
+    parser.add_argument("--progress-engine", choices=["heap", "scalar", "vector"], default=None,
+                        help="scalar (по умолчанию)/vector – покадровые модели; heap – финиш задач "
+                             "в закрытой форме, KPI немного отличаются от покадровых")
+    parser.add_argument("--demand-trace", default=None, metavar="DIR",
+                        help="спрос из готовой трассы (core.env.demand_trace) вместо выборки на лету")
+    parser.add_argument("--warmup-seconds", type=int, default=None,
+                        help="стартовать с прогретого состояния (кэш по хэшу конфигов); "
+                             "прогрев не входит в смену: прогон идёт до warmup + shift_seconds")
     args = parser.parse_args()
 
     sim_cfg = load_yaml(args.params)
@@ -75,12 +40,30 @@ def main():
     if args.shift_seconds:
         sim_cfg.setdefault("time", {})
         sim_cfg["time"]["shift_seconds"] = args.shift_seconds
+    if args.engine_mode:
+        sim_cfg.setdefault("time", {})
+        sim_cfg["time"]["mode"] = args.engine_mode
+    if args.progress_engine:
+        sim_cfg.setdefault("progress", {})["engine"] = args.progress_engine
+    if args.demand_trace:
+        sim_cfg["demand"] = {**sim_cfg.get("demand", {}), "source": "trace",
+                             "trace_path": args.demand_trace}
 
     if "files" not in sim_cfg:
         raise ValueError("sim_params.yaml должен содержать секцию files: layout/skus/clients")
 
-    state = build_initial_state({}, sim_cfg, seed=args.seed)
-    engine = SimulationEngine(state, sim_cfg)
+    warm_cfg = sim_cfg.get("warmup", {})
+    warmup_s = args.warmup_seconds if args.warmup_seconds is not None else warm_cfg.get("seconds", 0)
+    if warmup_s:
+        # смена отсчитывается после прогрева (и трасса спроса нужна на warmup + смену)
+        sim_cfg["time"]["shift_seconds"] += warmup_s
+        cache = WarmCache(warm_cfg.get("cache_dir", ".cache/warmup"), warm_cfg.get("max_entries", 8))
+        engine, hit = warm_start(sim_cfg, args.seed, warmup_s, cache)
+        state = engine.state
+        print(f"Warm start at t={state.sim_time} ({'cache hit' if hit else 'warmed up, cached'})")
+    else:
+        state = build_initial_state({}, sim_cfg, seed=args.seed)
+        engine = SimulationEngine(state, sim_cfg)
 
     shift_end = sim_cfg["time"]["shift_seconds"]
     opt_cfg = sim_cfg.get("optimizer", {})
@@ -94,9 +77,18 @@ def main():
     while state.sim_time < shift_end:
         window_end = min(shift_end, window_start + period_sec)
         while state.sim_time < window_end:
-            engine.step()
-            if state.sim_time % snap_every == 0:
-                frames.append(snapshot(state))
+            prev_t = state.sim_time
+            engine.step(until=window_end)
+            # в event‑режиме пропущенные тики ничего не меняют —
+            # дублируем кадр на каждую точку snap_every внутри прыжка
+            frame = None
+            for t in range(prev_t + engine.tick_seconds, state.sim_time + 1, engine.tick_seconds):
+                if t % snap_every != 0:
+                    continue
+                if frame is None:
+                    engine.sync_workers()
+                    frame = snapshot(state)
+                frames.append({**frame, "t": t})
                 if len(frames) > max_frames:
                     frames.pop(0)
 
@@ -120,6 +112,7 @@ def main():
     layout_dict = {"zones": [asdict(z) for z in state.zones.values()]}
     dump_run(layout_dict, frames)            # <= сохраняем JSON
 
+    engine.close()
     flush_metrics(state)
     reports_dir = pathlib.Path("results/optimizer")
     reports_dir.mkdir(parents=True, exist_ok=True)
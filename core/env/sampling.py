@@ -0,0 +1,161 @@
+# core/env/sampling.py
+"""
+Генераторы прихода заказов: выбор SKU и пуассоновские объёмы.
+
+• AliasTable – таблица Уокера/Воуза по sku_mix клиента: выбор SKU за
+  O(1) (одно равномерное число), таблица строится один раз на mix
+  (``alias_table`` кэширует по содержимому);
+• poisson – инверсия для малых λ (одно равномерное число), PTRS
+  (Hörmann, 1993) для λ ≥ 10: O(1) в среднем и без exp(-λ) → 0;
+• *_many / draw_delivery – пакетные версии: вся поставка или пачка
+  заказов одним вызовом.
+
+Везде ``rng`` – либо random.Random (воспроизводимо с прежним seed),
+либо numpy.random.Generator (векторно).
+"""
+from __future__ import annotations
+import math
+from functools import lru_cache
+from random import Random
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+
+PTRS_MIN_LAM = 10.0
+
+
+def _is_numpy(rng) -> bool:
+    return isinstance(rng, np.random.Generator)
+
+
+def _mix_items(mix) -> Tuple[tuple, tuple]:
+    """sku_mix: [(sku, w), …] или [{"sku": …, "weight": …}, …] → (skus, weights)."""
+    if mix and isinstance(mix[0], dict):
+        return tuple(m["sku"] for m in mix), tuple(m["weight"] for m in mix)
+    return tuple(m[0] for m in mix), tuple(m[1] for m in mix)
+
+
+# ---------- alias‑таблица ----------
+class AliasTable:
+    __slots__ = ("items", "prob", "alias", "_np_prob", "_np_alias")
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float]):
+        n = len(items)
+        if n == 0:
+            raise ValueError("empty mix")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("weights must sum to a positive value")
+        self.items = list(items)
+        scaled = [w * n / total for w in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # остатки (погрешность округления) — вероятность 1
+        self.prob = prob
+        self.alias = alias
+        self._np_prob = np.asarray(prob)
+        self._np_alias = np.asarray(alias)
+
+    def draw(self, rng):
+        if _is_numpy(rng):
+            return self.items[int(self.draw_index(rng, 1)[0])]
+        u = rng.random() * len(self.items)
+        i = int(u)
+        return self.items[i] if u - i < self.prob[i] else self.items[self.alias[i]]
+
+    def draw_index(self, rng, n: int) -> np.ndarray:
+        """n индексов в items (numpy‑массив)."""
+        if _is_numpy(rng):
+            u = rng.random(n) * len(self.items)
+        else:
+            u = np.array([rng.random() for _ in range(n)]) * len(self.items)
+        i = u.astype(np.intp)
+        return np.where(u - i < self._np_prob[i], i, self._np_alias[i])
+
+    def draw_many(self, rng, n: int) -> list:
+        if not _is_numpy(rng):
+            return [self.draw(rng) for _ in range(n)]
+        items = self.items
+        return [items[i] for i in self.draw_index(rng, n).tolist()]
+
+
+@lru_cache(maxsize=4096)
+def _alias_cached(items: tuple, weights: tuple) -> AliasTable:
+    return AliasTable(items, weights)
+
+
+def alias_table(mix) -> AliasTable:
+    """Alias‑таблица для sku_mix клиента (кэш по содержимому mix)."""
+    return _alias_cached(*_mix_items(mix))
+
+
+# ---------- Пуассон ----------
+def _poisson_inversion(rng: Random, lam: float) -> int:
+    p = math.exp(-lam)
+    f = p
+    u = rng.random()
+    k = 0
+    while u > f and k < 1000:
+        k += 1
+        p *= lam / k
+        f += p
+    return k
+
+
+def _poisson_ptrs(rng: Random, lam: float) -> int:
+    """Transformed rejection with squeeze (Hörmann), как в numpy."""
+    slam = math.sqrt(lam)
+    loglam = math.log(lam)
+    b = 0.931 + 2.53 * slam
+    a = -0.059 + 0.02483 * b
+    invalpha = 1.1239 + 1.1328 / (b - 3.4)
+    vr = 0.9277 - 3.6224 / (b - 2)
+    while True:
+        u = rng.random() - 0.5
+        v = rng.random()
+        us = 0.5 - abs(u)
+        k = math.floor((2 * a / us + b) * u + lam + 0.43)
+        if us >= 0.07 and v <= vr:
+            return k
+        if k < 0 or (us < 0.013 and v > us):
+            continue
+        if (math.log(v) + math.log(invalpha) - math.log(a / (us * us) + b)
+                <= -lam + k * loglam - math.lgamma(k + 1)):
+            return k
+
+
+def poisson(rng, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    if _is_numpy(rng):
+        return int(rng.poisson(lam))
+    if lam < PTRS_MIN_LAM:
+        return _poisson_inversion(rng, lam)
+    return _poisson_ptrs(rng, lam)
+
+
+def poisson_many(rng, lam: float, n: int) -> List[int]:
+    if _is_numpy(rng):
+        return rng.poisson(max(lam, 0.0), n).tolist()
+    return [poisson(rng, lam) for _ in range(n)]
+
+
+# ---------- пакеты ----------
+def draw_delivery(rng, mix, lines_mean: float, qty_mean: float,
+                  min_lines: int = 1, min_qty: int = 1) -> List[Tuple[Any, int]]:
+    """
+    Одна поставка: число линий ~ Poisson(lines_mean) (не меньше ``min_lines``),
+    для каждой — SKU из mix и qty ~ Poisson(qty_mean) (не меньше ``min_qty``).
+    """
+    n = max(poisson(rng, lines_mean), min_lines)
+    skus = alias_table(mix).draw_many(rng, n)
+    qtys = poisson_many(rng, qty_mean, n)
+    return [(sku, max(q, min_qty)) for sku, q in zip(skus, qtys)]
@@ -4,54 +4,171 @@ from . import wave_manager, dispatcher_heuristic, progress_model, metrics
 from . import client_scheduler
 from . import inbound_scheduler
 from .event_bus import EventBus
+from .line_archive import LineArchive
+from .progress_vector import VectorProgress
+from .progress_heap import HeapProgress
+from .client_calendar import ensure_calendar, weekly_next_time
+from .sampling import poisson, alias_table
+from .demand_trace import DemandCursor, open_trace, INITIAL, INBOUND
 # from core.agents.emergency_agent.emergency_agent import process as emergency_process
 # from core.agents.optimizeras import process as optimizer_process
+import math
 import random
 
+ENGINE_MODES = ("tick", "event")
+# scalar – progress_model (None); vector / heap – объекты с advance/sync_workers
+PROGRESS_ENGINES = {"scalar": None, "vector": VectorProgress, "heap": HeapProgress}
+
+
+def _align(t: int, period: int) -> int:
+    """Наименьшее кратное ``period`` значение, не меньшее ``t``."""
+    return -(-t // period) * period
+
+
+def _ticks_until_done(remaining: float, delta: float) -> int | None:
+    """
+    Сколько «пустых» тиков пройдёт, прежде чем условие ``delta >= remaining``
+    из progress_model сработает. Повторяем те же вычитания, что и тиковая
+    модель, чтобы результат совпадал бит‑в‑бит.
+    """
+    if delta <= 0:
+        return None
+    n = 0
+    while delta < remaining:
+        remaining -= delta
+        n += 1
+    return n
+
+
 class SimulationEngine:
     def __init__(self, state: WorldState, cfg: dict):
         self.state = state
         self.cfg = cfg
         self.tick_seconds = cfg["time"]["base_tick_seconds"]
+        self.mode = cfg["time"].get("mode", "tick")
+        if self.mode not in ENGINE_MODES:
+            raise ValueError(f"unknown engine mode: {self.mode}")
         self.rng = random.Random(state.rng_seed)
-        self.event_bus = EventBus()
+        self.event_bus = EventBus(log_cfg=cfg.get("event_log"),
+                                  history_cfg=cfg.get("event_history"))
+        self.archive: LineArchive | None = None
+        self._open_archive()
+        self.progress: VectorProgress | HeapProgress | None = None
+        self._make_progress()
+        self.demand: DemandCursor | None = None
+        self._open_demand()
+
+    def _open_archive(self):
+        # архив завершённых линий (ограничивает память на длинных прогонах)
+        arch_cfg = self.cfg.get("archive", {})
+        if arch_cfg.get("enabled", False):
+            self.archive = LineArchive(
+                path=arch_cfg.get("path", "lines_archive.sqlite"),
+                batch_size=arch_cfg.get("batch_size", 1000),
+            )
+
+    def _open_demand(self):
+        # спрос: live – выборка по календарю клиентов; trace – поток из файла
+        dem_cfg = self.cfg.get("demand", {})
+        source = dem_cfg.get("source", "live")
+        if source == "trace":
+            self.demand = open_trace(
+                dem_cfg.get("trace_path", "traces/demand"), self.state.clients, self.state.skus,
+                self.cfg["time"]["shift_seconds"], self.state.rng_seed,
+            )
+        elif source != "live":
+            raise ValueError(f"unknown demand source: {source}")
+
+    def _make_progress(self):
+        # модель прогресса работников: покадровая (scalar/vector) или закрытая форма (heap)
+        kind = self.cfg.get("progress", {}).get("engine", "scalar")
+        if kind not in PROGRESS_ENGINES:
+            raise ValueError(f"unknown progress engine: {kind}")
+        self.sync_workers()
+        factory = PROGRESS_ENGINES[kind]
+        self.progress = factory() if factory else None
+
+    def sync_workers(self):
+        """Остатки travel/pick из vector/heap модели → в объекты Worker."""
+        if self.progress is not None:
+            self.progress.sync_workers(self.state)
+
+    def rebind(self, cfg: dict):
+        """
+        Продолжаем восстановленный движок (чекпоинт, тёплый кэш) с
+        конфигом текущего прогона: режим, журнал и архив берутся из ``cfg``.
+        """
+        self.close()
+        self.cfg = cfg
+        self.mode = cfg["time"].get("mode", "tick")
+        if self.mode not in ENGINE_MODES:
+            raise ValueError(f"unknown engine mode: {self.mode}")
+        self.event_bus.set_log(cfg.get("event_log"))
+        self.archive = None
+        self._open_archive()
+        self._make_progress()
+
+    def close(self):
+        """Дописываем буферы на диск; вызывать в конце прогона."""
+        self.sync_workers()
+        self.event_bus.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    # ---------- pickle (чекпоинты, см. core.env.checkpoint) ----------
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["archive"] = None      # sqlite‑соединение остаётся у оригинала
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
     
     def _process_docks(self):
         """
-        Берём/освобождаем док‑станции.
-        Для простоты здесь только задержка; фактическое перемещение товара
-        добавьте в finish_inbound() / finish_outbound() при необходимости.
+        Освобождаем ворота, у которых закончилась разгрузка/погрузка, и
+        ставим на них фуры из очереди (min‑куча busy_until в DockYard —
+        без обхода всех ворот). Товар не задерживается: put‑away‑линии
+        создаются сразу, доки влияют на dock_util / dock_queue.
         """
-        for dock in self.state.docks.values():
-
-            # закончилась текущая операция
-            if dock.status == "busy" and self.state.sim_time >= dock.busy_until:
-                dock.status = "free"
-
-            # можно стартовать новую
-            if dock.status == "free" and dock.queue:
-                _ = dock.queue.pop(0)                            # берём первую фуру
-                dock.status = "busy"
-                dock.busy_until = self.state.sim_time + dock.service_seconds
-
-    def step(self):
-        if self.state.sim_time == 0:
-            client_scheduler.publish_initial_inbound(self.state, self.event_bus, self.rng)
-            # 0) регулярные inbound
-        inbound_scheduler.publish_client_inbound_events(self.state, self.event_bus, self.rng)
-        # 1. Периодическая генерация клиентских outbound (пока прямые qty=1; позже добавим qty вариативность)
-        if self.state.sim_time % 60 == 0:
-            # вместо немедленного создания линий функция теперь должна публиковать события
+        self.state.dock_yard.process(self.state.sim_time)
+
+    def step(self, until: int | None = None):
+        """
+        Один шаг движка.
+        • tick  – обрабатываем текущий тик и сдвигаем время на base_tick_seconds;
+        • event – обрабатываем текущий тик и прыгаем сразу к ближайшему
+          моменту, когда что‑то может измениться (но не дальше ``until``).
+        """
+        self._run_tick()
+        if self.mode == "event":
+            self._jump_to_next_event(until)
+        else:
+            self.state.sim_time += self.tick_seconds
+
+    def _run_tick(self):
+        if self.demand is not None:
+            # 0–1) стартовые поставки, inbound и outbound из готового потока
+            self._publish_trace_demand()
+        else:
+            if self.state.sim_time == 0:
+                client_scheduler.publish_initial_inbound(self.state, self.event_bus, self.rng)
+                # 0) регулярные inbound
+            inbound_scheduler.publish_client_inbound_events(self.state, self.event_bus, self.rng)
+            # 1. Клиентские outbound по календарю (в момент наступления, не по границе минуты)
             self._publish_client_outbound_events()
 
         # 2. Валидация цикла 1
-        self.event_bus.validate_cycle()
+        self.event_bus.validate_cycle(self.state)
 
         # # 3. Emergency агент (реактивные сплиты больших заказов)
         # emergency_process(self.event_bus, self.state, self.cfg)
 
         # 4. Повторная валидация (реакции Emergency)
-        self.event_bus.validate_cycle()
+        self.event_bus.validate_cycle(self.state)
 
         # 5. Применяем события -> создаём OrderLine
         self.event_bus.apply_cycle(self.state)
@@ -60,16 +177,134 @@ class SimulationEngine:
         self._process_docks()
 
         # 6. Waves / Dispatcher / Progress
-        wave_manager.update_waves(self.state, self.cfg)
-        dispatcher_heuristic.assign_lines(self.state)
-        progress_model.advance_progress(self.state, self.tick_seconds)
+        completed = wave_manager.update_waves(self.state, self.cfg)
+        for wave in completed:
+            # собранная волна уезжает фурой с выходного дока
+            self.state.dock_yard.arrive("DOCK_OUT", self.state.sim_time, ref=wave.id)
+        if self.archive is not None:
+            for wave in completed:
+                self.archive.archive_wave(self.state, wave)
+        assigned = dispatcher_heuristic.assign_lines(self.state)
+        if self.progress is not None:
+            self.progress.advance(self.state, self.tick_seconds, assigned)
+        else:
+            progress_model.advance_progress(self.state, self.tick_seconds)
         
         # 7. Метрики
         metrics.collect_periodic(self.state, self.cfg)
         # optimizer_process(self.state, self.cfg)
 
-        # 8. Время
-        self.state.sim_time += self.tick_seconds
+    # ---------- discrete‑event режим ----------
+    def next_event_time(self) -> int:
+        """
+        Календарь ближайших событий после только что обработанного тика.
+        Кандидаты: inbound/outbound клиентов, завершение travel/pick у
+        работников, освобождение доков, таймаут сборки волны и точки
+        снятия метрик. Все времена выравниваются на сетку тиков.
+        """
+        s = self.state
+        tick = self.tick_seconds
+        now = s.sim_time + tick
+        bus = self.event_bus
+
+        # необработанные события (например, OutboundRejected из apply_cycle)
+        if bus.proposed or bus.to_apply:
+            return now
+
+        # волна активировалась в этом тике → новая building‑волна на следующем
+        building = wave_manager.building_wave(s)
+        if building is None:
+            return now
+
+        # диспетчер упёрся в max_assign_per_step, а работа ещё есть;
+        # или волна дособрана и будет закрыта в update_waves
+        if self._dispatch_pending() or self._wave_completion_pending():
+            return now
+
+        candidates = [
+            _align(now, math.lcm(tick, self.cfg["metrics"].get("sample_interval_seconds", 60)))
+        ]
+
+        # волна по таймауту
+        timeout = self.cfg["waves"].get("build_timeout_seconds", 300)
+        candidates.append(_align(max(now, building.created_time + timeout), tick))
+
+        # клиенты: вершины календаря или следующая строка потока спроса
+        if self.demand is not None:
+            dues = (self.demand.next_time(),)
+        else:
+            cal = ensure_calendar(s)
+            dues = (cal.next_time(cal.inbound), cal.next_time(cal.outbound))
+        for due in dues:
+            if due is not None:
+                candidates.append(_align(math.ceil(max(now, due)), tick))
+
+        # доки: ближайшее освобождение ворот
+        release = s.dock_yard.next_release()
+        if release is not None:
+            candidates.append(_align(max(now, release), tick))
+
+        # работники: travel → pick и pick → done
+        if isinstance(self.progress, HeapProgress):
+            t = self.progress.next_time(now, tick)
+            if t is not None:
+                candidates.append(t)
+            return min(candidates)
+        if self.progress is not None:
+            n = self.progress.ticks_until_next(tick)
+            if n is not None:
+                candidates.append(now + n * tick)
+            return min(candidates)
+        for w in s.workers.values():
+            remaining = self._phase_remaining(w)
+            if remaining is None:
+                continue
+            n = _ticks_until_done(remaining, tick * w.speed_factor)
+            if n is not None:
+                candidates.append(now + n * tick)
+
+        return min(candidates)
+
+    def _dispatch_pending(self) -> bool:
+        if not any(w.waiting for w in wave_manager.dispatch_waves(self.state)):
+            return False
+        return any(w.state == "idle" for w in self.state.workers.values())
+
+    def _wave_completion_pending(self) -> bool:
+        return bool(self.state.line_index.drained_waves)
+
+    @staticmethod
+    def _phase_remaining(w) -> float | None:
+        if w.state in ("idle", "off", "charging") or not w.assigned_line_id:
+            return None
+        if w.phase == "travel":
+            return w.travel_remaining
+        if w.phase == "pick":
+            return w.pick_remaining
+        return None
+
+    def _jump_to_next_event(self, until: int | None):
+        """Пропускаем пустые тики: только уменьшаем остатки travel/pick."""
+        tick = self.tick_seconds
+        target = self.next_event_time()
+        if until is not None:
+            target = max(self.state.sim_time + tick, min(target, until))
+        skipped = (target - self.state.sim_time) // tick - 1
+        if isinstance(self.progress, HeapProgress):
+            pass                         # остатки выводятся из task_* лениво
+        elif skipped > 0 and self.progress is not None:
+            self.progress.skip(skipped, tick)
+        elif skipped > 0:
+            for w in self.state.workers.values():
+                if self._phase_remaining(w) is None:
+                    continue
+                delta = tick * w.speed_factor
+                for _ in range(skipped):
+                    if w.phase == "travel":
+                        w.travel_remaining -= delta
+                    else:
+                        w.pick_remaining -= delta
+        self.state.sim_time = target
 
     def _publish_client_outbound_events(self):
         """
@@ -79,17 +314,13 @@ class SimulationEngine:
         # Существующая функция schedule_clients_outbound сейчас создаёт напрямую OrderLine.
         # Мы сделаем лёгкий адаптер: скопируем простую часть логики сюда и уберём прямое создание.
 
-        from .client_scheduler import _poisson, _weighted_choice  # используем внутренние функции
-        for client in self.state.clients.values():
-            if self.state.sim_time < client.next_outbound_time:
-                continue
+        cal = ensure_calendar(self.state)
+        for client_id in cal.pop_due(cal.outbound, self.state.sim_time):
+            client = self.state.clients[client_id]
             ob = client.outbound_cfg
             lam = ob['lines_mean']
-            batch_count = _poisson(self.rng, lam)
-            if batch_count <= 0:
-                batch_count = 1
-            for _ in range(batch_count):
-                sku_id = _weighted_choice(self.rng, client.sku_mix)
+            batch_count = max(poisson(self.rng, lam), 1)
+            for sku_id in alias_table(client.sku_mix).draw_many(self.rng, batch_count):
                 # Qty пока = 1 (можно сделать случайный диапазон позже)
                 qty = 1
                 self.event_bus.publish(
@@ -111,27 +342,38 @@ class SimulationEngine:
                     j = self.rng.randint(ob['jitter_min'], ob['jitter_max']) * 60
                 client.next_outbound_time = self.state.sim_time + base + j
             elif pattern == "weekly":
-                days = ob['days']
-                minute_target = ob['time_minute_of_day']
-                jitter_min = ob.get('jitter_min', 0)
-                jitter_max = ob.get('jitter_max', 0)
-                day_sec = 86400
-                current_day = self.state.sim_time // day_sec
-                minute_of_day = (self.state.sim_time % day_sec) // 60
-                for off in range(0, 15):
-                    test_day = current_day + off
-                    dow = test_day % 7
-                    if dow in days:
-                        if off == 0 and minute_of_day > minute_target:
-                            continue
-                        target_time = test_day * day_sec + minute_target * 60
-                        j = 0
-                        if jitter_min or jitter_max:
-                            j = self.rng.randint(jitter_min, jitter_max) * 60
-                        target_time += j
-                        if target_time <= self.state.sim_time:
-                            continue
-                        client.next_outbound_time = target_time
-                        break
+                # None — слотов больше нет: клиент уходит из календаря
+                client.next_outbound_time = weekly_next_time(
+                    self.state.sim_time, ob['days'], ob['time_minute_of_day'], self.rng,
+                    ob.get('jitter_min', 0), ob.get('jitter_max', 0),
+                )
             else:
                 client.next_outbound_time = self.state.sim_time + 3600
+            if client.next_outbound_time is not None:
+                cal.push(cal.outbound, client.next_outbound_time, client.id)
+
+    def _publish_trace_demand(self):
+        """Строки потока demand_trace с time ≤ sim_time → те же события, что и live."""
+        state, bus = self.state, self.event_bus
+        truck = None
+        for t, kind, client_id, sku_id, qty in self.demand.take_due(state.sim_time):
+            if kind == INBOUND and truck != (t, client_id):
+                # строки одной поставки (тот же клиент и момент) — одна фура
+                truck = (t, client_id)
+                state.dock_yard.arrive("DOCK_IN", state.sim_time, ref=client_id)
+            if kind == INITIAL:
+                bus.publish(
+                    source="client_gen",
+                    type_="InboundArrivalActual",
+                    payload={"client_id": client_id, "sku_id": sku_id, "delivered_qty": qty},
+                    sim_time=state.sim_time,
+                )
+            elif kind == INBOUND:
+                inbound_scheduler.receive_inbound_line(state, bus, client_id, sku_id, qty)
+            else:
+                bus.publish(
+                    source="client_gen",
+                    type_="OutboundRequest",
+                    payload={"client_id": client_id, "sku_id": sku_id, "qty": qty},
+                    sim_time=state.sim_time,
+                )
@@ -3,10 +3,17 @@ import random
 from pathlib import Path
 import yaml
 from .models import (
-    Zone, Worker, Dock, Client, SKU, InventoryRecord,
+    Zone, Worker, Client, SKU,
     LiveConfig, MetricsAccumulator, WorldState
 )
 from .data_loader import load_layout, load_skus, load_clients
+from .layout_graph import compile_layout
+from .inventory import InventoryMatrix
+from .line_store import LineStore
+from .docks import DockYard
+from .putaway import PutawayIndex
+from .kpi import KpiBuckets, DEFAULT_HORIZON_S
+from .quantiles import LeadTimeSketches, LeadTimeWindows
 
 
 # -------------------- служебка --------------------
@@ -51,54 +58,58 @@ def build_initial_state(layout_cfg: dict, sim_cfg: dict, seed: int = 42) -> Worl
         dispatcher_max_assign_per_step = sim_cfg.get("dispatcher", {}).get("max_assign_per_step", 10),
         wave_size                      = sim_cfg.get("waves", {}).get("size", 100),
         wave_build_timeout             = sim_cfg.get("waves", {}).get("build_timeout_seconds", 300),
-        look_ahead_lines_per_worker    = sim_cfg.get("dispatcher", {}).get("look_ahead_lines_per_worker", 1)
+        look_ahead_lines_per_worker    = sim_cfg.get("dispatcher", {}).get("look_ahead_lines_per_worker", 1),
+        dispatch_waves                 = sim_cfg.get("dispatcher", {}).get("dispatch_waves", 1),
+        dispatcher_backend             = sim_cfg.get("dispatcher", {}).get("backend", "greedy"),
+        dispatcher_time_budget_ms      = sim_cfg.get("dispatcher", {}).get("time_budget_ms", 20.0),
+        tour_max_lines                 = sim_cfg.get("dispatcher", {}).get("tour_max_lines", 4)
     )
 
-    metrics = MetricsAccumulator()
+    metrics_cfg = sim_cfg.get("metrics", {})
+    q_cfg = metrics_cfg.get("quantiles", {})
+    # горизонт окон KPI: бакеты, скетчи окон и отметки доков; None — вся история
+    horizon = metrics_cfg.get("window_horizon_seconds", DEFAULT_HORIZON_S)
+    metrics = MetricsAccumulator(
+        window=KpiBuckets(metrics_cfg.get("bucket_seconds", 1), horizon),
+        lead_sketches=LeadTimeSketches(q_cfg.get("relative_accuracy", 0.01),
+                                       q_cfg.get("max_bins", 2048)),
+        lead_windows=LeadTimeWindows(q_cfg.get("bucket_seconds", 300),
+                                     q_cfg.get("relative_accuracy", 0.01),
+                                     q_cfg.get("max_bins", 2048), horizon),
+    )
 
-    # ------- формируем стартовый инвентарь и заполняем зоны -------
-    inventory: dict[str, InventoryRecord] = {}
+    # ------- стартовый объём в ёмкости зон -------
     for sku in skus.values():
         if not sku.candidate_zones:
             sku.candidate_zones = [sku.zone_id]
-
-        inv = InventoryRecord(
-            sku_id   = sku.id,
-            zone_id  = sku.zone_id,
-            qty      = sku.initial_qty
-        )
-        inventory[f"{sku.id}_{sku.zone_id}"] = inv
-
-        # ⬇⬇ добавляем стартовый объём в ёмкость зоны
         if sku.zone_id in zones:
             zones[sku.zone_id].current_qty += sku.initial_qty
 
-    # ------- «карманы» клиентов -------
-    stock_map: dict[str, dict[str, int]] = {
-        cid: {sku_id: 0 for sku_id in skus.keys()} for cid in clients.keys()
-    }
+    # ------- «карманы» клиентов: client × sku × zone -------
+    inventory = InventoryMatrix(clients.keys(), skus.keys(), zones.keys())
 
-    docks = {
-        "D_IN":  Dock(id="D_IN",  kind="inbound"),
-        "D_OUT": Dock(id="D_OUT", kind="outbound")
-    }
+    # ------- ворота доков из зон dock_in / dock_out (capacity = число ворот) -------
+    dock_yard = DockYard(zones, sim_cfg.get("docks"), horizon)
 
     # ------- финальный объект состояния -------
     state = WorldState(
         pending_optimizations=[],
         flags={},
         sim_time=0,
-        docks=docks,
+        docks=dock_yard.docks,
         zones=zones,
         workers=workers,
         clients=clients,
-        order_lines={},
+        order_lines=LineStore(),
         waves={},
         skus=skus,
         inventory=inventory,
         live_config=live_config,
         metrics=metrics,
         rng_seed=seed,
-        stock=stock_map
+        layout_graph=compile_layout(zones),
+        dock_yard=dock_yard,
+        # кандидаты put‑away по SKU считаются один раз, дальше — инкрементально
+        putaway_index=PutawayIndex(zones, skus, sim_cfg.get("putaway", {}).get("strategy", "least_fill")),
     )
     return state
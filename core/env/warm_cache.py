@@ -0,0 +1,117 @@
+# core/env/warm_cache.py
+"""
+Кэш «прогретого» состояния склада.
+
+Каждый сценарий стартует с пустого склада: publish_initial_inbound
+срабатывает в t=0, запас набирается первый сим‑час. Здесь мы один раз
+прогоняем warm‑up и сохраняем чекпоинт движка (core.env.checkpoint).
+
+Ключ = sha256 от содержимого layout/skus/clients YAML (и трассы спроса
+при demand.source: trace), параметров
+симуляции (без секций, не влияющих на динамику), seed и длины
+прогрева. Поменялся любой входной файл — поменялся ключ, старая
+запись просто вытесняется LRU (по mtime, не больше ``max_entries``).
+"""
+from __future__ import annotations
+import copy, hashlib, json, os, pathlib
+
+from .state_builder import build_initial_state
+from .simulation_engine import SimulationEngine
+from .checkpoint import checkpoint_bytes, restore_bytes
+from .data_loader import load_clients
+from .demand_trace import ensure_trace, trace_digest
+
+CACHE_VERSION = 19
+
+# секции sim_params.yaml, которые не влияют на состояние после прогрева
+_IGNORED_SECTIONS = ("dump", "optimizer", "event_log", "event_history", "archive", "warmup")
+_IGNORED_TIME_KEYS = ("shift_seconds", "mode")
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_key(sim_cfg: dict, seed: int, warmup_s: int) -> str:
+    files_cfg = sim_cfg.get("files", {})
+    files = {
+        role: _file_digest(files_cfg.get(role, default))
+        for role, default in (("layout", "config/layout.yaml"),
+                              ("skus", "config/skus.yaml"),
+                              ("clients", "config/clients.yaml"))
+    }
+    dem_cfg = sim_cfg.get("demand", {})
+    if dem_cfg.get("source", "live") == "trace":
+        # содержимое трассы, а не путь: перегенерированный поток → новый ключ
+        path = ensure_trace(dem_cfg.get("trace_path", "traces/demand"),
+                            load_clients(files_cfg.get("clients", "config/clients.yaml")),
+                            sim_cfg["time"]["shift_seconds"], seed)
+        files["demand"] = trace_digest(path)
+    params = {k: v for k, v in sim_cfg.items() if k not in _IGNORED_SECTIONS and k != "files"}
+    params["time"] = {k: v for k, v in params.get("time", {}).items() if k not in _IGNORED_TIME_KEYS}
+    blob = json.dumps(
+        {"v": CACHE_VERSION, "files": files, "params": params, "seed": seed, "warmup_s": warmup_s},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+class WarmCache:
+    def __init__(self, cache_dir: str = ".cache/warmup", max_entries: int = 8):
+        self.dir = pathlib.Path(cache_dir)
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.dir / f"{key}.ckpt"
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        os.utime(path)                 # LRU: отмечаем использование
+        return path.read_bytes()
+
+    def put(self, key: str, blob: bytes) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._path(key).with_suffix(".tmp")
+        tmp.write_bytes(blob)
+        os.replace(tmp, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = sorted(self.dir.glob("*.ckpt"), key=lambda p: p.stat().st_mtime)
+        for p in entries[:max(0, len(entries) - self.max_entries)]:
+            p.unlink(missing_ok=True)
+
+    def clear(self):
+        for p in self.dir.glob("*.ckpt"):
+            p.unlink(missing_ok=True)
+
+
+def warm_start(sim_cfg: dict, seed: int, warmup_s: int,
+               cache: WarmCache | None = None) -> tuple[SimulationEngine, bool]:
+    """
+    Движок в момент t = warmup_s. Возвращает (engine, hit): из кэша
+    или после честного прогрева (результат кладём в кэш). time.shift_seconds
+    в ключ не входит — продлить смену на прогрев должен вызывающий (run_sim).
+    """
+    cache = cache or WarmCache()
+    key = cache_key(sim_cfg, seed, warmup_s)
+    blob = cache.get(key)
+    if blob is not None:
+        engine = restore_bytes(blob)
+        engine.rebind(sim_cfg)
+        return engine, True
+
+    # прогрев без журнала и архива — в выходные файлы он не попадает
+    warm_cfg = copy.deepcopy(sim_cfg)
+    warm_cfg.setdefault("event_log", {})["format"] = "none"
+    warm_cfg.setdefault("archive", {})["enabled"] = False
+    state = build_initial_state({}, warm_cfg, seed=seed)
+    engine = SimulationEngine(state, warm_cfg)
+    while state.sim_time < warmup_s:
+        engine.step(until=warmup_s)
+    cache.put(key, checkpoint_bytes(engine))
+    engine.rebind(sim_cfg)
+    return engine, False
@@ -1,31 +1,62 @@
 from __future__ import annotations
+from itertools import islice
+from typing import Iterator, Optional
+
 from .models import WorldState, Wave
+from .line_index import take_unwaved
+
+def building_wave(state: WorldState) -> Optional[Wave]:
+    wid = state.line_index.building_wave_id
+    return state.waves[wid] if wid is not None else None
 
 def ensure_building_wave(state: WorldState):
-    building = [w for w in state.waves.values() if w.status == "building"]
-    if building:
-        return building[0]
+    building = building_wave(state)
+    if building is not None:
+        return building
     wave_id = f"W{len(state.waves)+1}"
     wave = Wave(id=wave_id, created_time=state.sim_time, target_size=state.live_config.wave_size)
     state.waves[wave_id] = wave
+    state.line_index.building_wave_id = wave_id
     return wave
 
-def update_waves(state: WorldState, cfg: dict):
+def dispatch_waves(state: WorldState) -> Iterator[Wave]:
+    """Активные волны, из которых диспетчер берёт линии (старшие первыми)."""
+    limit = state.live_config.dispatch_waves
+    return (state.waves[wid] for wid in islice(state.line_index.active_waves, limit))
+
+def update_waves(state: WorldState, cfg: dict) -> list[Wave]:
+    """
+    Собираем/активируем волны; возвращаем волны, закрытые на этом тике.
+    Закрытие — по счётчикам (Wave.done_count, line_index.drained_waves),
+    без обхода линий активных волн.
+    """
+    idx = state.line_index
     wave = ensure_building_wave(state)
-    waiting_lines = [l for l in state.order_lines.values() if l.status == "waiting" and l.id not in wave.line_ids]
-    for line in waiting_lines:
-        if len(wave.line_ids) >= wave.target_size:
-            break
-        wave.line_ids.append(line.id)
+    # каждая ожидающая линия попадает ровно в одну волну (FIFO)
+    free_slots = wave.target_size - len(wave.line_ids)
+    if free_slots > 0:
+        taken = take_unwaved(state, wave.id, free_slots)
+        wave.line_ids.extend(taken)
+        wave.waiting.extend(taken)
 
     timeout = cfg["waves"].get("build_timeout_seconds", 300)
     if (len(wave.line_ids) >= wave.target_size) or (state.sim_time - wave.created_time >= timeout):
         wave.status = "active"
         if wave.activated_time is None:
             wave.activated_time = state.sim_time
+        idx.building_wave_id = None
+        idx.active_waves[wave.id] = None
+        if wave.done_count == len(wave.line_ids):       # пустая волна (таймаут)
+            idx.drained_waves[wave.id] = None
 
-    for w in state.waves.values():
-        if w.status == "active":
-            if all(state.order_lines[lid].status == "done" for lid in w.line_ids):
-                w.status = "complete"
-                w.complete_time = state.sim_time
+    completed: list[Wave] = []
+    if idx.drained_waves:
+        # в порядке активации, как прежний обход state.waves
+        for wid in [wid for wid in idx.active_waves if wid in idx.drained_waves]:
+            w = state.waves[wid]
+            w.status = "complete"
+            w.complete_time = state.sim_time
+            del idx.active_waves[wid]
+            completed.append(w)
+        idx.drained_waves.clear()
+    return completed
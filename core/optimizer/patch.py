@@ -0,0 +1,29 @@
+from .schema import ALLOWED_PATCH
+
+
+def apply_patch(cfg: dict, patch: dict) -> dict:
+    """
+    Apply only keys declared in core.optimizer.schema.ALLOWED_PATCH.
+    Supports вложенные пути через точку.
+    """
+    applied = {}
+    for path, val in (patch or {}).items():
+        if path not in ALLOWED_PATCH:
+            print(f"Skip unknown key: {path}")
+            continue
+        spec = ALLOWED_PATCH[path]
+        try:
+            v = spec["type"](val)
+        except Exception:
+            print(f"Type mismatch for {path}")
+            continue
+        # clamp
+        v = max(spec["min"], min(v, spec["max"]))
+        # пройти по словарю
+        target = cfg
+        parts = path.split(".")
+        for p in parts[:-1]:
+            target = target[p]
+        target[parts[-1]] = v
+        applied[path] = v
+    return applied
@@ -0,0 +1,203 @@
+"""
+Параллельный перебор параметров по пространству ALLOWED_PATCH.
+
+Запуск:
+    python -m core.optimizer.sweep --design lhs --points 32 \\
+        --keys workers.pickers,waves.size --workers 8
+
+Дизайны: grid (равномерные уровни), random, lhs (латинский гиперкуб).
+Точка применяется к конфигу той же apply_patch, что и в run_sim, и
+прогоняется в отдельном процессе. Каждые ``check_every`` сим‑секунд
+прогон публикует window_metrics в общий «фронт»; если точку явно
+доминирует другая (лучше на ``margin`` по всем OBJECTIVES в том же
+чекпоинте), прогон останавливается досрочно. Строки результатов
+дописываются в один CSV по мере готовности.
+"""
+from __future__ import annotations
+import argparse, copy, csv, datetime, itertools, multiprocessing, pathlib, random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from .schema import ALLOWED_PATCH
+from .patch import apply_patch
+from core.env.state_builder import load_yaml, build_initial_state
+from core.env.simulation_engine import SimulationEngine
+from core.env.metrics import window_metrics
+
+DEFAULT_KEYS = (
+    "workers.pickers",
+    "dispatcher.max_assign_per_step",
+    "waves.size",
+    "waves.build_timeout_seconds",
+)
+
+# KPI из window_metrics: +1 — больше лучше, -1 — меньше лучше
+OBJECTIVES = {"order_lines_done": 1, "avg_lead_time_min": -1}
+
+
+# ---------- дизайны ----------
+def _scale(key: str, u: float):
+    """u ∈ [0, 1] → значение в границах ALLOWED_PATCH[key] нужного типа."""
+    spec = ALLOWED_PATCH[key]
+    v = spec["min"] + u * (spec["max"] - spec["min"])
+    return int(round(v)) if spec["type"] is int else round(v, 4)
+
+
+def grid_design(keys: List[str], levels: int) -> List[Dict[str, Any]]:
+    axes = []
+    for key in keys:
+        us = [i / (levels - 1) for i in range(levels)] if levels > 1 else [0.5]
+        axes.append(sorted({_scale(key, u) for u in us}))
+    return [dict(zip(keys, combo)) for combo in itertools.product(*axes)]
+
+
+def random_design(keys: List[str], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    return [{k: _scale(k, rng.random()) for k in keys} for _ in range(n)]
+
+
+def lhs_design(keys: List[str], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Каждая ось делится на n страт, в каждой страте ровно одна точка."""
+    columns = {}
+    for key in keys:
+        strata = list(range(n))
+        rng.shuffle(strata)
+        columns[key] = [_scale(key, (s + rng.random()) / n) for s in strata]
+    return [{k: columns[k][i] for k in keys} for i in range(n)]
+
+
+def make_design(kind: str, keys: List[str], points: int, levels: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    if kind == "grid":
+        return grid_design(keys, levels)
+    if kind == "random":
+        return random_design(keys, points, rng)
+    if kind == "lhs":
+        return lhs_design(keys, points, rng)
+    raise ValueError(f"unknown design: {kind}")
+
+
+# ---------- ранняя остановка ----------
+def clearly_dominated(kpi: Dict[str, float], other: Dict[str, float], margin: float) -> bool:
+    """other лучше kpi хотя бы на ``margin`` (доля) по каждой цели."""
+    for name, sign in OBJECTIVES.items():
+        mine, theirs = kpi[name], other[name]
+        gap = abs(mine) * margin
+        if sign > 0 and not theirs > mine + gap:
+            return False
+        if sign < 0 and not theirs < mine - gap:
+            return False
+    return True
+
+
+# ---------- одна точка ----------
+def evaluate_point(sim_cfg: dict, point_id: int, patch: Dict[str, Any], seed: int,
+                   check_every: int, margin: float, frontier) -> Dict[str, Any]:
+    cfg = copy.deepcopy(sim_cfg)
+    applied = apply_patch(cfg, patch)
+    # перебор — бенчмарк: без журнала и архива
+    cfg.setdefault("event_log", {})["format"] = "none"
+    cfg.setdefault("archive", {})["enabled"] = False
+
+    state = build_initial_state({}, cfg, seed=seed)
+    shift_end = cfg["time"]["shift_seconds"]
+    status = "done"
+    with SimulationEngine(state, cfg) as engine:
+        checkpoint = min(check_every, shift_end) if check_every else shift_end
+        while state.sim_time < shift_end:
+            engine.step(until=checkpoint)
+            if state.sim_time < checkpoint or checkpoint >= shift_end:
+                continue
+            kpi = window_metrics(state, state.sim_time)
+            rivals = [k for t, k in list(frontier) if t == checkpoint]
+            frontier.append((checkpoint, kpi))
+            if any(clearly_dominated(kpi, r, margin) for r in rivals):
+                status = "pruned"
+                break
+            checkpoint = min(checkpoint + check_every, shift_end)
+
+    row: Dict[str, Any] = {"point": point_id, "status": status, "stopped_at": state.sim_time}
+    row.update({k: applied.get(k, v) for k, v in patch.items()})
+    row.update(window_metrics(state, state.sim_time))
+    return row
+
+
+# ---------- прогон дизайна ----------
+def run_sweep(sim_cfg: dict, design: List[Dict[str, Any]], out_csv: str, seed: int = 42,
+              workers: int | None = None, check_every: int = 0, margin: float = 0.1) -> List[Dict[str, Any]]:
+    keys = list(design[0]) if design else []
+    fields = ["point", "status", "stopped_at", *keys, *_kpi_fields()]
+    rows: List[Dict[str, Any]] = []
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fields)
+        w.writeheader()
+
+        def _emit(row):
+            rows.append(row)
+            w.writerow(row)
+            f.flush()
+
+        if workers == 1:
+            frontier: list = []
+            for i, patch in enumerate(design):
+                _emit(evaluate_point(sim_cfg, i, patch, seed, check_every, margin, frontier))
+            return rows
+
+        with multiprocessing.Manager() as mgr, ProcessPoolExecutor(max_workers=workers) as pool:
+            frontier = mgr.list()
+            futures = [
+                pool.submit(evaluate_point, sim_cfg, i, patch, seed, check_every, margin, frontier)
+                for i, patch in enumerate(design)
+            ]
+            for fut in as_completed(futures):
+                _emit(fut.result())
+    rows.sort(key=lambda r: r["point"])
+    return rows
+
+
+def _kpi_fields() -> List[str]:
+    return ["order_lines_done", "dock_util", "avg_lead_time_min", "worker_util"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--params", default="config/sim_params.yaml")
+    parser.add_argument("--shift-seconds", type=int, default=None)
+    parser.add_argument("--design", choices=["grid", "random", "lhs"], default="lhs")
+    parser.add_argument("--keys", default=",".join(DEFAULT_KEYS),
+                        help="ключи ALLOWED_PATCH через запятую")
+    parser.add_argument("--points", type=int, default=16, help="точек для random/lhs")
+    parser.add_argument("--levels", type=int, default=3, help="уровней на ось для grid")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--check-every", type=int, default=None,
+                        help="чекпоинт ранней остановки, сим‑сек (по умолчанию shift/4; 0 — выкл.)")
+    parser.add_argument("--margin", type=float, default=0.1)
+    parser.add_argument("--engine-mode", choices=["tick", "event"], default="event")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    keys = [k.strip() for k in args.keys.split(",") if k.strip()]
+    unknown = [k for k in keys if k not in ALLOWED_PATCH]
+    if unknown:
+        parser.error(f"keys not in ALLOWED_PATCH: {', '.join(unknown)}")
+
+    sim_cfg = load_yaml(args.params)
+    sim_cfg.setdefault("time", {})
+    if args.shift_seconds:
+        sim_cfg["time"]["shift_seconds"] = args.shift_seconds
+    sim_cfg["time"]["mode"] = args.engine_mode
+    shift_end = sim_cfg["time"]["shift_seconds"]
+    check_every = shift_end // 4 if args.check_every is None else args.check_every
+
+    design = make_design(args.design, keys, args.points, args.levels, args.seed)
+    out = pathlib.Path(args.out or f"results/optimizer/sweep_{datetime.date.today().isoformat()}.csv")
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    rows = run_sweep(sim_cfg, design, str(out), seed=args.seed, workers=args.workers,
+                     check_every=check_every, margin=args.margin)
+    pruned = sum(1 for r in rows if r["status"] == "pruned")
+    print(f"{len(rows)} points ({pruned} pruned early) → {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Общие фикстуры: конфиг из config/ с абсолютными путями, прогон движка."""
+from __future__ import annotations
+import pathlib
+
+import pytest
+
+from core.env.state_builder import load_yaml, build_initial_state
+from core.env.simulation_engine import SimulationEngine
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def make_cfg(**patch) -> dict:
+    """sim_params.yaml без журнала и архива; patch — {"section.key": value}."""
+    cfg = load_yaml(ROOT / "config" / "sim_params.yaml")
+    cfg["files"] = {k: str(ROOT / v) for k, v in cfg["files"].items()}
+    cfg["event_log"] = {"format": "none"}
+    cfg.setdefault("archive", {})["enabled"] = False
+    for key, value in patch.items():
+        section, name = key.split(".")
+        cfg.setdefault(section, {})[name] = value
+    return cfg
+
+
+def run_engine(cfg: dict, until: int, seed: int = 42, engine: SimulationEngine | None = None):
+    """Прогон до ``until``; в event‑режиме step сам прыгает между событиями."""
+    if engine is None:
+        engine = SimulationEngine(build_initial_state({}, cfg, seed=seed), cfg)
+    state = engine.state
+    while state.sim_time < until:
+        engine.step(until=until)
+    engine.sync_workers()
+    return engine
+
+
+def fingerprint(state) -> dict:
+    """Всё наблюдаемое состояние прогона для сравнения режимов."""
+    from core.env.metrics import rollup
+    return {
+        "snapshots": state.metrics.snapshots,
+        "rollup": rollup(state, state.sim_time),
+        "lines": sorted(
+            (l.id, l.status, l.done_time, l.assigned_worker_id, l.assign_time, l.zone_id)
+            for l in state.order_lines.values()
+        ),
+        "workers": [
+            (w.id, w.state, w.current_zone_id, w.phase, w.travel_remaining, w.pick_remaining)
+            for w in state.workers.values()
+        ],
+        "waves": [
+            (w.id, w.status, w.activated_time, w.complete_time, len(w.line_ids))
+            for w in state.waves.values()
+        ],
+        "zones": {z.id: z.current_qty for z in state.zones.values()},
+    }
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp(tmp_path, monkeypatch):
+    """Файлы прогона (metrics, архив, журналы) — во временный каталог."""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,54 @@
+import itertools
+import warnings
+
+import numpy as np
+import pytest
+
+from core.env.assignment import greedy_assignment, hungarian, solve_assignment
+
+
+def _brute(cost):
+    """Минимум по всем назначениям строк (n ≤ m) перебором."""
+    n, m = cost.shape
+    return min(sum(cost[i, j] for i, j in enumerate(p))
+               for p in itertools.permutations(range(m), n))
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (4, 6), (6, 4), (5, 5)])
+def test_matches_brute_force(shape):
+    rng = np.random.default_rng(7)
+    for _ in range(30):
+        cost = rng.integers(0, 50, size=shape).astype(float)
+        rows, cols, method = solve_assignment(cost)
+        assert method == "hungarian"
+        assert len(rows) == min(shape) and len(set(rows)) == len(rows) and len(set(cols)) == len(cols)
+        best = _brute(cost if shape[0] <= shape[1] else cost.T)
+        assert int(cost[rows, cols].sum()) == int(best)
+
+
+def test_forbidden_pairs_dropped():
+    inf = np.inf
+    cost = np.array([[inf, inf, inf],
+                     [1.0, inf, 5.0],
+                     [2.0, inf, inf]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        rows, cols, _ = solve_assignment(cost)
+    pairs = set(zip(rows, cols))
+    assert pairs == {(1, 2), (2, 0)}           # 2 допустимые пары лучше одной дешёвой
+    assert all(np.isfinite(cost[i, j]) for i, j in pairs)
+
+
+def test_all_forbidden_and_bad_values():
+    assert solve_assignment(np.full((2, 3), np.inf))[:2] == ([], [])
+    with pytest.raises(ValueError):
+        solve_assignment(np.array([[np.nan, 1.0]]))
+    with pytest.raises(ValueError):
+        hungarian(np.array([[np.inf, 1.0]]))
+
+
+def test_greedy_is_a_matching():
+    rng = np.random.default_rng(3)
+    cost = rng.random((5, 8))
+    col = greedy_assignment(cost)
+    assert len(set(col.tolist())) == 5
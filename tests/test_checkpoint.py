@@ -0,0 +1,95 @@
+import pytest
+
+from core.env.checkpoint import (
+    apply_live_patch, checkpoint_bytes, evaluate_forks, fork_engine, restore_bytes,
+    save_checkpoint, load_checkpoint,
+)
+from core.env.metrics import window_metrics
+
+from .conftest import make_cfg, run_engine, fingerprint
+
+
+def test_restore_continues_like_uninterrupted_run(tmp_path):
+    cfg = make_cfg()
+    straight = fingerprint(run_engine(cfg, 2400).state)
+
+    engine = run_engine(make_cfg(), 1200)
+    save_checkpoint(engine, str(tmp_path / "mid.ckpt"))
+    resumed = run_engine(cfg, 2400, engine=load_checkpoint(str(tmp_path / "mid.ckpt")))
+    assert fingerprint(resumed.state) == straight
+
+
+def test_fork_is_independent():
+    engine = run_engine(make_cfg(), 900)
+    before = fingerprint(engine.state)
+    clone = fork_engine(engine)
+    run_engine(clone.cfg, 1800, engine=clone)
+    assert fingerprint(engine.state) == before
+    assert clone.state.sim_time == 1800
+
+
+@pytest.mark.parametrize("progress", ["scalar", "vector", "heap"])
+def test_fork_and_blob_continue_like_unforked_run(progress):
+    cfg = make_cfg(**{"progress.engine": progress})
+    straight = fingerprint(run_engine(cfg, 1800).state)
+    engine = run_engine(cfg, 900)
+    for clone in (fork_engine(engine), restore_bytes(checkpoint_bytes(engine))):
+        assert fingerprint(run_engine(cfg, 1800, engine=clone).state) == straight
+    assert fingerprint(run_engine(cfg, 1800, engine=engine).state) == straight
+
+
+def _kpi(engine):
+    return window_metrics(engine.state, engine.state.sim_time)
+
+
+def test_evaluate_forks_matches_sequential_what_if():
+    cfg = make_cfg()
+    engine = run_engine(cfg, 900)
+    before = fingerprint(engine.state)
+    patches = [{}, {"workers.pickers": 2}, {"waves.size": 20}]
+    results = evaluate_forks(engine, patches, 1800, _kpi, workers=2)
+    assert fingerprint(engine.state) == before                  # родитель не тронут
+    assert results[0] == {"patch": {}, **_kpi(run_engine(cfg, 1800))}   # пустой патч = прогон без форка
+    for patch, got in zip(patches, results):
+        clone = fork_engine(engine)
+        applied = apply_live_patch(clone, patch)
+        assert got == {"patch": applied, **_kpi(run_engine(clone.cfg, 1800, engine=clone))}
+    assert results[1] != results[0]
+
+
+def test_restore_rejects_foreign_blob():
+    with pytest.raises(ValueError):
+        restore_bytes(b"not a checkpoint")
+    assert restore_bytes(checkpoint_bytes(run_engine(make_cfg(), 60))).state.sim_time == 60
+
+
+def test_shrinking_crew_retires_busy_pickers():
+    from core.env.checkpoint import apply_live_patch
+    from core.env.metrics import rollup
+
+    engine = run_engine(make_cfg(), 1200)
+    busy = [w for w in engine.state.workers.values() if w.state != "idle"]
+    assert busy                                   # патч приходится на занятую смену
+
+    same, smaller = fork_engine(engine), fork_engine(engine)
+    apply_live_patch(smaller, {"workers.pickers": 2})
+    run_engine(same.cfg, 2400, engine=same)
+    run_engine(smaller.cfg, 2400, engine=smaller)
+
+    on_shift = [w for w in smaller.state.workers.values() if w.state != "off"]
+    assert len(on_shift) == 2
+    assert not any(w.retiring for w in smaller.state.workers.values())
+    assert fingerprint(smaller.state)["lines"] != fingerprint(same.state)["lines"]
+    assert rollup(smaller.state, 1200) != rollup(same.state, 1200)
+
+
+def test_growing_crew_keeps_retiring_pickers_first():
+    from core.env.checkpoint import apply_live_patch
+
+    engine = run_engine(make_cfg(), 1200)
+    apply_live_patch(engine, {"workers.pickers": 2})
+    retiring = {w.id for w in engine.state.workers.values() if w.retiring}
+    apply_live_patch(engine, {"workers.pickers": 5})
+    assert not any(w.retiring for w in engine.state.workers.values())
+    assert len(engine.state.workers) == 5             # никого не наняли сверх старых
+    assert all(engine.state.workers[wid].state != "off" for wid in retiring)
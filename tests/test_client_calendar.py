@@ -0,0 +1,42 @@
+import random
+
+from core.env.client_calendar import ensure_calendar, weekly_next_time, DAY_SEC
+from core.env.simulation_engine import SimulationEngine
+from core.env.state_builder import build_initial_state
+
+from .conftest import make_cfg
+
+
+def test_weekly_next_time_finds_next_working_day():
+    rng = random.Random(0)
+    # понедельник 0‑го дня: ближайшая среда (dow 2) в 10:00
+    assert weekly_next_time(0, [2], 600, rng) == 2 * DAY_SEC + 600 * 60
+    # слот сегодня уже прошёл — следующая неделя
+    assert weekly_next_time(2 * DAY_SEC + 601 * 60, [2], 600, rng) == 9 * DAY_SEC + 600 * 60
+    assert weekly_next_time(0, [], 600, rng) is None
+
+
+def test_client_without_slots_leaves_calendar():
+    cfg = make_cfg(**{"time.mode": "event"})
+    state = build_initial_state({}, cfg, seed=3)
+    client = next(iter(state.clients.values()))
+    client.outbound_cfg = {"pattern": "weekly", "days": [], "time_minute_of_day": 0, "lines_mean": 2}
+    client.inbound_cfg = {"pattern": "weekly", "days": [], "time_minute_of_day": 0}
+    engine = SimulationEngine(state, cfg)
+
+    published = []
+    publish = engine.event_bus.publish
+
+    def spy(source, type_, payload, sim_time):
+        if payload.get("client_id") == client.id and source != "system":
+            published.append((str(type_), sim_time))
+        return publish(source, type_, payload, sim_time)
+
+    engine.event_bus.publish = spy
+    while state.sim_time < 1800:
+        engine.step(until=1800)
+
+    assert client.next_outbound_time is None and client.next_inbound_time is None
+    cal = ensure_calendar(state)
+    assert client.id not in {cid for *_, cid in cal.outbound + cal.inbound}
+    assert {t for _, t in published} == {0}          # только первый слот (и стартовая поставка)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from core.env.data_loader import load_clients, load_skus
+from core.env.demand_trace import ensure_trace, load_trace, open_trace
+
+from .conftest import ROOT
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_clients(str(ROOT / "config" / "clients.yaml")), load_skus(str(ROOT / "config" / "skus.yaml"))
+
+
+def test_generated_trace_is_sorted_and_reused(tmp_path, catalog):
+    clients, skus = catalog
+    root = ensure_trace(tmp_path / "tr", clients, 3600, seed=7)
+    trace = load_trace(root)
+    assert len(trace) > 0
+    assert np.all(np.diff(trace.time) >= 0)
+    assert trace.meta["shift_seconds"] == 3600
+    # та же смена или короче — трасса переиспользуется
+    cursor = open_trace(root, clients, skus, 1800, 7)
+    due = list(cursor.take_due(1800))
+    assert due and all(row[0] <= 1800 for row in due)
+    assert cursor.next_time() > 1800
+
+
+def test_short_trace_or_other_seed_is_rejected(tmp_path, catalog):
+    clients, skus = catalog
+    root = ensure_trace(tmp_path / "tr", clients, 1800, seed=7)
+    with pytest.raises(ValueError, match="shift_seconds"):
+        open_trace(root, clients, skus, 7200, 7)
+    with pytest.raises(ValueError, match="seed"):
+        open_trace(root, clients, skus, 1800, 8)
+
+
+def test_unknown_skus_are_rejected(tmp_path, catalog):
+    clients, skus = catalog
+    root = ensure_trace(tmp_path / "tr", clients, 1800, seed=7)
+    used = set(load_trace(root).skus)
+    partial = {k: v for k, v in skus.items() if k not in used or k != min(used)}
+    with pytest.raises(ValueError, match="unknown skus"):
+        open_trace(root, clients, partial, 1800, 7)
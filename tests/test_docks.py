@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from core.env.docks import DockYard
+from core.env.models import Zone
+
+
+def _yard(retention_s=None):
+    zones = {"DOCK_IN": Zone("DOCK_IN", "dock_in", 2), "DOCK_OUT": Zone("DOCK_OUT", "dock_out", 1)}
+    return DockYard(zones, {"inbound_service_seconds": 70, "outbound_service_seconds": 45}, retention_s)
+
+
+def _drive(yard, until, seed=3):
+    """Случайные фуры; busy[t] — занятые ворота на секунде [t, t+1)."""
+    rng = random.Random(seed)
+    busy = []
+    for t in range(until):
+        yard.process(t)
+        if rng.random() < 0.03:
+            yard.arrive(rng.choice(["DOCK_IN", "DOCK_OUT"]), t)
+        busy.append(yard.busy_count)
+    return busy
+
+
+@pytest.mark.parametrize("start,end", [(0, 5000), (1234, 4321), (3000, 3001), (4000, 5000)])
+def test_utilization_matches_brute_force(start, end):
+    yard = _yard()
+    busy = _drive(yard, 5000)
+    yard.process(5000)
+    expected = sum(busy[start:end]) / (3 * (end - start))
+    assert yard.utilization(start, end) == pytest.approx(expected)
+
+
+def test_marks_trimmed_to_retention():
+    yard = _yard(retention_s=600)
+    busy = _drive(yard, 50000)
+    yard.process(50000)
+    assert len(yard.marks) < 2000
+    assert yard.marks[0][0] <= 50000 - 600
+    start = 50000 - 500
+    assert yard.utilization(start, 50000) == pytest.approx(sum(busy[start:]) / (3 * 500))
+
+
+def test_window_deeper_than_retention_averages_over_kept_marks():
+    yard = _yard(retention_s=600)
+    busy = _drive(yard, 50000)
+    yard.process(50000)
+    oldest = yard.marks[0][0]
+    assert oldest > 1000
+    expected = sum(busy[oldest:]) / (3 * (50000 - oldest))
+    assert yard.utilization(1000, 50000) == pytest.approx(expected)
+    assert yard.utilization(0, 50000) == pytest.approx(sum(busy) / (3 * 50000))
+
+
+def test_default_service_times_match_config():
+    from core.env.docks import DEFAULT_SERVICE_S
+    from tests.conftest import make_cfg
+    docks = make_cfg()["docks"]
+    assert DEFAULT_SERVICE_S == {kind: docks[f"{kind}_service_seconds"] for kind in DEFAULT_SERVICE_S}
+    assert DockYard({}).service_s == DEFAULT_SERVICE_S
@@ -0,0 +1,42 @@
+"""tick и event дают один и тот же прогон при любом движке прогресса; vector — тот же, что scalar."""
+import pytest
+
+from .conftest import make_cfg, run_engine, fingerprint
+
+SHIFT = 1800
+
+
+@pytest.mark.parametrize("progress", ["heap", "scalar", "vector"])
+def test_tick_and_event_modes_match(progress):
+    runs = {}
+    for mode in ("tick", "event"):
+        cfg = make_cfg(**{"time.mode": mode, "progress.engine": progress})
+        runs[mode] = fingerprint(run_engine(cfg, SHIFT).state)
+    for key in runs["tick"]:
+        assert runs["tick"][key] == runs["event"][key], key
+
+
+def test_event_mode_skips_idle_ticks():
+    tick = make_cfg(**{"time.mode": "tick"})
+    event = make_cfg(**{"time.mode": "event"})
+    steps = {}
+    for name, cfg in (("tick", tick), ("event", event)):
+        from core.env.state_builder import build_initial_state
+        from core.env.simulation_engine import SimulationEngine
+        eng = SimulationEngine(build_initial_state({}, cfg, seed=42), cfg)
+        n = 0
+        while eng.state.sim_time < SHIFT:
+            eng.step(until=SHIFT)
+            n += 1
+        steps[name] = n
+    assert steps["event"] < steps["tick"]
+
+
+@pytest.mark.parametrize("pickers", [5, 40])
+def test_vector_progress_matches_scalar(pickers):
+    runs = {}
+    for progress in ("scalar", "vector"):
+        cfg = make_cfg(**{"progress.engine": progress, "workers.pickers": pickers})
+        runs[progress] = fingerprint(run_engine(cfg, SHIFT).state)
+    for key in runs["scalar"]:
+        assert runs["scalar"][key] == runs["vector"][key], key
@@ -0,0 +1,96 @@
+import pytest
+
+from core.env.event_bus import EventBus
+from core.env.events import EventType
+from core.env.state_builder import build_initial_state
+
+from .conftest import make_cfg
+
+
+def _state():
+    state = build_initial_state({}, make_cfg(), seed=1)
+    client = next(iter(state.clients))
+    sku = next(iter(state.skus))
+    return state, client, sku
+
+
+def test_apply_follows_publish_order_across_types():
+    state, client, sku = _state()
+    stock = state.inventory.available(client, sku)
+    bus = EventBus(log_cfg={"format": "none"})
+    out = {"client_id": client, "sku_id": sku, "qty": stock + 5}
+    bus.publish("client", EventType.OUTBOUND_REQUEST, out, 0)
+    bus.publish("client", EventType.INBOUND_ARRIVAL_ACTUAL,
+                {"client_id": client, "sku_id": sku, "delivered_qty": 10}, 0)
+    bus.publish("client", EventType.OUTBOUND_REQUEST, {**out, "qty": 5}, 0)
+    bus.validate_cycle(state)
+    bus.apply_cycle(state)
+
+    effects = [ae.effects for ae in bus.applied]
+    assert [ae.type for ae in bus.applied] == ["OutboundRequest", "InboundArrivalActual", "OutboundRequest"]
+    # первый запрос — до поставки: отдали весь старый остаток, 5 шт. — отказ
+    assert {"rejected_qty": 5} in effects[0]
+    # второй — после поставки: обслужен полностью
+    assert not any("rejected_qty" in e for e in effects[2])
+    assert state.inventory.available(client, sku) == 5
+    assert state.metrics.rejected_count == 1
+
+
+def test_validation_rejects_are_counted():
+    state, client, sku = _state()
+    bus = EventBus(log_cfg={"format": "none"})
+    bus.publish("client", EventType.OUTBOUND_REQUEST, {"client_id": client, "sku_id": sku, "qty": 0}, 0)
+    bus.validate_cycle(state)
+    assert not bus.to_apply
+    assert state.metrics.rejected_count == 1
+
+
+def _patch(state, key, value):
+    bus = EventBus(log_cfg={"format": "none"})
+    bus.publish("agent", EventType.CONFIG_PATCH, {"key": key, "value": value}, 0)
+    bus.validate_cycle(state)
+    bus.apply_cycle(state)
+    return len(bus.applied) == 1
+
+
+def test_config_patch_coerces_by_field_type():
+    state, _, _ = _state()
+    lc = state.live_config
+    assert _patch(state, "dispatcher_backend", "optimal") and lc.dispatcher_backend == "optimal"
+    assert _patch(state, "dispatcher_time_budget_ms", 2.5) and lc.dispatcher_time_budget_ms == 2.5
+    assert _patch(state, "dispatch_waves", None) and lc.dispatch_waves is None
+    assert _patch(state, "dispatch_waves", "3") and lc.dispatch_waves == 3
+    assert _patch(state, "wave_size", 40.0) and lc.wave_size == 40
+
+
+def test_config_patch_rejects_bad_values():
+    state, _, _ = _state()
+    lc = state.live_config
+    before = (lc.dispatcher_backend, lc.wave_size, lc.look_ahead_lines_per_worker)
+    assert not _patch(state, "dispatcher_backend", "fastest")
+    assert not _patch(state, "wave_size", 2.5)                # не обрезаем молча
+    assert not _patch(state, "wave_size", None)
+    assert not _patch(state, "look_ahead_lines_per_worker", True)
+    assert not _patch(state, "no_such_key", 1)
+    assert (lc.dispatcher_backend, lc.wave_size, lc.look_ahead_lines_per_worker) == before
+    assert state.metrics.rejected_count == 5
+
+
+@pytest.mark.parametrize("history", [{"max_events": 50}, {"max_age_s": 30}, {"max_events": 10, "max_age_s": 30}])
+def test_history_is_bounded_but_counted_in_full(history):
+    state, client, sku = _state()
+    bus = EventBus(log_cfg={"format": "none"}, history_cfg=history)
+    for t in range(500):
+        state.sim_time = t
+        bus.publish("client", EventType.INBOUND_ARRIVAL_ACTUAL,
+                    {"client_id": client, "sku_id": sku, "delivered_qty": 1}, t)
+        bus.publish("client", EventType.OUTBOUND_REQUEST, {"client_id": client, "sku_id": sku, "qty": 0}, t)
+        bus.validate_cycle(state)
+        bus.apply_cycle(state)
+        for hist in (bus.validated, bus.applied):
+            assert len(hist) <= history.get("max_events", 1000)
+            assert all(ev.time >= t - history.get("max_age_s", t) for ev in hist)
+    assert bus.validated[-1].time == bus.applied[-1].time == 499
+    stats = bus.history_stats()
+    assert sum(stats["validated"].values()) == 1000
+    assert stats["applied"] == {"InboundArrivalActual": 500}
@@ -0,0 +1,62 @@
+import csv
+
+import pytest
+
+from core.env.event_log import LOG_HEADER, _BufferedEventLog, make_event_log, read_binary_log
+
+ROWS = [
+    ("proposed", 10, "E1", "OutboundRequest", "client", "", "", "qty=3"),
+    ("validated", 10, "E1", "OutboundRequest", "client", "ok", "", "qty=3"),
+    ("validated", 11, "E2", "OutboundRequest", "client", "reject", "qty<=0", "qty=0"),
+]
+
+
+def _write(fmt, path, **cfg):
+    log = make_event_log({"format": fmt, "path": str(path), "buffer_rows": 2, **cfg})
+    with log:
+        for row in ROWS:
+            log.write(*row[:7], {"qty": row[7].split("=")[1]})
+    return path
+
+
+def test_csv_log(tmp_path):
+    path = _write("csv", tmp_path / "ev.csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == LOG_HEADER
+    assert [r[:7] for r in rows[1:]] == [[str(x) for x in r[:7]] for r in ROWS]
+
+
+def test_binary_log_roundtrip(tmp_path):
+    path = _write("bin", tmp_path / "ev.bin")
+    got = list(read_binary_log(str(path)))
+    assert [tuple(r[k] for k in LOG_HEADER) for r in got] == ROWS
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        make_event_log({"format": "xml"})
+
+
+def test_binary_log_many_distinct_strings(tmp_path):
+    # больше 65 536 разных строк (причины отказа) — id не влезали в uint16
+    path = tmp_path / "ev.bin"
+    n = 70000
+    with make_event_log({"format": "bin", "path": str(path), "buffer_rows": 10000}) as log:
+        for i in range(n):
+            log.write("validated", i, f"E{i}", "OutboundRequest", "client", "reject", f"r{i}", {})
+    got = list(read_binary_log(str(path)))
+    assert len(got) == n
+    assert got[-1]["reason"] == f"r{n - 1}"
+
+
+def test_buffered_log_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        _BufferedEventLog(str(tmp_path / "ev.log"))
+
+
+def test_binary_log_refuses_old_format(tmp_path):
+    path = tmp_path / "ev.bin"
+    path.write_bytes(b"SWEVT1\n")
+    with pytest.raises(ValueError):
+        make_event_log({"format": "bin", "path": str(path)})
@@ -0,0 +1,28 @@
+import pytest
+
+from core.env.frame_exporter import snapshot
+from .conftest import make_cfg, run_engine
+
+
+@pytest.mark.parametrize("progress", ["heap", "scalar", "vector"])
+def test_worker_progress_in_every_engine(progress):
+    cfg = make_cfg(**{"progress.engine": progress})
+    engine = run_engine(cfg, 300)
+    busy, partial = 0, 0
+    for t in range(310, 1200, 10):
+        run_engine(cfg, t, engine=engine)          # run_engine синхронизирует остатки
+        for w in snapshot(engine.state)["workers"]:
+            assert ("progress" in w) == (engine.state.workers[w["id"]].assigned_line_id is not None)
+            if "progress" in w:
+                busy += 1
+                assert 0.0 <= w["progress"] <= 1.0
+                partial += 0.0 < w["progress"] < 1.0
+    assert busy and partial
+
+
+def test_scalar_and_vector_frames_match():
+    frames = {}
+    for progress in ("scalar", "vector"):
+        engine = run_engine(make_cfg(**{"progress.engine": progress}), 900)
+        frames[progress] = snapshot(engine.state)["workers"]
+    assert frames["scalar"] == frames["vector"]
@@ -0,0 +1,92 @@
+import numpy as np
+
+from core.env.inventory import InventoryMatrix
+
+from .conftest import make_cfg, run_engine
+
+
+def _inv():
+    inv = InventoryMatrix(["C1", "C2"], ["S1", "S2", "S3"], ["Z1", "Z2", "Z3"])
+    inv.release_batch(
+        [inv.client(c) for c in ("C1", "C1", "C1", "C2")],
+        [inv.sku(s) for s in ("S1", "S1", "S2", "S1")],
+        [inv.zone(z) for z in ("Z1", "Z3", "Z2", "Z2")],
+        [5, 7, 4, 9],
+    )
+    return inv
+
+
+def test_release_batch_running_totals():
+    inv = InventoryMatrix(["C1"], ["S1"], ["Z1", "Z2"])
+    after = inv.release_batch([0, 0, 0], [0, 0, 0], [0, 1, 0], [3, 4, 5])
+    assert after.tolist() == [3, 7, 12]
+    assert inv.available("C1", "S1") == 12
+    assert inv.by_zone() == {"Z1": 8, "Z2": 4}
+
+
+def _reference_reserve(inv, clients, skus, qtys):
+    """Построчно на чистом Python: остаток пары, зоны — по порядку индексов."""
+    stock = {(c, s): inv.qty[inv.client(c), inv.sku(s)].tolist()
+             for c in inv.client_index for s in inv.sku_index}
+    served = []
+    for c, s, q in zip(clients, skus, qtys):
+        zones = stock[c, s]
+        take = min(q, sum(zones))
+        served.append(take)
+        for z in range(len(zones)):
+            d = min(take, zones[z])
+            zones[z] -= d
+            take -= d
+    return served, stock
+
+
+def test_reserve_batch_matches_reference():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        inv = _inv()
+        n = int(rng.integers(1, 12))
+        clients = rng.choice(["C1", "C2"], n).tolist()
+        skus = rng.choice(["S1", "S2", "S3"], n).tolist()
+        qtys = rng.integers(1, 8, n).tolist()
+        expected, stock = _reference_reserve(inv, clients, skus, qtys)
+        served = inv.reserve_batch([inv.client(c) for c in clients], [inv.sku(s) for s in skus], qtys)
+        assert served.tolist() == expected
+        for (c, s), zones in stock.items():
+            assert inv.qty[inv.client(c), inv.sku(s)].tolist() == zones
+            assert inv.available(c, s) == sum(zones)
+
+
+def test_reserve_drains_zones_in_index_order():
+    inv = _inv()
+    assert inv.reserve("C1", "S1", 6) == 6          # 5 из Z1 + 1 из Z3
+    assert inv.client_stock("C1")["S1"] == 6
+    c, s = inv.client("C1"), inv.sku("S1")
+    assert inv.qty[c, s].tolist() == [0, 0, 6]
+    assert inv.reserve("C1", "S1", 100) == 6        # больше остатка не отдаём
+    assert inv.available("C1", "S1") == 0
+
+
+def test_unknown_ids_grow_matrix():
+    inv = _inv()
+    assert inv.available("C9", "S1") == 0
+    inv.release("C9", "S9", "Z9", 2)
+    assert inv.available("C9", "S9") == 2
+    assert inv.total() == 25 + 2
+
+
+def test_matrix_stays_consistent_through_a_run():
+    cfg = make_cfg()
+    engine = run_engine(cfg, 60)
+    inv = engine.state.inventory
+    seen = {inv.total()}
+    for t in range(300, 1801, 300):
+        run_engine(cfg, t, engine=engine)
+        inv = engine.state.inventory
+        assert (inv.qty >= 0).all()
+        assert (inv.totals == inv.qty.sum(axis=2)).all()          # totals ведутся инкрементально
+        total = inv.total()
+        assert sum(inv.by_client().values()) == sum(inv.by_sku().values()) == sum(inv.by_zone().values()) == total
+        for cid in inv.client_ids:
+            assert inv.client_stock(cid) == {s: inv.available(cid, s) for s in inv.sku_ids}
+        seen.add(total)
+    assert len(seen) > 1                                           # события реально двигали запас
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from core.env.kpi import KpiBuckets
+from core.env.metrics import rollup, window_metrics
+
+from .conftest import make_cfg, run_engine
+
+
+def _brute(events, start, inclusive):
+    return tuple(
+        sum(d[i] for t, d in events if (t >= start if inclusive else t > start))
+        for i in range(5)
+    )
+
+
+@pytest.mark.parametrize("bucket_s", [1, 7, 60])
+@pytest.mark.parametrize("horizon_s", [None, 5000])
+def test_windows_match_brute_force(bucket_s, horizon_s):
+    rng = random.Random(bucket_s)
+    kb, events, t = KpiBuckets(bucket_s, horizon_s), [], 0
+    for _ in range(3000):
+        t += rng.choice([0, 0, 1, 3, 20, 60])
+        at = max(0, t - rng.randint(0, 300)) if rng.random() < 0.05 else t   # опоздавшие
+        delta = (1, rng.randint(1, 900), rng.randint(0, 1), 0, 0)
+        kb.add(at, delta)
+        events.append((at, delta))
+        if rng.random() < 0.05:
+            # в пределах горизонта (или от t = 0 — по итогам)
+            lo = 0 if horizon_s is None else max(0, t - horizon_s + 2 * bucket_s)
+            start = 0 if rng.random() < 0.2 else rng.randint(lo, t)
+            start -= start % bucket_s                  # граница, кратная бакету — точно
+            if 0 < start < lo:
+                start += bucket_s
+            for inclusive in (True, False):
+                assert kb.since(start, inclusive) == _brute(events, start, inclusive)
+
+
+def test_unaligned_start_rounds_down_to_bucket():
+    kb = KpiBuckets(60)
+    for t in (10, 50, 70):
+        kb.add(t, (1, 0, 0, 0, 0))
+    assert kb.since(55)[0] == 3          # окно с начала бакета (0, 60]
+    assert kb.since(60, inclusive=False)[0] == 1
+
+
+def test_ring_is_bounded_and_whole_run_stays_exact():
+    kb = KpiBuckets(1, horizon_s=100)
+    for t in range(0, 100000, 3):
+        kb.add(t, (1, t, 0, 0, 0))
+    assert len(kb.sums) == 101 and len(kb) <= 101
+    ts = range(0, 100000, 3)
+    assert kb.since(99950) == (sum(1 for t in ts if t >= 99950), sum(t for t in ts if t >= 99950), 0, 0, 0)
+    # от начала прогона — по итогам, t = 0 учитывается только «не раньше»
+    assert kb.since(0)[0] == len(ts)
+    assert kb.since(0, inclusive=False)[0] == len(ts) - 1
+    # глубже горизонта — обрезано по горизонту
+    assert kb.since(50000)[0] == kb.since(99999 - 100)[0]
+
+
+def test_late_events_inside_and_beyond_horizon():
+    kb = KpiBuckets(1, horizon_s=50)
+    kb.add(1000, (1, 0, 0, 0, 0))
+    kb.add(990, (1, 0, 0, 0, 0))         # в горизонте — в свой бакет
+    kb.add(10, (1, 0, 0, 0, 0))          # старше — только в итогах
+    assert kb.since(990)[0] == 2
+    assert kb.since(991)[0] == 1
+    assert kb.since(0)[0] == 3
+
+
+def test_unbounded_history_grows_on_demand():
+    kb = KpiBuckets(1, horizon_s=None)
+    for t in range(5000, 10000, 7):
+        kb.add(t, (1, 0, 0, 0, 0))
+    kb.add(1, (1, 0, 0, 0, 0))           # опоздавшее далеко в прошлое
+    assert kb.since(1)[0] == len(range(5000, 10000, 7)) + 1
+    assert kb.since(2)[0] == len(range(5000, 10000, 7))
+
+
+@pytest.mark.parametrize("window_s", [60, 600, 1200, 2400])
+def test_engine_windows_match_line_scan(window_s):
+    state = run_engine(make_cfg(**{"metrics.window_horizon_seconds": 1200}), 2400).state
+    start = state.sim_time - window_s
+    done = [l for l in state.order_lines.values() if l.status == "done"]
+
+    excl = [l.done_time - l.created_time for l in done if l.done_time > start]
+    wm = window_metrics(state, window_s)
+    assert wm["order_lines_done"] == len(excl)
+    assert wm["avg_lead_time_min"] == round(sum(excl) / len(excl) / 60, 1)
+
+    incl = [l for l in done if l.done_time >= start]
+    roll = rollup(state, window_s)
+    assert roll["mean_cycle_s"] == round(sum(l.done_time - l.created_time for l in incl) / len(incl), 2)
+    assert roll["otif"] == round(sum(l.done_time <= l.deadline_time for l in incl) / len(incl), 3)
+    # квантили окна — по бакетам скетчей: начало окна округляется вниз до бакета
+    b = state.metrics.lead_windows.bucket_s
+    assert roll["lead_time"]["all"]["n"] == sum(l.done_time >= start // b * b for l in done)
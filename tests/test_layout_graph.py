@@ -0,0 +1,43 @@
+from core.env.layout_graph import UNREACHABLE, compile_layout
+from core.env.models import Zone
+
+
+def _zones():
+    # A —— стена стеллажа S (x=2, y=0..2) —— B: путь обходит стеллаж по рамке
+    return {
+        "A": Zone("A", "buffer", 1, x=0, y=0),
+        "S": Zone("S", "storage", 1, x=2, y=0, w=1, h=3),
+        "B": Zone("B", "buffer", 1, x=4, y=0),
+        "C": Zone("C", "buffer", 1, x=0, y=1),
+    }
+
+
+def test_detour_around_storage():
+    g = compile_layout(_zones())
+    assert g.cells("A", "A") == 0
+    assert g.cells("A", "C") == 1
+    assert g.cells("A", "S") == 2                # в сам стеллаж войти можно
+    # через S нельзя: вверх на рамку (y=−1), вправо на 4, вниз
+    assert g.cells("A", "B") == 1 + 4 + 1
+    assert g.cells("B", "A") == g.cells("A", "B")
+
+
+def test_rows_are_lazy():
+    g = compile_layout(_zones())
+    assert not g.rows
+    g.cells("A", "B")
+    assert list(g.rows) == [g.index["A"]]
+    g.cells("A", "C")
+    assert len(g.rows) == 1
+
+
+def test_enclosed_zone_unreachable():
+    zones = {
+        "IN": Zone("IN", "buffer", 1, x=1, y=1),
+        "OUT": Zone("OUT", "buffer", 1, x=5, y=5),
+    }
+    for i, (x, y) in enumerate([(0, 0), (1, 0), (2, 0), (0, 1), (2, 1), (0, 2), (1, 2), (2, 2)]):
+        zones[f"S{i}"] = Zone(f"S{i}", "storage", 1, x=x, y=y)
+    g = compile_layout(zones)
+    assert g.cells("IN", "OUT") == UNREACHABLE
+    assert g.cells("OUT", "IN") == UNREACHABLE
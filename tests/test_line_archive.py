@@ -0,0 +1,62 @@
+import sqlite3
+
+import yaml
+
+from core.env.line_archive import lead_times, load_lines
+from tests.conftest import ROOT, fingerprint, make_cfg, run_engine
+
+HOUR = 3600
+
+
+def _balanced_cfg(tmp_path, archive: bool) -> dict:
+    """Сбалансированный поток (приход ≈ пропускной способности) на несколько смен."""
+    clients = yaml.safe_load((ROOT / "config" / "clients.yaml").read_text(encoding="utf-8"))
+    for c in clients["clients"]:
+        c["inbound"].update(base_interval_min=10, batch_mean_lines=10)
+        c["outbound"]["lines_mean"] = 3
+    path = tmp_path / "clients.yaml"
+    path.write_text(yaml.safe_dump(clients, allow_unicode=True), encoding="utf-8")
+    cfg = make_cfg(**{"time.mode": "event", "metrics.window_horizon_seconds": HOUR})
+    cfg["files"]["clients"] = str(path)
+    cfg["archive"].update(enabled=archive, path=str(tmp_path / "lines.sqlite"))
+    return cfg
+
+
+def test_memory_stays_flat_over_many_shifts(tmp_path):
+    cfg = _balanced_cfg(tmp_path, archive=True)
+    engine = run_engine(cfg, HOUR)
+    state = engine.state
+    ring = len(state.metrics.window)
+    live, marks, sketches = [], [], []
+    for h in range(2, 13):
+        run_engine(cfg, h * HOUR, engine=engine)
+        live.append(len(state.order_lines))
+        marks.append(len(state.dock_yard.marks))
+        sketches.append(len(state.metrics.lead_windows.keys))
+        assert len(state.metrics.window) == ring
+    engine.close()
+
+    assert max(live) < 100                       # в памяти только незавершённые линии
+    assert max(marks) < 200
+    assert max(sketches) <= HOUR // state.metrics.lead_windows.bucket_s + 1
+    assert engine.archive.archived > 1000        # завершённые ушли в SQLite
+    n = sqlite3.connect(cfg["archive"]["path"]).execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+    assert n == engine.archive.archived
+
+
+def test_archive_keeps_kpis_and_lines(tmp_path):
+    on_cfg = _balanced_cfg(tmp_path, archive=True)
+    on = run_engine(on_cfg, 2 * HOUR)
+    on.close()
+    off = run_engine(_balanced_cfg(tmp_path, archive=False), 2 * HOUR)
+
+    a, b = fingerprint(on.state), fingerprint(off.state)
+    assert a["snapshots"] == b["snapshots"] and a["rollup"] == b["rollup"]
+
+    path = on_cfg["archive"]["path"]
+    done_off = {l.id for l in off.state.order_lines.values() if l.status == "done"}
+    archived = {r["id"] for r in load_lines(path)}
+    live_done = {l.id for l in on.state.order_lines.values() if l.status == "done"}
+    assert archived | live_done == done_off
+    assert len(lead_times(path)) == len(archived)
+    assert all(x >= 0 for x in lead_times(path))
@@ -0,0 +1,43 @@
+"""Индексы state.line_index совпадают с полным обходом order_lines."""
+import pytest
+
+from core.env.line_index import count_with_status, lines_with_status
+from .conftest import make_cfg, run_engine
+
+
+def _check(state):
+    idx = state.line_index
+    brute = {}
+    for line in state.order_lines.values():             # dict — в порядке поступления
+        brute.setdefault(line.status, []).append(line.id)
+    for status in ("waiting", "assigned", "done"):
+        ids = brute.get(status, [])
+        assert sorted(idx.by_status.get(status, ())) == sorted(ids), status
+        assert count_with_status(state, status) == len(ids)
+        assert {l.id for l in lines_with_status(state, status)} == set(ids)
+    # waiting и unwaved — FIFO по поступлению, остальные — в порядке переходов
+    assert list(idx.by_status.get("waiting", ())) == brute.get("waiting", [])
+    unwaved = [lid for lid in brute.get("waiting", []) if lid not in idx.line_wave]
+    assert list(idx.unwaved) == unwaved
+    assert set(idx.line_wave) <= set(state.order_lines)
+
+
+@pytest.mark.parametrize("progress", ["scalar", "heap"])
+def test_status_indexes_match_scan(progress):
+    cfg = make_cfg(**{"progress.engine": progress})
+    engine = run_engine(cfg, 60)
+    for t in range(120, 1801, 60):
+        run_engine(cfg, t, engine=engine)
+        _check(engine.state)
+    assert engine.state.line_index.created_total == len(engine.state.order_lines)
+    assert count_with_status(engine.state, "done") > 0
+
+
+def test_archived_lines_leave_indexes(tmp_path):
+    cfg = make_cfg(**{"archive.path": str(tmp_path / "lines.sqlite"), "archive.enabled": True})
+    engine = run_engine(cfg, 1800)
+    engine.close()
+    state = engine.state
+    _check(state)
+    assert engine.archive.archived > 0
+    assert state.line_index.created_total == len(state.order_lines) + engine.archive.archived
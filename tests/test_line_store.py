@@ -0,0 +1,47 @@
+import pickle
+
+import pytest
+
+from core.env.line_store import LineStore, StaleLineView
+from core.env.models import OrderLine
+
+
+def _line(lid, qty=1):
+    return OrderLine(id=lid, client_id="C1", sku="S1", qty=qty, zone_id="A1",
+                     created_time=0, deadline_time=100)
+
+
+def test_view_reads_and_writes_columns():
+    store = LineStore()
+    store["L1"] = _line("L1")
+    view = store["L1"]
+    view.status = "done"
+    view.done_time = 42
+    assert store.status_of("L1") == "done"
+    assert store.pop("L1").done_time == 42
+
+
+def test_stale_view_after_row_reuse():
+    store = LineStore()
+    store["L1"] = _line("L1", qty=1)
+    old = store["L1"]
+    store.pop("L1")
+    store["L2"] = _line("L2", qty=7)              # та же строка
+    assert store.rows["L2"] == old._row
+    assert not old.alive
+    with pytest.raises(StaleLineView):
+        old.qty
+    with pytest.raises(StaleLineView):
+        old.status = "done"
+    assert store["L2"].status != "done"
+    assert old != store["L2"]
+    assert store["L2"] == store["L2"]
+
+
+def test_views_survive_pickle():
+    store = LineStore()
+    store["L1"] = _line("L1")
+    store.pop("L1")
+    store["L2"] = _line("L2", qty=3)
+    copy = pickle.loads(pickle.dumps(store))
+    assert copy["L2"].qty == 3
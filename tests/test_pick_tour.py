@@ -0,0 +1,39 @@
+import itertools
+
+import pytest
+
+from core.env.pick_tour import _path_cost, plan_route
+from core.env.state_builder import build_initial_state
+from core.env.simulation_engine import SimulationEngine
+from core.env.travel import compute_travel_seconds
+
+from .conftest import make_cfg
+
+
+def test_route_matches_brute_force():
+    cfg = make_cfg()
+    state = build_initial_state({}, cfg, seed=1)
+    zones = list(state.zones)
+    for start in zones:
+        for stops in itertools.combinations(zones, 4):
+            order, cost = plan_route(state, start, stops)
+            dist = {(a, b): compute_travel_seconds(state, a, b, per_cell=1.5)
+                    for a in zones for b in zones}
+            best = min(_path_cost(dist, start, p) for p in itertools.permutations(stops))
+            assert sorted(order) == sorted(stops)
+            assert cost == pytest.approx(best)
+
+
+@pytest.mark.parametrize("progress", ["scalar", "vector", "heap"])
+def test_tour_worker_never_idle_between_stops(progress):
+    cfg = make_cfg(**{"dispatcher.backend": "tour", "progress.engine": progress})
+    engine = SimulationEngine(build_initial_state({}, cfg, seed=42), cfg)
+    state = engine.state
+    chained = 0
+    while state.sim_time < 1800:
+        engine.step()
+        for w in state.workers.values():
+            if w.tour:
+                chained += 1
+                assert w.state not in ("idle", "off") and w.assigned_line_id
+    assert chained
@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from core.env.models import SKU, Zone
+from core.env.putaway import PutawayIndex, _fill_ratio
+
+
+def _brute(zones, ids, qty, strategy):
+    """Эталон choose: перебор кандидатов в их порядке (min берёт первый из равных)."""
+    cand = [zones[zid] for zid in ids]
+    fits = [z for z in cand if z.current_qty + qty <= z.capacity]
+    if strategy == "best_fit" and fits:
+        return min(fits, key=lambda z: z.capacity - z.current_qty).id
+    pool = fits or cand
+    return min(pool, key=lambda z: _fill_ratio(z)).id
+
+
+@pytest.mark.parametrize("strategy", ["least_fill", "best_fit"])
+def test_choose_matches_brute_force_on_nearly_full_yard(strategy):
+    rng = random.Random(11)
+    zones = {f"Z{i}": Zone(f"Z{i}", "storage", rng.choice([0, 20, 50, 100, 400])) for i in range(40)}
+    zones["DOCK_IN"] = Zone("DOCK_IN", "dock_in", 2)
+    skus = {
+        "ANY": SKU("ANY", "", "Z0", 10, 0),
+        "SOME": SKU("SOME", "", "Z0", 10, 0, candidate_zones=["Z3", "Z7", "Z11", "Z20", "DOCK_IN", "NOPE"]),
+    }
+    ids = {"ANY": [z for z in zones if z.startswith("Z")], "SOME": ["Z3", "Z7", "Z11", "Z20"]}
+    idx = PutawayIndex(zones, skus, strategy)
+    for _ in range(3000):
+        sku = rng.choice(list(skus))
+        qty = rng.randint(1, 30)
+        z = idx.choose(skus[sku], qty, zones)
+        assert z.id == _brute(zones, ids[sku], qty, strategy)     # и порядок при равенстве
+        # кладём и изредка забираем, чтобы склад почти заполнился
+        z.current_qty += qty if rng.random() < 0.9 else -min(z.current_qty, qty)
+        idx.update(z)
+    assert sum(z.current_qty for z in zones.values()) > 0.8 * sum(z.capacity for z in zones.values())
@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+import pytest
+
+from core.env.quantiles import DDSketch, LeadTimeSketches, LeadTimeWindows, merge_sketches
+
+
+def _values(n=20000, seed=1):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(6, 1) for _ in range(n)] + [0.0] * 50
+
+
+@pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+def test_relative_error_bound(q):
+    xs = _values()
+    sk = DDSketch(relative_accuracy=0.01)
+    for x in xs:
+        sk.add(x)
+    exact = float(np.quantile(xs, q, method="lower"))
+    assert abs(sk.quantile(q) - exact) <= 0.011 * exact
+
+
+def test_merge_equals_single_sketch():
+    xs = _values()
+    whole, a, b = DDSketch(), DDSketch(), DDSketch()
+    for i, x in enumerate(xs):
+        whole.add(x)
+        (a if i % 3 else b).add(x)
+    a.merge(b)
+    assert a.bins == whole.bins
+    assert (a.count, a.zero, a.min, a.max) == (whole.count, whole.zero, whole.min, whole.max)
+    for q in (0.01, 0.5, 0.99):
+        assert a.quantile(q) == whole.quantile(q)
+
+
+def test_merge_rejects_other_accuracy():
+    with pytest.raises(ValueError):
+        DDSketch(0.01).merge(DDSketch(0.02))
+
+
+def test_roundtrip_and_bounded_bins():
+    sk = DDSketch(0.01, max_bins=64)
+    for x in _values():
+        sk.add(x)
+    assert len(sk.bins) <= 64
+    copy = DDSketch.from_dict(sk.to_dict())
+    assert copy.quantile(0.95) == sk.quantile(0.95)
+    # сливаются только нижние бакеты — верхние квантили не страдают
+    exact = float(np.quantile(_values(), 0.99, method="lower"))
+    assert abs(sk.quantile(0.99) - exact) <= 0.011 * exact
+
+
+def test_empty_sketch():
+    assert DDSketch().quantile(0.5) == 0.0
+
+
+def test_grouped_sketches_merge():
+    parts = []
+    for seed in (1, 2):
+        g = LeadTimeSketches()
+        rng = random.Random(seed)
+        for _ in range(500):
+            g.add(f"C{rng.randint(1, 3)}", "Z1", "outbound", rng.uniform(10, 1000))
+        parts.append(g)
+    merged = merge_sketches(LeadTimeSketches.from_dict(p.to_dict()) for p in parts)
+    summary = merged.summary()
+    assert summary["all"]["n"] == 1000
+    assert sum(row["n"] for g, row in summary.items() if g.startswith("client:")) == 1000
+    assert summary["zone:Z1"] == summary["all"]
+
+
+def test_window_quantiles_cover_only_window():
+    win = LeadTimeWindows(bucket_s=60)
+    # первый час — быстрые линии, второй — медленные
+    for t in range(0, 7200, 3):
+        win.add(t, "C1", "Z1", "outbound", 100.0 if t < 3600 else 1000.0)
+    late = win.since(3600).summary(["all"])["all"]
+    assert late["n"] == 1200
+    assert abs(late["p50"] - 1000.0) <= 10
+    assert win.since(0).summary(["all"])["all"]["n"] == 2400
+    # граница не кратная бакету — вниз до начала бакета
+    assert win.since(3630).summary(["all"])["all"]["n"] == 1200
+
+
+def test_window_retention_and_late_events():
+    win = LeadTimeWindows(bucket_s=60, retention_s=600)
+    for t in range(0, 3600, 10):
+        win.add(t, "C1", "Z1", "outbound", 50.0)
+    win.add(3000, "C1", "Z1", "outbound", 50.0)      # опоздавшее, внутри горизонта
+    assert win.keys[0] >= (3600 - 600) // 60 - 1
+    assert win.since(3000).summary(["all"])["all"]["n"] == 61
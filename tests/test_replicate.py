@@ -0,0 +1,29 @@
+from core.env.replicate import aggregate, merge_lead_sketches, run_replications
+from .conftest import make_cfg
+
+SHIFT = 900
+
+
+def _cfg():
+    return make_cfg(**{"time.shift_seconds": SHIFT, "time.mode": "event", "archive.enabled": True})
+
+
+def test_same_seed_same_kpis_serial_and_pooled(tmp_path):
+    cfg = _cfg()
+    serial = run_replications(cfg, [1, 2, 1], str(tmp_path / "serial"), workers=1)
+    pooled = run_replications(cfg, [1, 2, 1], str(tmp_path / "pooled"), workers=2)
+    assert serial == pooled                          # пул не меняет результат и порядок
+    assert serial[0] == serial[2]
+    assert serial[0] != serial[1]
+    for seed in (1, 2):                              # у каждого seed'а свой каталог
+        assert (tmp_path / "serial" / f"seed_{seed}" / "lines_archive.sqlite").exists()
+
+
+def test_aggregate_and_merged_lead_times(tmp_path):
+    runs = run_replications(_cfg(), [1, 2, 3], str(tmp_path), workers=1)
+    summary = aggregate(runs)
+    done = sorted(r["order_lines_done"] for r in runs)
+    row = summary["order_lines_done"]
+    assert row["n"] == 3 and row["min"] == done[0] and row["max"] == done[-1] and row["p50"] == done[1]
+    merged = {r["group"]: r for r in merge_lead_sketches(str(tmp_path), [1, 2, 3])}
+    assert merged["all"]["n"] == sum(r["order_lines_done"] for r in runs)
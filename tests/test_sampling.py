@@ -0,0 +1,69 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from core.env.sampling import AliasTable, alias_table, draw_delivery, poisson, poisson_many, PTRS_MIN_LAM
+
+
+@pytest.mark.parametrize("lam", [0.7, 4.0, PTRS_MIN_LAM + 5, 250.0])
+def test_poisson_mean_and_variance(lam):
+    rng = random.Random(7)
+    xs = [poisson(rng, lam) for _ in range(20000)]
+    mean = sum(xs) / len(xs)
+    var = sum((x - mean) ** 2 for x in xs) / (len(xs) - 1)
+    assert abs(mean - lam) < 4 * (lam / len(xs)) ** 0.5
+    assert abs(var / lam - 1) < 0.06
+    assert min(xs) >= 0
+
+
+def test_poisson_non_positive_rate():
+    rng = random.Random(1)
+    assert poisson(rng, 0) == 0
+    assert poisson(rng, -3) == 0
+
+
+def test_poisson_numpy_generator():
+    rng = np.random.default_rng(3)
+    xs = poisson_many(rng, 12.0, 10000)
+    assert abs(np.mean(xs) - 12.0) < 0.2
+
+
+def test_alias_table_frequencies():
+    items, weights = ["a", "b", "c", "d"], [1, 2, 3, 4]
+    table = AliasTable(items, weights)
+    rng = random.Random(11)
+    n = 40000
+    counts = Counter(table.draw(rng) for _ in range(n))
+    for item, w in zip(items, weights):
+        assert abs(counts[item] / n - w / 10) < 0.01
+
+
+def test_alias_table_numpy_indices_and_cache():
+    mix = [{"sku": "S1", "weight": 0.2}, {"sku": "S2", "weight": 0.8}]
+    table = alias_table(mix)
+    assert alias_table([("S1", 0.2), ("S2", 0.8)]) is table     # кэш по содержимому
+    idx = table.draw_index(np.random.default_rng(5), 20000)
+    share = np.bincount(idx, minlength=2) / len(idx)
+    assert abs(share[1] - 0.8) < 0.01
+
+
+@pytest.mark.parametrize("make_rng", [random.Random, np.random.default_rng])
+def test_draw_delivery_is_seeded_and_respects_minimums(make_rng):
+    mix = [{"sku": "S1", "weight": 1}, {"sku": "S2", "weight": 0}, {"sku": "S3", "weight": 3}]
+    a = [draw_delivery(make_rng(9), mix, 4.0, 0.2, min_lines=2, min_qty=1) for _ in range(3)]
+    b = [draw_delivery(make_rng(9), mix, 4.0, 0.2, min_lines=2, min_qty=1) for _ in range(3)]
+    assert a == b                                    # тот же seed — та же поставка
+    rng = make_rng(4)
+    for _ in range(300):
+        lines = draw_delivery(rng, mix, 4.0, 0.2, min_lines=2, min_qty=1)
+        assert len(lines) >= 2
+        assert all(sku in ("S1", "S3") and qty >= 1 for sku, qty in lines)   # вес 0 не выпадает
+
+
+def test_alias_table_rejects_degenerate_mix():
+    with pytest.raises(ValueError):
+        AliasTable([], [])
+    with pytest.raises(ValueError):
+        AliasTable(["a", "b"], [0, 0])
@@ -0,0 +1,38 @@
+import csv
+
+from core.optimizer.schema import ALLOWED_PATCH
+from core.optimizer.sweep import evaluate_point, make_design, run_sweep
+from .conftest import make_cfg
+
+KEYS = ["workers.pickers", "waves.size"]
+
+
+def test_designs_are_seeded_and_in_bounds():
+    assert make_design("lhs", KEYS, 8, 0, seed=5) == make_design("lhs", KEYS, 8, 0, seed=5)
+    assert make_design("lhs", KEYS, 8, 0, seed=5) != make_design("lhs", KEYS, 8, 0, seed=6)
+    for point in make_design("random", KEYS, 20, 0, seed=1) + make_design("grid", KEYS, 0, 3, seed=1):
+        for key, v in point.items():
+            spec = ALLOWED_PATCH[key]
+            assert isinstance(v, spec["type"]) and spec["min"] <= v <= spec["max"]
+    # латинский гиперкуб: по каждой оси ровно одна точка в каждой из n страт
+    n, spec = 10, ALLOWED_PATCH["waves.size"]
+    strata = sorted(
+        min(n - 1, int((p["waves.size"] - spec["min"]) / (spec["max"] - spec["min"]) * n))
+        for p in make_design("lhs", ["waves.size"], n, 0, seed=3)
+    )
+    assert strata == list(range(n))
+
+
+def test_sweep_is_deterministic_serial_and_pooled(tmp_path):
+    cfg = make_cfg(**{"time.shift_seconds": 900, "time.mode": "event"})
+    design = make_design("grid", KEYS, 0, 2, seed=1)
+    serial = run_sweep(cfg, design, str(tmp_path / "serial.csv"), seed=7, workers=1)
+    pooled = run_sweep(cfg, design, str(tmp_path / "pooled.csv"), seed=7, workers=2)
+    assert serial == pooled
+    assert [r["point"] for r in serial] == list(range(len(design)))
+    assert all(r["status"] == "done" and r["stopped_at"] == 900 for r in serial)
+    assert serial[0]["order_lines_done"] != serial[-1]["order_lines_done"]
+    # точка в переборе = та же точка, посчитанная отдельно
+    assert serial[1] == evaluate_point(cfg, 1, design[1], 7, 0, 0.1, [])
+    with open(tmp_path / "pooled.csv", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == len(design)
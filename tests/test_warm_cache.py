@@ -0,0 +1,22 @@
+from core.env.warm_cache import WarmCache, cache_key, warm_start
+
+from .conftest import fingerprint, make_cfg, run_engine
+
+
+def test_key_ignores_shift_length():
+    a = make_cfg(**{"time.shift_seconds": 3600})
+    b = make_cfg(**{"time.shift_seconds": 7200})
+    assert cache_key(a, 42, 600) == cache_key(b, 42, 600)
+    assert cache_key(a, 42, 600) != cache_key(a, 42, 900)
+
+
+def test_warm_start_continues_like_cold_run(tmp_path):
+    cfg = make_cfg()
+    cache = WarmCache(str(tmp_path / "warm"))
+    engine, hit = warm_start(cfg, 42, 600, cache)
+    assert not hit and engine.state.sim_time == 600
+    engine, hit = warm_start(cfg, 42, 600, cache)
+    assert hit and engine.state.sim_time == 600
+    warm = run_engine(cfg, 600 + 900, engine=engine)
+    cold = run_engine(make_cfg(), 600 + 900)
+    assert fingerprint(warm.state)["lines"] == fingerprint(cold.state)["lines"]
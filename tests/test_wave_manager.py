@@ -0,0 +1,37 @@
+"""Счётчики волн и очереди waiting совпадают с обходом линий волны."""
+import pytest
+
+from .conftest import make_cfg, run_engine
+
+
+def _check(state):
+    idx = state.line_index
+    lines = state.order_lines
+    active = [w.id for w in state.waves.values() if w.status == "active"]
+    assert sorted(idx.active_waves) == sorted(active)
+    assert [w.status for w in state.waves.values()].count("building") <= 1
+    for wave in state.waves.values():
+        status = [lines[lid].status for lid in wave.line_ids]
+        assert wave.done_count == status.count("done"), wave.id
+        if wave.status == "complete":
+            assert wave.done_count == len(wave.line_ids)
+        # очередь — все waiting‑линии волны в порядке волны (+ ленивые хвосты)
+        waiting = [lid for lid in wave.line_ids if lines[lid].status == "waiting"]
+        assert [lid for lid in wave.waiting if lines[lid].status == "waiting"] == waiting
+        for lid in wave.line_ids:
+            assert idx.line_wave[lid] == wave.id
+
+
+@pytest.mark.parametrize("backend", ["greedy", "tour"])
+def test_wave_counters_match_scan(backend):
+    cfg = make_cfg(**{"dispatcher.backend": backend})
+    engine = run_engine(cfg, 60)
+    for t in range(120, 2401, 60):
+        run_engine(cfg, t, engine=engine)
+        _check(engine.state)
+    waves = engine.state.waves.values()
+    assert any(w.status == "complete" for w in waves)
+    # закрытие — не раньше последней done‑линии волны
+    for w in waves:
+        if w.status == "complete" and w.line_ids:
+            assert w.complete_time >= max(engine.state.order_lines[lid].done_time for lid in w.line_ids)